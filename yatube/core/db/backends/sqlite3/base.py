@@ -0,0 +1,84 @@
+"""
+SQLite-бэкенд с профилем для продакшена.
+
+Поверх стандартного django.db.backends.sqlite3 добавляет в OPTIONS:
+
+* ``pragmas`` — PRAGMA, выполняемые при открытии соединения
+  (по умолчанию WAL, synchronous=NORMAL, mmap, кэш страниц и т.д.);
+* ``transaction_mode`` — режим BEGIN для atomic(): IMMEDIATE сразу берёт
+  блокировку записи и ждёт её по busy_timeout, вместо SQLITE_BUSY
+  посреди транзакции при попытке повысить чтение до записи;
+* ``busy_retries`` — сколько раз повторить запрос вне транзакции,
+  если база всё ещё занята после busy_timeout.
+"""
+import time
+
+from django.db.backends.sqlite3 import base
+
+Database = base.Database
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -20000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+BUSY_BACKOFF = 0.05
+
+
+def is_busy(error):
+    message = str(error)
+    return 'database is locked' in message or 'database is busy' in message
+
+
+class SQLiteCursorWrapper(base.SQLiteCursorWrapper):
+    busy_retries = 0
+
+    def execute(self, query, params=None):
+        return self._retry(super().execute, query, params)
+
+    def executemany(self, query, param_list):
+        return self._retry(super().executemany, query, param_list)
+
+    def _retry(self, method, *args):
+        attempt = 0
+        while True:
+            try:
+                return method(*args)
+            except Database.OperationalError as error:
+                # Внутри транзакции повтор одного запроса не поможет:
+                # снимок чтения устарел, повторять нужно всю транзакцию.
+                if (not is_busy(error) or self.connection.in_transaction
+                        or attempt >= self.busy_retries):
+                    raise
+                attempt += 1
+                time.sleep(BUSY_BACKOFF * 2 ** attempt)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    custom_options = ('pragmas', 'transaction_mode', 'busy_retries')
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        for option in self.custom_options:
+            kwargs.pop(option, None)
+        return kwargs
+
+    def init_connection_state(self):
+        super().init_connection_state()
+        options = self.settings_dict['OPTIONS']
+        pragmas = {**DEFAULT_PRAGMAS, **options.get('pragmas', {})}
+        for name, value in pragmas.items():
+            self.connection.execute(f'PRAGMA {name} = {value}')
+
+    def create_cursor(self, name=None):
+        cursor = self.connection.cursor(factory=SQLiteCursorWrapper)
+        cursor.busy_retries = self.settings_dict['OPTIONS'].get(
+            'busy_retries', 3)
+        return cursor
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode', '')
+        self.cursor().execute(f'BEGIN {mode}'.strip())
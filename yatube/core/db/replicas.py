@@ -0,0 +1,72 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.utils import timezone
+
+from core.models import Heartbeat
+
+PRIMARY = 'default'
+HEARTBEAT_ID = 1
+
+_state = threading.local()
+
+
+def pin_primary(pinned=True):
+    """Закрепляет чтение текущего потока за основной базой."""
+    _state.pinned = pinned
+
+
+def reset_state(pinned=False):
+    _state.pinned = pinned
+    _state.wrote = False
+
+
+def is_pinned():
+    return getattr(_state, 'pinned', False)
+
+
+def mark_write():
+    _state.wrote = True
+    _state.pinned = True
+
+
+def has_written():
+    return getattr(_state, 'wrote', False)
+
+
+def write_heartbeat():
+    Heartbeat.objects.using(PRIMARY).update_or_create(
+        pk=HEARTBEAT_ID, defaults={'timestamp': timezone.now()})
+
+
+def replication_lag(alias):
+    """Отставание реплики в секундах, None — если отметки ещё нет."""
+    try:
+        heartbeat = Heartbeat.objects.using(alias).filter(
+            pk=HEARTBEAT_ID).values_list('timestamp', flat=True).first()
+    except DatabaseError:
+        return None
+    if heartbeat is None:
+        return None
+    return (timezone.now() - heartbeat).total_seconds()
+
+
+def healthy_replicas():
+    """Реплики, отставание которых не больше REPLICA_MAX_LAG.
+
+    Замер кэшируется на REPLICA_LAG_CHECK секунд, так что на запрос
+    приходится не больше одного обращения к реплике за интервал.
+    """
+    healthy = []
+    for alias in settings.DATABASE_REPLICAS:
+        key = f'replica_lag:{alias}'
+        lag = cache.get(key)
+        if lag is None:
+            lag = replication_lag(alias)
+            lag = -1 if lag is None else lag
+            cache.set(key, lag, settings.REPLICA_LAG_CHECK)
+        if 0 <= lag <= settings.REPLICA_MAX_LAG:
+            healthy.append(alias)
+    return healthy
@@ -0,0 +1,37 @@
+import random
+
+from django.db import connections
+
+from core.db.replicas import PRIMARY, healthy_replicas, is_pinned, mark_write
+
+
+class PrimaryReplicaRouter:
+    """Чтение — со здоровых реплик, запись — в основную базу.
+
+    После первой записи в потоке чтение до конца запроса идёт из основной
+    базы, а ReplicaPinMiddleware продлевает это на REPLICA_PIN_SECONDS
+    для следующих запросов того же клиента.
+
+    Внутри транзакции основной базы чтение тоже идёт из неё: прочитанное
+    там решает, что записать (захват задач, счётчик ссылок на файл), и
+    отставшая реплика привела бы к неверной записи. select_for_update()
+    Django сам направляет в db_for_write.
+    """
+
+    def db_for_read(self, model, **hints):
+        if is_pinned() or connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+        replicas = healthy_replicas()
+        if not replicas:
+            return PRIMARY
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        mark_write()
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
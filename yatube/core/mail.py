@@ -0,0 +1,22 @@
+from django.core.mail.backends.base import BaseEmailBackend
+
+from core.tasks import enqueue
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Вместо отправки письма в запросе ставит его в очередь задач;
+    воркер отправляет письма пачками через TASKS_EMAIL_BACKEND."""
+
+    def send_messages(self, email_messages):
+        for message in email_messages:
+            enqueue('core.send_email', {
+                'subject': message.subject,
+                'body': message.body,
+                'from_email': message.from_email,
+                'to': message.to,
+                'cc': message.cc,
+                'bcc': message.bcc,
+                'reply_to': message.reply_to,
+                'alternatives': getattr(message, 'alternatives', []),
+            }, priority=10)
+        return len(email_messages)
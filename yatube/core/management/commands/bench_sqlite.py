@@ -0,0 +1,112 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.db.backends.sqlite3.base import DEFAULT_PRAGMAS, is_busy
+
+PROFILES = (
+    ('default', {}, ''),
+    ('production', DEFAULT_PRAGMAS, 'IMMEDIATE'),
+)
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает SQLite с настройками по умолчанию и с профилем '\
+           'core.db.backends.sqlite3 под конкурентной записью и чтением.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writes', type=int, default=300,
+                            help='Транзакций записи на один поток.')
+
+    def handle(self, *args, **options):
+        for name, pragmas, mode in PROFILES:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                path = os.path.join(tmp_dir, 'bench.sqlite3')
+                result = self.run_profile(path, pragmas, mode, options)
+            self.stdout.write(
+                f'{name:>10}: {result["writes"] / result["elapsed"]:8.0f} '
+                f'записей/с, {result["reads"] / result["elapsed"]:8.0f} '
+                f'чтений/с, busy-ошибок {result["busy"]}, '
+                f'p99 записи {result["p99"] * 1000:.1f} мс')
+
+    def connect(self, path, pragmas):
+        conn = sqlite3.connect(path, isolation_level=None,
+                               check_same_thread=False)
+        for pragma, value in pragmas.items():
+            conn.execute(f'PRAGMA {pragma} = {value}')
+        return conn
+
+    def run_profile(self, path, pragmas, mode, options):
+        conn = self.connect(path, pragmas)
+        conn.execute('CREATE TABLE post (id INTEGER PRIMARY KEY, '
+                     'author_id INTEGER, text TEXT, pub_date TEXT)')
+        conn.execute('CREATE INDEX post_author ON post (author_id)')
+        conn.close()
+        self.done = threading.Event()
+        self.lock = threading.Lock()
+        self.stats = {'writes': 0, 'reads': 0, 'busy': 0, 'latency': []}
+        writers = [
+            threading.Thread(target=self.writer,
+                             args=(path, pragmas, mode, n, options['writes']))
+            for n in range(options['writers'])]
+        readers = [threading.Thread(target=self.reader,
+                                    args=(path, pragmas, n))
+                   for n in range(options['readers'])]
+        started = time.perf_counter()
+        for thread in writers + readers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        self.done.set()
+        for thread in readers:
+            thread.join()
+        latency = sorted(self.stats['latency']) or [0]
+        p99 = latency[min(len(latency) - 1, int(len(latency) * 0.99))]
+        return {**self.stats, 'elapsed': elapsed, 'p99': p99}
+
+    def count(self, key, value=None):
+        with self.lock:
+            self.stats[key] += 1
+            if value is not None:
+                self.stats['latency'].append(value)
+
+    def writer(self, path, pragmas, mode, number, writes):
+        conn = self.connect(path, pragmas)
+        for i in range(writes):
+            started = time.perf_counter()
+            try:
+                conn.execute(f'BEGIN {mode}')
+                conn.execute('INSERT INTO post (author_id, text, pub_date) '
+                             "VALUES (?, ?, datetime('now'))",
+                             (number, f'Пост {i}'))
+                conn.execute('COMMIT')
+            except sqlite3.OperationalError as error:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                if not is_busy(error):
+                    raise
+                self.count('busy')
+                continue
+            self.count('writes', time.perf_counter() - started)
+        conn.close()
+
+    def reader(self, path, pragmas, number):
+        conn = self.connect(path, pragmas)
+        while not self.done.is_set():
+            try:
+                conn.execute('SELECT count(*) FROM post WHERE author_id = ?',
+                             (number,)).fetchone()
+            except sqlite3.OperationalError as error:
+                if not is_busy(error):
+                    raise
+                self.count('busy')
+                continue
+            self.count('reads')
+        conn.close()
@@ -0,0 +1,76 @@
+import multiprocessing
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import tasks
+
+
+class Command(BaseCommand):
+    help = 'Запускает пул процессов, выполняющих задачи из очереди '\
+           'core.tasks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2)
+        parser.add_argument('--batch-size', type=int,
+                            default=settings.TASKS_BATCH_SIZE)
+        parser.add_argument('--sleep', type=float, default=1,
+                            help='Пауза при пустой очереди, секунд.')
+        parser.add_argument('--once', action='store_true',
+                            help='Выполнить готовые задачи и выйти.')
+        parser.add_argument('--stats', action='store_true',
+                            help='Показать состояние очереди и выйти.')
+
+    def handle(self, *args, **options):
+        tasks.autodiscover()
+        if options['stats']:
+            return self.print_stats()
+        if options['once']:
+            handled = tasks.work(batch_size=options['batch_size'])
+            self.stdout.write(f'Выполнено пачек: {handled}')
+            return
+        # Соединения с базой не должны переходить в дочерние процессы.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        pool = [context.Process(target=self.loop, args=(options,))
+                for _ in range(options['processes'])]
+        for process in pool:
+            process.start()
+        try:
+            for process in pool:
+                process.join()
+        except KeyboardInterrupt:
+            for process in pool:
+                process.terminate()
+
+    def loop(self, options):
+        stopping = []
+        signal.signal(signal.SIGTERM, lambda *args: stopping.append(True))
+        worker = tasks.worker_id()
+        last_cleanup = 0
+        while not stopping:
+            handled = tasks.work(worker, options['batch_size'], limit=100)
+            if time.monotonic() - last_cleanup > 3600:
+                tasks.cleanup()
+                last_cleanup = time.monotonic()
+            if not handled:
+                time.sleep(options['sleep'])
+
+    def print_stats(self):
+        metrics = tasks.queue_metrics()
+        for (name, status), count in metrics['tasks'].items():
+            self.stdout.write(f'{name:30} {status:8} {count}')
+        self.stdout.write('Самая старая задача ждёт '
+                          f'{metrics["oldest_queued_age"]:.0f} с')
+        for name, counters in metrics['processed'].items():
+            timing = ''
+            if counters['average'] is not None:
+                timing = (f', в среднем '
+                          f'{counters["average"].total_seconds():.2f} с, '
+                          f'максимум '
+                          f'{counters["longest"].total_seconds():.2f} с')
+            self.stdout.write(f'{name:30} выполнено {counters["done"]}, '
+                              f'ошибок {counters["failed"]}{timing}')
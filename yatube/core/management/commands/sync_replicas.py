@@ -0,0 +1,56 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.db.replicas import (PRIMARY, healthy_replicas, replication_lag,
+                              write_heartbeat)
+
+
+class Command(BaseCommand):
+    help = 'Пишет отметку времени в основную базу, копирует её в '\
+           'локальные SQLite-реплики и выводит отставание реплик.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Только замерить отставание.')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Повторять каждые N секунд.')
+
+    def handle(self, *args, **options):
+        while True:
+            if not options['check']:
+                write_heartbeat()
+                self.copy_sqlite_replicas()
+            self.report()
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+
+    def copy_sqlite_replicas(self):
+        primary = connections[PRIMARY]
+        primary.ensure_connection()
+        for alias in settings.DATABASE_REPLICAS:
+            replica = connections[alias]
+            if replica.vendor != 'sqlite':
+                continue
+            # Копия пишется онлайн-бэкапом SQLite поверх файла реплики:
+            # читатели реплики видят либо старую, либо новую версию.
+            replica.close()
+            target = sqlite3.connect(replica.settings_dict['NAME'])
+            with target:
+                primary.connection.backup(target)
+            target.close()
+
+    def report(self):
+        for alias in settings.DATABASE_REPLICAS:
+            lag = replication_lag(alias)
+            cache.delete(f'replica_lag:{alias}')
+            text = 'нет отметки' if lag is None else f'{lag:.1f} с'
+            self.stdout.write(f'{alias}: отставание {text}')
+        healthy = healthy_replicas()
+        self.stdout.write(f'Здоровых реплик для чтения: {len(healthy)} '
+                          f'из {len(settings.DATABASE_REPLICAS)}')
@@ -0,0 +1,154 @@
+"""
+Отдача загруженных файлов (MEDIA_ROOT).
+
+serve_media поддерживает условные запросы (ETag/If-None-Match,
+If-Modified-Since) и докачку (Range/If-Range, один диапазон). Файл
+отдаётся через FileResponse: если WSGI-сервер умеет wsgi.file_wrapper
+(например, gunicorn), байты уходят в сокет os.sendfile без копирования
+через Python, в том числе для диапазона — RangeFile ограничивает чтение
+и Content-Length, а сервер начинает с текущей позиции файла.
+
+Если перед приложением стоит прокси, MEDIA_SENDFILE = 'x-accel' (nginx)
+или 'x-sendfile' (Apache, lighttpd) оставляет приложению только проверку
+условий и заголовки, а сам файл и диапазоны отдаёт прокси.
+
+Файлы с именем по содержимому (core.storage) кэшируются навсегда,
+остальные — на MEDIA_CACHE_SECONDS.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from .staticfiles import IMMUTABLE
+from .storage import is_content_name
+
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeFile:
+    """Файл, из которого читается не больше length байт с позиции
+    start."""
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.name = file.name
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def tell(self):
+        return self.file.tell()
+
+    def seek(self, *args):
+        return self.file.seek(*args)
+
+    def close(self):
+        self.file.close()
+
+
+def make_etag(stat):
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def parse_range(header, size):
+    """(start, end) включительно для одного диапазона, None — отдать
+    файл целиком, ValueError — диапазон вне файла."""
+    match = RANGE.match(header.replace(' ', ''))
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+def range_applies(request, etag, mtime):
+    """If-Range: диапазон отдаётся, только если файл не изменился."""
+    condition = request.META.get('HTTP_IF_RANGE')
+    if not condition:
+        return True
+    if condition.startswith(('"', 'W/')):
+        return condition == etag
+    return parse_http_date_safe(condition) == int(mtime)
+
+
+@require_safe
+def serve_media(request, path):
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('Файл не найден')
+    if not os.path.isfile(full_path):
+        raise Http404('Файл не найден')
+    stat = os.stat(full_path)
+    etag = make_etag(stat)
+    content_type = (mimetypes.guess_type(full_path)[0]
+                    or 'application/octet-stream')
+    response = get_conditional_response(request, etag=etag,
+                                        last_modified=int(stat.st_mtime))
+    if response is None and settings.MEDIA_SENDFILE:
+        response = proxy_response(path, full_path, content_type)
+    elif response is None:
+        response = file_response(request, full_path, stat, etag,
+                                 content_type)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Accept-Ranges'] = 'bytes'
+    # Имя по содержимому не переиспользуется для других данных.
+    response['Cache-Control'] = (
+        IMMUTABLE if is_content_name(path)
+        else f'public, max-age={settings.MEDIA_CACHE_SECONDS}')
+    return response
+
+
+def proxy_response(path, full_path, content_type):
+    """Пустой ответ, тело и диапазоны которого отдаёт прокси."""
+    response = HttpResponse(content_type=content_type)
+    if settings.MEDIA_SENDFILE == 'x-accel':
+        response['X-Accel-Redirect'] = (settings.MEDIA_ACCEL_PREFIX
+                                        + quote(path))
+    else:
+        response['X-Sendfile'] = full_path
+    return response
+
+
+def file_response(request, full_path, stat, etag, content_type):
+    size = stat.st_size
+    try:
+        byte_range = parse_range(request.META.get('HTTP_RANGE', ''), size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    if byte_range and range_applies(request, etag, stat.st_mtime):
+        start, end = byte_range
+        response = FileResponse(
+            RangeFile(open(full_path, 'rb'), start, end - start + 1),
+            content_type=content_type, status=206)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+        return response
+    return FileResponse(open(full_path, 'rb'), content_type=content_type)
@@ -0,0 +1,45 @@
+from django.conf import settings
+
+from core.db.replicas import has_written, reset_state
+from core.throttling import check
+
+PIN_COOKIE = 'pin_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaPinMiddleware:
+    """Закрепляет клиента за основной базой после его собственной записи,
+    чтобы он сразу видел свои изменения, даже если реплика отстаёт."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        reset_state(request.method not in SAFE_METHODS
+                    or PIN_COOKIE in request.COOKIES)
+        try:
+            response = self.get_response(request)
+            if has_written():
+                response.set_cookie(PIN_COOKIE, '1',
+                                    max_age=settings.REPLICA_PIN_SECONDS,
+                                    httponly=True)
+        finally:
+            reset_state()
+        return response
+
+
+class ThrottleMiddleware:
+    """Ограничивает частоту записывающих запросов к URL из THROTTLE_RATES.
+    Представления с декоратором throttle проверяются им самим."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (request.method in SAFE_METHODS
+                or hasattr(view_func, 'throttle_scope')):
+            return None
+        return check(request, request.resolver_match.view_name)
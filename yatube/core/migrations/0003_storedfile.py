@@ -0,0 +1,22 @@
+# Generated by Django 2.2.16 on 2026-10-19 16:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_task'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='Имя')),
+                ('size', models.PositiveIntegerField(default=0, verbose_name='Размер, байт')),
+                ('refs', models.PositiveIntegerField(default=0, verbose_name='Ссылок')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Загружен')),
+            ],
+        ),
+    ]
@@ -0,0 +1,59 @@
+from django.db import models
+
+
+class Heartbeat(models.Model):
+    """Отметка времени, которую основная база пишет для замера отставания
+    реплик."""
+    timestamp = models.DateTimeField(verbose_name='Время отметки')
+
+
+class Task(models.Model):
+    """Отложенная задача очереди core.tasks."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField('Тип', max_length=100)
+    payload = models.TextField('Данные (JSON)', default='{}')
+    key = models.CharField('Ключ идемпотентности', max_length=200,
+                           unique=True, null=True, blank=True)
+    priority = models.SmallIntegerField('Приоритет', default=0)
+    status = models.CharField('Статус', max_length=7, choices=STATUSES,
+                              default=QUEUED)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField('Максимум попыток',
+                                                    default=5)
+    run_at = models.DateTimeField('Выполнить не раньше')
+    locked_by = models.CharField('Исполнитель', max_length=64, blank=True)
+    locked_at = models.DateTimeField('Взята в работу', null=True,
+                                     blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Создана', auto_now_add=True)
+    finished = models.DateTimeField('Завершена', null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', '-priority', 'run_at']),
+            models.Index(fields=['name', 'status', 'run_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
+
+
+class StoredFile(models.Model):
+    """Файл хранилища core.storage и число ссылок на него."""
+    name = models.CharField('Имя', max_length=100, primary_key=True)
+    size = models.PositiveIntegerField('Размер, байт', default=0)
+    refs = models.PositiveIntegerField('Ссылок', default=0)
+    created = models.DateTimeField('Загружен', auto_now_add=True)
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,111 @@
+"""
+Статические файлы для боя.
+
+CompressedManifestStaticFilesStorage при collectstatic добавляет в имена
+файлов хэш содержимого (css/bootstrap.min.css ->
+css/bootstrap.min.<хэш>.css), записывает соответствие в manifest и рядом
+со сжимаемыми файлами кладёт их gzip-копии. Имя с хэшем меняется вместе
+с содержимым, поэтому такие файлы можно кэшировать навсегда.
+
+Если статику отдаёт само приложение (STATIC_SERVE), serve_static
+выбирает готовую gzip-копию по Accept-Encoding, не сжимая ничего на
+лету, и помечает файлы с хэшем как неизменяемые.
+"""
+import gzip
+import logging
+import mimetypes
+import os
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import (ManifestStaticFilesStorage,
+                                                staticfiles_storage)
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+from django.views.static import was_modified_since
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.ico', '.json', '.txt', '.xml',
+                '.map')
+# Файлы меньше этого размера сжатие почти не уменьшает.
+MIN_SIZE = 256
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Файлы без хэша в имени могут поменяться при следующей выкладке.
+REVALIDATE = 'public, max-age=0, must-revalidate'
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in sorted(set(paths) | set(self.hashed_files.values())):
+            if self.compress(name):
+                yield name, f'{name}.gz', True
+
+    def compress(self, name):
+        """Кладёт рядом с файлом gzip-копию, если она заметно меньше."""
+        if not name.endswith(COMPRESSIBLE) or not self.exists(name):
+            return False
+        path = self.path(name)
+        with open(path, 'rb') as source:
+            content = source.read()
+        if len(content) < MIN_SIZE:
+            return False
+        # mtime=0: одинаковое содержимое даёт одинаковый архив.
+        compressed = gzip.compress(content, compresslevel=9, mtime=0)
+        if len(compressed) >= len(content) * 0.95:
+            return False
+        with open(f'{path}.gz', 'wb') as target:
+            target.write(compressed)
+        return True
+
+    def stored_name(self, name):
+        # Ссылка на отсутствующий файл не должна ронять страницу.
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            logger.warning('Статический файл %s не найден', name)
+            return name
+
+
+@lru_cache(maxsize=None)
+def hashed_names():
+    """Имена файлов с хэшем из manifest (пусто без manifest-хранилища)."""
+    return frozenset(getattr(staticfiles_storage, 'hashed_files',
+                             {}).values())
+
+
+@require_safe
+def serve_static(request, path):
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('Файл не найден')
+    if not os.path.isfile(full_path):
+        raise Http404('Файл не найден')
+    served, encoding = full_path, None
+    if ('gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+            and os.path.isfile(f'{full_path}.gz')):
+        served, encoding = f'{full_path}.gz', 'gzip'
+    stat = os.stat(served)
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'),
+                              stat.st_mtime, stat.st_size):
+        response = HttpResponseNotModified()
+    else:
+        content_type = mimetypes.guess_type(full_path)[0]
+        response = FileResponse(
+            open(served, 'rb'), filename=os.path.basename(full_path),
+            content_type=content_type or 'application/octet-stream')
+        if encoding:
+            response['Content-Encoding'] = encoding
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Vary'] = 'Accept-Encoding'
+    response['Cache-Control'] = (IMMUTABLE if path in hashed_names()
+                                 else REVALIDATE)
+    return response
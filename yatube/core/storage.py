@@ -0,0 +1,145 @@
+"""
+Хранилище загруженных файлов с адресацией по содержимому.
+
+Файл называется sha256 своего содержимого и лежит в двух уровнях
+вложенных каталогов по первым знакам хэша (posts/ab/cd/abcd….jpg), так
+что ни в одном каталоге не копятся сотни тысяч файлов. Одинаковые
+загрузки получают одно имя и хранятся один раз: StoredFile считает
+ссылки, а delete() удаляет файл с диска вместе с миниатюрами, только
+когда ссылок не осталось. Содержимое по имени никогда не меняется,
+поэтому адрес файла можно кэшировать навсегда (см. core.media).
+
+Файлы со старыми именами (posts/<имя>.jpg) читаются как раньше и
+удаляются сразу; перенести их помогает команда rehash_media.
+"""
+import functools
+import hashlib
+import logging
+import os
+import posixpath
+import re
+import tempfile
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+from sorl.thumbnail.default import kvstore as thumbnail_store
+from sorl.thumbnail.images import ImageFile
+
+from .models import StoredFile
+
+logger = logging.getLogger(__name__)
+
+CONTENT_NAME = re.compile(
+    r'(^|/)(?P<a>[0-9a-f]{2})/(?P<b>[0-9a-f]{2})/'
+    r'(?P=a)(?P=b)[0-9a-f]{60}(\.\w+)?$')
+# Префикс недописанных файлов, см. _save.
+TEMP_PREFIX = '.upload-'
+
+
+def is_content_name(name):
+    return bool(CONTENT_NAME.search(name))
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+
+    def content_name(self, name, content):
+        """Имя по содержимому в каталоге из name (upload_to)."""
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+        extension = os.path.splitext(name)[1].lower()
+        return posixpath.join(posixpath.dirname(name), digest[:2],
+                              digest[2:4], digest + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.content_name(name, content)
+        self.retain(name, content.size)
+        # Файл мог пропасть с диска при живой записи — пишем заново.
+        if not self.exists(name):
+            self._save(name, content)
+        return name
+
+    def _save(self, name, content):
+        # Пишем во временный файл рядом и переименовываем: параллельная
+        # загрузка того же содержимого и чтение не увидят файл
+        # наполовину.
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(dir=directory,
+                                                 prefix=TEMP_PREFIX)
+        try:
+            with os.fdopen(descriptor, 'wb') as target:
+                for chunk in content.chunks():
+                    target.write(chunk)
+            os.chmod(temp_path, self.file_permissions_mode or 0o644)
+            os.replace(temp_path, full_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return name
+
+    def retain(self, name, size=0):
+        """Добавляет ссылку на файл."""
+        with transaction.atomic():
+            if StoredFile.objects.filter(name=name).update(
+                    refs=F('refs') + 1):
+                return
+            try:
+                with transaction.atomic():
+                    StoredFile.objects.create(name=name, size=size, refs=1)
+            except IntegrityError:
+                StoredFile.objects.filter(name=name).update(
+                    refs=F('refs') + 1)
+
+    def delete(self, name):
+        """Снимает ссылку на файл; файл удаляется с диска после фиксации
+        транзакции, если ссылок не осталось."""
+        if not name:
+            return
+        try:
+            self.path(name)
+        except SuspiciousFileOperation:
+            logger.warning('Файл %s вне MEDIA_ROOT не удаляется', name)
+            return
+        if is_content_name(name):
+            with transaction.atomic():
+                stored = (StoredFile.objects.select_for_update()
+                          .filter(name=name).first())
+                # Без записи о ссылках неизвестно, кто ещё ссылается на
+                # файл, — не трогаем его.
+                if stored is None:
+                    return
+                if stored.refs > 1:
+                    StoredFile.objects.filter(name=name).update(
+                        refs=F('refs') - 1)
+                    return
+                stored.delete()
+        transaction.on_commit(functools.partial(self.remove, name))
+
+    def remove(self, name):
+        # Пока транзакция шла, то же содержимое могли загрузить снова.
+        if is_content_name(name) and StoredFile.objects.filter(
+                name=name).exists():
+            return
+        self.delete_thumbnails(name)
+        super().delete(name)
+
+    def delete_thumbnails(self, name):
+        """Удаляет миниатюры sorl-thumbnail файла и записи о них."""
+        thumbnail_store.delete(ImageFile(name, self))
+
+
+media_storage = ContentAddressedStorage()
@@ -0,0 +1,212 @@
+"""
+Очередь отложенных задач в самой базе, без внешнего брокера.
+
+Обработчик регистрируется декоратором @task и ставится в очередь через
+enqueue(). Команда runworker выбирает задачи по приоритету, повторяет
+упавшие с экспоненциальной задержкой и, если обработчик объявлен с
+batch=True, передаёт ему сразу пачку однотипных задач.
+"""
+import json
+import os
+import random
+import socket
+import traceback
+import uuid
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import (Avg, Count, DurationField, ExpressionWrapper,
+                              F, Max, Min, Q, Sum)
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from core.models import Task
+
+TaskSpec = namedtuple('TaskSpec', 'func batch max_attempts')
+
+REGISTRY = {}
+
+
+def task(name, batch=False, max_attempts=5):
+    """Регистрирует обработчик задачи. Обработчик с batch=True получает
+    список payload, иначе — один payload."""
+    def decorator(func):
+        REGISTRY[name] = TaskSpec(func, batch, max_attempts)
+        return func
+    return decorator
+
+
+def autodiscover():
+    autodiscover_modules('tasks')
+
+
+def enqueue(name, payload=None, key=None, priority=0, delay=0):
+    """Ставит задачу в очередь. Повторный вызов с тем же key ничего не
+    добавляет, пока старая задача хранится (см. TASKS_RETENTION_DAYS)."""
+    spec = REGISTRY.get(name)
+    job = Task(name=name, payload=json.dumps(payload or {}), key=key,
+               priority=priority,
+               max_attempts=spec.max_attempts if spec else 5,
+               run_at=timezone.now() + timedelta(seconds=delay))
+    if key is None:
+        job.save()
+        return job
+    Task.objects.bulk_create([job], ignore_conflicts=True)
+    return Task.objects.get(key=key)
+
+
+def backoff(attempts):
+    base = settings.TASKS_RETRY_BACKOFF * 2 ** (attempts - 1)
+    return timedelta(seconds=base * random.uniform(0.5, 1.5))
+
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+
+def claim(worker, limit):
+    """Забирает самую приоритетную готовую задачу и, для пакетных
+    обработчиков, до limit готовых задач того же типа.
+
+    Захват считается попыткой. Задача, захват которой истёк, скорее
+    всего уронила свой процесс; после max_attempts попыток её больше не
+    берут, а помечают FAILED."""
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.TASKS_LOCK_TIMEOUT)
+    abandoned = Q(status=Task.RUNNING, locked_at__lt=stale)
+    ready = Q(status=Task.QUEUED, run_at__lte=now) | abandoned
+    with transaction.atomic():
+        Task.objects.filter(
+            abandoned, attempts__gte=F('max_attempts')).update(
+            status=Task.FAILED, finished=now, locked_by='',
+            last_error='Задача не завершилась за TASKS_LOCK_TIMEOUT')
+        tasks = Task.objects.filter(ready)
+        first = tasks.order_by('-priority', 'run_at').values_list(
+            'name', flat=True).first()
+        if first is None:
+            return None, []
+        spec = REGISTRY.get(first)
+        size = limit if spec and spec.batch else 1
+        ids = list(tasks.filter(name=first)
+                   .order_by('-priority', 'run_at')
+                   .values_list('pk', flat=True)[:size])
+        # То же условие в UPDATE: задачу, которую успел забрать другой
+        # процесс, захват не тронет.
+        Task.objects.filter(ready, pk__in=ids).update(
+            status=Task.RUNNING, locked_by=worker, locked_at=now,
+            attempts=F('attempts') + 1)
+        return first, list(Task.objects.filter(
+            pk__in=ids, status=Task.RUNNING, locked_by=worker,
+            locked_at=now))
+
+
+def execute(name, tasks):
+    spec = REGISTRY.get(name)
+    payloads = [json.loads(job.payload) for job in tasks]
+    try:
+        if spec is None:
+            raise LookupError(f'Обработчик задачи {name} не найден')
+        if spec.batch:
+            spec.func(payloads)
+        else:
+            spec.func(payloads[0])
+    except Exception:
+        fail(name, tasks, traceback.format_exc())
+        return False
+    Task.objects.filter(pk__in=[job.pk for job in tasks]).update(
+        status=Task.DONE, finished=timezone.now(), locked_by='')
+    return True
+
+
+def fail(name, tasks, error):
+    now = timezone.now()
+    for job in tasks:
+        job.last_error = error
+        job.locked_by = ''
+        if job.attempts >= job.max_attempts:
+            job.status = Task.FAILED
+            job.finished = now
+        else:
+            job.status = Task.QUEUED
+            job.run_at = now + backoff(job.attempts)
+        job.save(update_fields=['attempts', 'last_error', 'locked_by',
+                                'status', 'finished', 'run_at'])
+
+
+def work(worker=None, batch_size=None, limit=None):
+    """Выполняет готовые задачи, пока очередь не опустеет или не будет
+    обработано limit пачек. Возвращает число выполненных пачек."""
+    worker = worker or worker_id()
+    batch_size = batch_size or settings.TASKS_BATCH_SIZE
+    handled = 0
+    while limit is None or handled < limit:
+        name, tasks = claim(worker, batch_size)
+        if not tasks:
+            break
+        execute(name, tasks)
+        handled += 1
+    return handled
+
+
+def cleanup():
+    """Удаляет выполненные задачи старше TASKS_RETENTION_DAYS."""
+    border = timezone.now() - timedelta(days=settings.TASKS_RETENTION_DAYS)
+    deleted, _ = Task.objects.filter(status=Task.DONE,
+                                     finished__lt=border).delete()
+    return deleted
+
+
+def queue_metrics():
+    """Состояние очереди: число задач по типам и статусам, возраст самой
+    старой готовой задачи и по типам — выполненные задачи, упавшие
+    попытки и время выполнения. Всё считается по таблице Task, поэтому
+    видно из любого процесса; выполненные задачи учитываются, пока их не
+    удалит cleanup (TASKS_RETENTION_DAYS)."""
+    rows = (Task.objects.values('name', 'status')
+            .annotate(count=Count('pk')).order_by('name', 'status'))
+    oldest = Task.objects.filter(status=Task.QUEUED).aggregate(
+        oldest=Min('run_at'))['oldest']
+    duration = ExpressionWrapper(F('finished') - F('locked_at'),
+                                 output_field=DurationField())
+    processed = {
+        row['name']: row for row in Task.objects.values('name').annotate(
+            done=Count('pk', filter=Q(status=Task.DONE)),
+            # Попытка, захватившая задачу, неудачна, если задача не
+            # выполнена и не выполняется.
+            failed=Sum('attempts') - Count(
+                'pk', filter=Q(status__in=(Task.DONE, Task.RUNNING))),
+            average=Avg(duration, filter=Q(status=Task.DONE)),
+            longest=Max(duration, filter=Q(status=Task.DONE)),
+        ).order_by('name')
+    }
+    names = sorted(set(processed) | set(REGISTRY))
+    empty = {'done': 0, 'failed': 0, 'average': None, 'longest': None}
+    return {
+        'tasks': {(row['name'], row['status']): row['count']
+                  for row in rows},
+        'oldest_queued_age': (
+            (timezone.now() - oldest).total_seconds() if oldest else 0),
+        'processed': {
+            name: {key: processed.get(name, empty)[key] or empty[key]
+                   for key in empty}
+            for name in names
+        },
+    }
+
+
+@task('core.send_email', batch=True)
+def send_emails(payloads):
+    """Отправляет письма из core.mail.QueuedEmailBackend одним
+    соединением."""
+    messages = []
+    for payload in payloads:
+        alternatives = payload.pop('alternatives')
+        message = EmailMultiAlternatives(**payload)
+        for content, mimetype in alternatives:
+            message.attach_alternative(content, mimetype)
+        messages.append(message)
+    with get_connection(settings.TASKS_EMAIL_BACKEND) as connection:
+        connection.send_messages(messages)
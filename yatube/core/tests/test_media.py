@@ -0,0 +1,95 @@
+import shutil
+import tempfile
+
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.media import parse_range, serve_media
+
+MEDIA_ROOT = tempfile.mkdtemp()
+CONTENT = bytes(range(256)) * 4
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MEDIA_SENDFILE=None)
+class MediaTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        with open(f'{MEDIA_ROOT}/image.jpg', 'wb') as image:
+            image.write(CONTENT)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def get(self, path='image.jpg', **headers):
+        request = RequestFactory().get(f'/media/{path}', **headers)
+        return serve_media(request, path)
+
+    def body(self, response):
+        content = b''.join(response.streaming_content)
+        response.close()
+        return content
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range('bytes=0-9', 100), (0, 9))
+        self.assertEqual(parse_range('bytes=90-', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-10', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=50-500', 100), (50, 99))
+        self.assertIsNone(parse_range('bytes=0-1,5-9', 100))
+        self.assertIsNone(parse_range('', 100))
+        with self.assertRaises(ValueError):
+            parse_range('bytes=100-', 100)
+
+    def test_full_file(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Length'], str(len(CONTENT)))
+        self.assertEqual(self.body(response), CONTENT)
+
+    def test_etag(self):
+        etag = self.get()['ETag']
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_range(self):
+        response = self.get(HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'],
+                         f'bytes 10-19/{len(CONTENT)}')
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(self.body(response), CONTENT[10:20])
+
+    def test_if_range(self):
+        etag = self.get()['ETag']
+        response = self.get(HTTP_RANGE='bytes=-4', HTTP_IF_RANGE=etag)
+        self.assertEqual(self.body(response), CONTENT[-4:])
+        response = self.get(HTTP_RANGE='bytes=-4', HTTP_IF_RANGE='"old"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), CONTENT)
+
+    def test_unsatisfiable_range(self):
+        response = self.get(HTTP_RANGE=f'bytes={len(CONTENT)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'],
+                         f'bytes */{len(CONTENT)}')
+
+    def test_proxy_modes(self):
+        with self.settings(MEDIA_SENDFILE='x-accel',
+                           MEDIA_ACCEL_PREFIX='/protected/'):
+            response = self.get()
+        self.assertEqual(response['X-Accel-Redirect'], '/protected/image.jpg')
+        self.assertEqual(response.content, b'')
+        with self.settings(MEDIA_SENDFILE='x-sendfile'):
+            response = self.get()
+        self.assertEqual(response['X-Sendfile'], f'{MEDIA_ROOT}/image.jpg')
+
+    def test_missing_and_outside(self):
+        for path in ('missing.jpg', '../image.jpg'):
+            with self.subTest(path=path), self.assertRaises(Http404):
+                self.get(path)
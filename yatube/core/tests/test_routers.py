@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from unittest import mock
+
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core.db.replicas import reset_state
+from core.db.routers import PrimaryReplicaRouter
+from core.middleware import PIN_COOKIE
+from core.tasks import claim, enqueue
+from posts.models import Post
+
+User = get_user_model()
+
+
+# TestCase держит тест в транзакции основной базы, а в ней чтение
+# с реплик не выбирается.
+@override_settings(DATABASE_REPLICAS=['replica'])
+class RouterTests(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        reset_state()
+        self.router = PrimaryReplicaRouter()
+
+    def tearDown(self):
+        reset_state()
+
+    def test_reads_go_to_fresh_replica(self):
+        """Чтение уходит на реплику с малым отставанием."""
+        cache.set('replica_lag:replica', 1)
+        self.assertEqual(self.router.db_for_read(Post), 'replica')
+
+    def test_lagging_replica_is_skipped(self):
+        """Отставшая реплика исключается из чтения."""
+        cache.set('replica_lag:replica', 3600)
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_reads_after_write_stick_to_primary(self):
+        """После записи чтение в том же потоке идёт из основной базы."""
+        cache.set('replica_lag:replica', 1)
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_reads_in_primary_transaction_stay_on_primary(self):
+        cache.set('replica_lag:replica', 1)
+        with transaction.atomic():
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_claim_ignores_lagging_replica(self):
+        """Захват задачи читает основную базу, даже если есть реплика,
+        которой задача ещё не видна."""
+        job = enqueue('unknown')
+        reset_state()
+        # Реплики в тестах нет: запрос, отправленный к ней, упал бы, как
+        # на отставшей реплике вернулась бы пустая очередь.
+        with mock.patch('core.db.routers.healthy_replicas',
+                        return_value=['replica']):
+            name, tasks = claim('worker', 1)
+        self.assertEqual((name, [task.pk for task in tasks]),
+                         ('unknown', [job.pk]))
+
+
+class ReplicaPinMiddlewareTests(TestCase):
+
+    def test_write_sets_pin_cookie(self):
+        """Запрос с записью закрепляет клиента за основной базой."""
+        user = User.objects.create_user(username='auth')
+        author = User.objects.create_user(username='author')
+        self.client.force_login(user)
+        response = self.client.get(reverse(
+            'posts:profile_follow', kwargs={'username': author.username}))
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+    def test_read_does_not_set_pin_cookie(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
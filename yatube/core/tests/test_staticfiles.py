@@ -0,0 +1,74 @@
+import gzip
+import shutil
+import tempfile
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.utils.http import http_date
+
+from core.staticfiles import IMMUTABLE, REVALIDATE, hashed_names, serve_static
+
+STATIC_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(
+    STATIC_ROOT=STATIC_ROOT,
+    STATICFILES_STORAGE='core.staticfiles.'
+                        'CompressedManifestStaticFilesStorage')
+class StaticFilesTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(STATIC_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        hashed_names.cache_clear()
+        self.css = staticfiles_storage.stored_name('css/bootstrap.min.css')
+
+    def get(self, path, **headers):
+        return serve_static(RequestFactory().get(f'/static/{path}',
+                                                 **headers), path)
+
+    def test_hashed_names_and_gzip_copies(self):
+        self.assertRegex(self.css, r'^css/bootstrap\.min\.[0-9a-f]{12}\.css$')
+        self.assertTrue(staticfiles_storage.exists(f'{self.css}.gz'))
+        logo = staticfiles_storage.stored_name('img/logo.png')
+        self.assertFalse(staticfiles_storage.exists(f'{logo}.gz'))
+
+    def test_missing_file_keeps_plain_name(self):
+        self.assertEqual(staticfiles_storage.url('img/fav/fav.ico'),
+                         '/static/img/fav/fav.ico')
+
+    def test_serves_precompressed_immutable(self):
+        response = self.get(self.css, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Cache-Control'], IMMUTABLE)
+        with staticfiles_storage.open(self.css) as source:
+            self.assertEqual(
+                gzip.decompress(b''.join(response.streaming_content)),
+                source.read())
+
+    def test_plain_and_unhashed(self):
+        response = self.get('css/bootstrap.min.css')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['Cache-Control'], REVALIDATE)
+        response.close()
+
+    def test_not_modified(self):
+        mtime = staticfiles_storage.get_modified_time(self.css).timestamp()
+        response = self.get(self.css,
+                            HTTP_IF_MODIFIED_SINCE=http_date(mtime + 1))
+        self.assertEqual(response.status_code, 304)
+
+    def test_outside_root(self):
+        with self.assertRaises(Http404):
+            self.get('../settings.py')
@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import TransactionTestCase, override_settings
+
+from core.models import StoredFile
+from core.storage import is_content_name, media_storage
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ContentAddressedStorageTests(TransactionTestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def save(self, content=b'image', name='posts/Photo.JPG'):
+        return media_storage.save(name, ContentFile(content))
+
+    def test_name_by_content(self):
+        name = self.save()
+        self.assertRegex(name, r'^posts/([0-9a-f]{2})/([0-9a-f]{2})/'
+                               r'\1\2[0-9a-f]{60}\.jpg$')
+        self.assertTrue(is_content_name(name))
+        self.assertFalse(is_content_name('posts/photo.jpg'))
+        with media_storage.open(name) as stored:
+            self.assertEqual(stored.read(), b'image')
+        self.assertNotEqual(self.save(b'other'), name)
+
+    def test_duplicates_stored_once(self):
+        first = self.save()
+        second = self.save(name='posts/copy.jpg')
+        self.assertEqual(first, second)
+        self.assertEqual(StoredFile.objects.get(name=first).refs, 2)
+        directory = os.path.dirname(media_storage.path(first))
+        self.assertEqual(os.listdir(directory),
+                         [os.path.basename(first)])
+
+    def test_file_removed_with_last_reference(self):
+        name = self.save()
+        self.save()
+        media_storage.delete(name)
+        self.assertTrue(media_storage.exists(name))
+        self.assertEqual(StoredFile.objects.get(name=name).refs, 1)
+        media_storage.delete(name)
+        self.assertFalse(media_storage.exists(name))
+        self.assertFalse(StoredFile.objects.exists())
+
+    def test_missing_file_rewritten(self):
+        name = self.save()
+        os.remove(media_storage.path(name))
+        self.save()
+        self.assertTrue(media_storage.exists(name))
+
+    def test_unknown_content_name_kept(self):
+        """Файл по содержимому без записи о ссылках не удаляется."""
+        name = self.save()
+        StoredFile.objects.all().delete()
+        media_storage.delete(name)
+        self.assertTrue(media_storage.exists(name))
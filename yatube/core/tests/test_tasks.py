@@ -0,0 +1,109 @@
+from datetime import timedelta
+
+from django.core import mail
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core import tasks
+from core.mail import QueuedEmailBackend
+from core.models import Task
+
+CALLS = []
+
+
+@tasks.task('test.single', max_attempts=2)
+def single(payload):
+    if payload.get('fail'):
+        raise ValueError('Ошибка задачи')
+    CALLS.append(payload['value'])
+
+
+@tasks.task('test.batch', batch=True)
+def batch(payloads):
+    CALLS.append([payload['value'] for payload in payloads])
+
+
+class TaskQueueTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        CALLS.clear()
+
+    def test_idempotency_key(self):
+        """Задача с тем же ключом не ставится повторно."""
+        tasks.enqueue('test.single', {'value': 1}, key='one')
+        tasks.enqueue('test.single', {'value': 1}, key='one')
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_priority_order(self):
+        """Задачи с большим приоритетом выполняются раньше."""
+        tasks.enqueue('test.single', {'value': 'low'})
+        tasks.enqueue('test.single', {'value': 'high'}, priority=5)
+        tasks.work()
+        self.assertEqual(CALLS, ['high', 'low'])
+
+    def test_batching(self):
+        """Однотипные задачи пакетного обработчика приходят пачкой."""
+        for value in range(3):
+            tasks.enqueue('test.batch', {'value': value})
+        self.assertEqual(tasks.work(batch_size=2), 2)
+        self.assertEqual(CALLS, [[0, 1], [2]])
+
+    def test_retry_with_backoff(self):
+        """Упавшая задача откладывается, после max_attempts — ошибка."""
+        job = tasks.enqueue('test.single', {'fail': True})
+        tasks.work()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Task.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        Task.objects.update(run_at=job.created)
+        tasks.work()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Task.FAILED)
+        metrics = tasks.queue_metrics()
+        self.assertEqual(metrics['processed']['test.single']['failed'], 2)
+
+    def test_abandoned_task_counts_attempts(self):
+        """Задача, уронившая процесс, не перезапускается бесконечно."""
+        job = tasks.enqueue('test.single', {'value': 1})
+        for _ in range(2):
+            name, claimed = tasks.claim('worker', 1)
+            self.assertEqual([task.pk for task in claimed], [job.pk])
+            # Процесс упал, захват устарел.
+            Task.objects.update(
+                locked_at=timezone.now() - timedelta(days=1))
+        self.assertEqual(tasks.claim('worker', 1), (None, []))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Task.FAILED, 2))
+
+    def test_claim_returns_only_locked(self):
+        job = tasks.enqueue('test.single', {'value': 1})
+        tasks.claim('first', 1)
+        self.assertEqual(tasks.claim('second', 1), (None, []))
+        job.refresh_from_db()
+        self.assertEqual(job.locked_by, 'first')
+
+    def test_metrics_from_table(self):
+        """Счётчики читаются из таблицы, а не из кэша процесса."""
+        tasks.enqueue('test.single', {'value': 1})
+        tasks.enqueue('test.single', {'value': 2})
+        tasks.work()
+        cache.clear()
+        counters = tasks.queue_metrics()['processed']['test.single']
+        self.assertEqual(counters['done'], 2)
+        self.assertEqual(counters['failed'], 0)
+        self.assertIsNotNone(counters['longest'])
+        self.assertEqual(tasks.queue_metrics()['processed']['test.batch'],
+                         {'done': 0, 'failed': 0, 'average': None,
+                          'longest': None})
+
+    @override_settings(
+        TASKS_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+    def test_queued_email(self):
+        """Письмо отправляется воркером, а не в запросе."""
+        mail.EmailMessage('Тема', 'Текст', 'a@a.ru', ['b@b.ru'],
+                          connection=QueuedEmailBackend()).send()
+        self.assertEqual(len(mail.outbox), 0)
+        tasks.work()
+        self.assertEqual(mail.outbox[0].subject, 'Тема')
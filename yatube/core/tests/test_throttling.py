@@ -0,0 +1,96 @@
+import os
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.throttling import (consume, get_cache, parse_rate, stats,
+                             throttle_stats)
+from posts.models import Comment, Follow, Post
+
+User = get_user_model()
+
+
+@override_settings(THROTTLE_RATES={
+    'posts:add_comment': '2/m',
+    'posts:profile_follow': '1/m',
+    'users:signup': '1/h',
+})
+class ThrottleTests(TestCase):
+
+    def setUp(self):
+        get_cache().clear()
+        stats.clear()
+        self.user = User.objects.create_user(username='user')
+        self.author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(author=self.author, text='Пост')
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        get_cache().clear()
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('20/m'), (20, 60))
+        self.assertEqual(parse_rate('3/hour'), (3, 3600))
+
+    def test_bucket_refills(self):
+        """Жетоны восполняются со временем, но не сверх ёмкости."""
+        # Подменяем часы только в core.throttling: сроки записей кэша
+        # считаются по настоящему времени.
+        with mock.patch('core.throttling.time',
+                        **{'time.return_value': 1000}):
+            self.assertEqual(consume('bucket', 2, 60), 0)
+            self.assertEqual(consume('bucket', 2, 60), 0)
+            self.assertEqual(consume('bucket', 2, 60), 30)
+        with mock.patch('core.throttling.time',
+                        **{'time.return_value': 1030}):
+            self.assertEqual(consume('bucket', 2, 60), 0)
+            self.assertEqual(consume('bucket', 2, 60), 30)
+
+    def test_buckets_shared_between_processes(self):
+        """Корзины лежат в файловом кэше, а не в памяти процесса или
+        в базе."""
+        with CaptureQueriesContext(connection) as queries:
+            consume('bucket', 2, 60)
+        self.assertFalse(queries.captured_queries)
+        self.assertEqual(len(os.listdir(get_cache()._dir)), 1)
+
+    def test_middleware_throttles_writes(self):
+        """Лишний комментарий отклоняется с 429 и Retry-After."""
+        url = reverse('posts:add_comment', kwargs={'post_id': self.post.pk})
+        for number in range(3):
+            response = self.client.post(url, {'text': f'Текст {number}'})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertEqual(Comment.objects.count(), 2)
+        self.assertEqual(throttle_stats()['posts:add_comment'],
+                         {'allowed': 2, 'throttled': 1})
+
+    def test_reads_are_not_throttled(self):
+        url = reverse('users:signup')
+        for _ in range(3):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_decorator_throttles_get_follow(self):
+        """Подписка по GET ограничивается декоратором, отдельно
+        для каждого пользователя."""
+        url = reverse('posts:profile_follow',
+                      kwargs={'username': self.author.username})
+        self.client.get(url)
+        self.assertEqual(self.client.get(url).status_code, 429)
+        other = User.objects.create_user(username='other')
+        self.client.force_login(other)
+        self.client.get(url)
+        self.assertEqual(Follow.objects.count(), 2)
+
+    def test_anonymous_throttled_by_ip(self):
+        self.client.logout()
+        url = reverse('users:signup')
+        self.client.post(url, REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(
+            self.client.post(url, REMOTE_ADDR='10.0.0.1').status_code, 429)
+        self.assertNotEqual(
+            self.client.post(url, REMOTE_ADDR='10.0.0.2').status_code, 429)
@@ -0,0 +1,46 @@
+import copy
+from unittest import mock
+
+from django.conf import settings
+from django.template import engines
+from django.template.base import Template
+from django.test import SimpleTestCase, override_settings
+
+from core.warmup import template_names, warm_templates, warm_up
+
+
+def cached_templates():
+    templates = copy.deepcopy(settings.TEMPLATES)
+    templates[0]['APP_DIRS'] = False
+    templates[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+    return templates
+
+
+@override_settings(TEMPLATES=cached_templates())
+class WarmupTests(SimpleTestCase):
+
+    def test_template_names(self):
+        names = template_names(engines['django'].engine)
+        for name in ('base.html', 'includes/header.html',
+                     'posts/index.html', 'posts/includes/post_list.html'):
+            self.assertIn(name, names)
+
+    def test_templates_are_not_compiled_after_warmup(self):
+        """После прогрева шаблоны берутся из кэша загрузчика без
+        разбора."""
+        self.assertGreater(warm_templates(), 0)
+        with mock.patch.object(Template, 'compile_nodelist') as compile:
+            engines['django'].engine.get_template('posts/index.html')
+            engines['django'].engine.get_template('includes/footer.html')
+        compile.assert_not_called()
+
+    @override_settings(TEMPLATE_WARMUP=False)
+    def test_warm_up_respects_setting(self):
+        with mock.patch('core.warmup.warm_templates') as warm:
+            warm_up()
+        warm.assert_not_called()
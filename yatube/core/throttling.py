@@ -0,0 +1,130 @@
+"""
+Ограничение частоты записывающих запросов алгоритмом token bucket.
+
+Для каждого ограничения (scope — имя URL вида 'posts:post_create') и
+клиента в кэше THROTTLE_CACHE хранится корзина: число жетонов и время
+последнего пересчёта. Жетоны восполняются равномерно до ёмкости
+корзины, каждый запрос забирает один. Клиент — авторизованный
+пользователь, а для анонимов — IP-адрес. Частоты задаются
+в THROTTLE_RATES строками вида '20/m': ёмкость корзины и период, за
+который она наполняется целиком.
+
+Кэш должен быть общим для всех процессов сервера (по умолчанию —
+файловый, не в базе, чтобы не добавлять запросам записей в SQLite):
+с LocMemCache каждый процесс считает жетоны отдельно и пропускает в N
+раз больше запросов. Чтение и запись корзины не
+атомарны, поэтому при одновременных запросах одного клиента лимит
+может быть превышен на несколько запросов; для защиты от спама этого
+достаточно.
+
+Счётчики пропущенных и отклонённых запросов (throttle_stats) ведутся
+в памяти процесса, без записи на каждый запрос; отклонённые запросы
+к тому же попадают в журнал.
+"""
+import logging
+import math
+import time
+from collections import Counter
+from functools import wraps
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import caches
+
+from core.views import too_many_requests
+
+logger = logging.getLogger(__name__)
+
+BUCKET_KEY = 'throttle:{}:{}'
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+# (scope, событие) -> число запросов этого процесса.
+stats = Counter()
+stats_lock = Lock()
+
+
+def parse_rate(rate):
+    """'20/m' -> (20, 60): ёмкость корзины и период в секундах."""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+def client_id(request):
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f'ip:{request.META.get("REMOTE_ADDR", "")}'
+
+
+def get_cache():
+    return caches[settings.THROTTLE_CACHE]
+
+
+def consume(key, capacity, period):
+    """Забирает жетон из корзины. Возвращает 0, если запрос разрешён,
+    иначе — через сколько секунд появится следующий жетон."""
+    now = time.time()
+    speed = capacity / period
+    cache = get_cache()
+    state = cache.get(key)
+    if state is None:
+        tokens = capacity
+    else:
+        tokens, updated = state
+        tokens = min(capacity, tokens + (now - updated) * speed)
+    wait = 0
+    if tokens >= 1:
+        tokens -= 1
+    else:
+        wait = math.ceil((1 - tokens) / speed)
+    cache.set(key, (tokens, now), period)
+    return wait
+
+
+def count_stat(scope, event):
+    with stats_lock:
+        stats[scope, event] += 1
+
+
+def check(request, scope):
+    """Возвращает ответ 429, если клиент исчерпал лимит scope, иначе
+    None. Ограничения без частоты в THROTTLE_RATES не действуют."""
+    rate = settings.THROTTLE_RATES.get(scope)
+    if rate is None:
+        return None
+    wait = consume(BUCKET_KEY.format(scope, client_id(request)),
+                   *parse_rate(rate))
+    if not wait:
+        count_stat(scope, 'allowed')
+        return None
+    count_stat(scope, 'throttled')
+    logger.warning('Запрос %s от %s отклонён, повтор через %s с',
+                   scope, client_id(request), wait)
+    return too_many_requests(request, wait)
+
+
+def throttle(scope, methods=None):
+    """Ограничивает частоту вызовов представления. Без methods
+    ограничиваются все запросы — для представлений, которые меняют данные
+    и по GET."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if methods is None or request.method in methods:
+                response = check(request, scope)
+                if response is not None:
+                    return response
+            return view(request, *args, **kwargs)
+        wrapper.throttle_scope = scope
+        return wrapper
+    return decorator
+
+
+def throttle_stats():
+    """Сколько запросов по каждому ограничению этот процесс пропустил
+    и отклонил."""
+    with stats_lock:
+        return {
+            scope: {event: stats[scope, event]
+                    for event in ('allowed', 'throttled')}
+            for scope in settings.THROTTLE_RATES
+        }
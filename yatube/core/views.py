@@ -15,3 +15,10 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=403)
+
+
+def too_many_requests(request, retry_after):
+    response = render(request, 'core/429.html',
+                      {'retry_after': retry_after}, status=429)
+    response['Retry-After'] = str(retry_after)
+    return response
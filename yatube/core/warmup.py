@@ -0,0 +1,144 @@
+"""
+Прогрев процесса и кэшей.
+
+С кэширующим загрузчиком (см. TEMPLATES в настройках) шаблон
+разбирается один раз на процесс, но этот раз приходится на первый
+запрос к странице: base.html, шапка, подвал и шаблоны постов
+компилируются, пока посетитель ждёт. warm_up() компилирует все шаблоны,
+которые видят загрузчики, до первого запроса.
+
+warm_pages() передаёт запросы к страницам обработчику Django с тем же
+Host и схемой, что у посетителей сайта (WARMUP_HOST, WARMUP_SCHEME):
+адрес входит в ключ страничного кэша, и с другим хостом прогретые
+записи никто бы не прочитал. Отрисовка заполняет страничный и
+фрагментный кэш и миниатюры. Кэш имеет смысл греть, только если он
+общий для процессов (memcached, redis, база); LocMemCache у каждого
+процесса свой, см. cache_is_shared().
+"""
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connections
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+from django.test.client import RequestFactory
+
+logger = logging.getLogger(__name__)
+
+# Темп запросов и адрес сайта для процесса, см. init_worker.
+pacing = {'interval': 0, 'next': 0, 'host': None, 'secure': False}
+# Обработчик запросов процесса создаётся при первом прогреве.
+handlers = {}
+
+TEMPLATE_SUFFIXES = ('.html', '.txt')
+# Бэкенды кэша, содержимое которых видит только один процесс.
+LOCAL_CACHES = ('django.core.cache.backends.locmem.LocMemCache',
+                'django.core.cache.backends.dummy.DummyCache')
+
+
+def template_names(engine):
+    """Имена всех шаблонов в каталогах загрузчиков движка."""
+    names = set()
+    for loader in engine.template_loaders:
+        # Кэширующий загрузчик оборачивает обычные.
+        for inner in getattr(loader, 'loaders', [loader]):
+            for directory in inner.get_dirs():
+                for root, _, files in os.walk(directory):
+                    names.update(
+                        os.path.relpath(os.path.join(root, name), directory)
+                        .replace(os.sep, '/')
+                        for name in files if name.endswith(TEMPLATE_SUFFIXES))
+    return sorted(names)
+
+
+def warm_templates():
+    """Компилирует все шаблоны движков Django. Без кэширующего загрузчика
+    это только проверка, что шаблоны разбираются. Возвращает число
+    скомпилированных шаблонов."""
+    compiled = 0
+    for backend in engines.all():
+        if not isinstance(backend, DjangoTemplates):
+            continue
+        for name in template_names(backend.engine):
+            try:
+                backend.engine.get_template(name)
+            except (TemplateDoesNotExist, TemplateSyntaxError):
+                logger.warning('Шаблон %s не скомпилирован', name,
+                               exc_info=True)
+            else:
+                compiled += 1
+    return compiled
+
+
+def warm_up():
+    """Вызывается при старте рабочего процесса."""
+    if not settings.TEMPLATE_WARMUP:
+        return
+    started = time.perf_counter()
+    compiled = warm_templates()
+    logger.info('Скомпилировано шаблонов: %s за %.2f с', compiled,
+                time.perf_counter() - started)
+
+
+def cache_is_shared(alias=None):
+    """Видят ли другие процессы записи кэша alias (по умолчанию —
+    кэша страниц)."""
+    alias = alias or settings.CACHE_MIDDLEWARE_ALIAS
+    return settings.CACHES[alias]['BACKEND'] not in LOCAL_CACHES
+
+
+def init_worker(interval, host, secure):
+    pacing.update(interval=interval, next=0, host=host, secure=secure)
+
+
+def render(url):
+    """Отрисовывает страницу обработчиком Django, как запрос посетителя
+    к pacing['host']. Возвращает код ответа."""
+    if 'wsgi' not in handlers:
+        handlers['wsgi'] = WSGIHandler()
+    request = RequestFactory().get(url, secure=pacing['secure'],
+                                   HTTP_HOST=pacing['host'])
+    response = handlers['wsgi'].get_response(request)
+    # Закрытие ответа отправляет request_finished, как после обычного
+    # запроса.
+    response.close()
+    return response.status_code
+
+
+def fetch(url):
+    """Запрашивает страницу не чаще раза в pacing['interval'] секунд.
+    Возвращает (url, код ответа, время в секундах)."""
+    delay = pacing['next'] - time.monotonic()
+    if delay > 0:
+        time.sleep(delay)
+    pacing['next'] = time.monotonic() + pacing['interval']
+    started = time.perf_counter()
+    try:
+        status = render(url)
+    except Exception:
+        logger.exception('Не удалось прогреть %s', url)
+        status = None
+    return url, status, time.perf_counter() - started
+
+
+def warm_pages(urls, processes=2, rate=10, host=None, scheme=None):
+    """Запрашивает страницы пулом из processes процессов (0 — в текущем
+    процессе), всего не больше rate запросов в секунду, от имени сайта
+    host со схемой scheme (по умолчанию WARMUP_HOST и WARMUP_SCHEME).
+    Возвращает список (url, код ответа, время)."""
+    interval = max(processes, 1) / rate if rate else 0
+    initargs = (interval, host or settings.WARMUP_HOST,
+                (scheme or settings.WARMUP_SCHEME) == 'https')
+    if not processes:
+        init_worker(*initargs)
+        return [fetch(url) for url in urls]
+    # Соединения с базой не должны переходить в дочерние процессы.
+    connections.close_all()
+    with ProcessPoolExecutor(processes, multiprocessing.get_context('fork'),
+                             init_worker, initargs) as pool:
+        return list(pool.map(fetch, urls))
@@ -1,9 +1,65 @@
 from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin
+from django.db.models import CASCADE, PROTECT
 
-from .models import Group, Post
+from .forms import AdminPostForm
+from .models import ArchivedPost, Group, Post, Purge, User
+from .purge import schedule_purge
 
 
-class PostAdmin(admin.ModelAdmin):
+def dependents(model, path=(), seen=()):
+    """Модели, записи которых удаляются (CASCADE) или защищены (PROTECT)
+    при удалении записей model: тройки (модель, путь до model для
+    фильтра, on_delete)."""
+    seen = seen + (model,)
+    for relation in model._meta.related_objects:
+        if relation.on_delete not in (CASCADE, PROTECT):
+            continue
+        related = relation.related_model
+        related_path = (relation.field.name,) + path
+        yield related, related_path, relation.on_delete
+        if relation.on_delete is CASCADE and related not in seen:
+            yield from dependents(related, related_path, seen)
+
+
+class PurgeOnDeleteMixin:
+    """Удаление из админки только скрывает объект и ставит его в очередь
+    purge_deleted, без сбора всех связанных записей в память.
+
+    Права проверяются, как у обычного удаления: на каждую
+    зарегистрированную в админке модель зависимых записей, если такие
+    записи есть. Для этого хватает запроса EXISTS на модель."""
+
+    def get_deleted_objects(self, objs, request):
+        pks = [obj.pk for obj in objs]
+        perms_needed, protected = set(), []
+        for model, path, on_delete in dependents(self.model):
+            model_admin = self.admin_site._registry.get(model)
+            if on_delete is CASCADE and (
+                    model_admin is None
+                    or model_admin.has_delete_permission(request)):
+                continue
+            related = model._default_manager.filter(
+                **{'__'.join(path + ('in',)): pks})
+            if not related.exists():
+                continue
+            if on_delete is PROTECT:
+                protected.extend(str(obj) for obj in related[:10])
+            else:
+                perms_needed.add(model._meta.verbose_name)
+        return [str(obj) for obj in objs], {}, perms_needed, protected
+
+    def delete_model(self, request, obj):
+        schedule_purge(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            schedule_purge(obj)
+
+
+class PostAdmin(PurgeOnDeleteMixin, admin.ModelAdmin):
+    # Картинки из админки обрабатываются так же, как с сайта.
+    form = AdminPostForm
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
     list_editable = ('group',)
     search_fields = ('text',)
@@ -11,7 +67,30 @@ class PostAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
+class ArchivedPostAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'text', 'pub_date', 'author', 'group', 'archived')
+    search_fields = ('text',)
+    list_filter = ('pub_date',)
+    empty_value_display = '-пусто-'
+
+
+class PurgeUserAdmin(PurgeOnDeleteMixin, UserAdmin):
+    pass
+
+
+class PurgeAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'kind', 'object_id', 'created', 'finished',
+                    'deleted')
+    list_filter = ('kind', 'finished')
+    readonly_fields = ('kind', 'object_id', 'created', 'finished', 'deleted')
+    empty_value_display = '-пусто-'
+
+
 admin.site.register(Post, PostAdmin)
+admin.site.register(ArchivedPost, ArchivedPostAdmin)
+admin.site.register(Purge, PurgeAdmin)
+admin.site.unregister(User)
+admin.site.register(User, PurgeUserAdmin)
 
 
 admin.site.register(Group)
@@ -0,0 +1,137 @@
+"""
+Архив старых постов.
+
+Посты старше POSTS_ARCHIVE_DAYS вместе с комментариями переносятся
+в ArchivedPost/ArchivedComment, так что ленты работают только с небольшой
+таблицей Post. Страница поста, профиль и поиск читают обе таблицы через
+функции этого модуля.
+
+Перед переносом в базу записываются буферы счётчиков: журнал отметок
+LikeDelta и просмотры из памяти процесса, — иначе их приращения
+пропали бы вместе с удалённым постом. Приращения, записанные позже
+(например, из другого процесса), попадают в ArchivedPost (см.
+posts.counters.increment). Сами отметки Like, оценки популярного и
+карточка ленты удаляются: число отметок остаётся в ArchivedPost.likes,
+а ленты и популярное показывают только живые посты.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404
+from django.utils import timezone
+
+from .counters import view_counter
+from .likes import fold_likes
+from .models import (ArchivedComment, ArchivedPost, Comment, Like, Post,
+                     PostCard, Purge, TrendingRank, TrendingScore)
+from .purge import hidden_ids, visible
+from .readmodel import CardList
+
+POST_FIELDS = ('id', 'text', 'pub_date', 'author_id', 'group_id', 'image',
+               'image_width', 'image_height', 'image_bytes', 'views', 'likes')
+COMMENT_FIELDS = ('id', 'post_id', 'author_id', 'text', 'created')
+# Записи, которые не переносятся в архив, а удаляются вместе с постом.
+DROPPED = ((Like, 'post_id'), (TrendingScore, 'post_id'),
+           (TrendingRank, 'post_id'), (PostCard, 'pk'))
+
+
+class Timeline:
+    """Живые посты, затем архивные, как одна последовательность для
+    Paginator.
+
+    В архив уходят только посты старше порога, поэтому склейка двух
+    выборок, каждая по -pub_date, сохраняет общий порядок. Старые посты
+    из выгрузки import_posts сразу переносит в архив, чтобы не нарушить
+    это.
+    """
+    ordered = True
+
+    def __init__(self, *querysets):
+        self.querysets = querysets
+        self._counts = None
+
+    def counts(self):
+        if self._counts is None:
+            self._counts = [queryset.count() for queryset in self.querysets]
+        return self._counts
+
+    def count(self):
+        return sum(self.counts())
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        stop = self.count() if index.stop is None else index.stop
+        result = []
+        for queryset, size in zip(self.querysets, self.counts()):
+            if start < size and stop > 0:
+                result.extend(queryset[max(start, 0):min(stop, size)])
+            start -= size
+            stop -= size
+        return result
+
+
+def get_post_or_404(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None:
+        post = ArchivedPost.objects.filter(pk=post_id).first()
+    hidden = hidden_ids()
+    if (post is None or post.pk in hidden[Purge.POST]
+            or post.author_id in hidden[Purge.USER]):
+        raise Http404('Пост не найден')
+    return post
+
+
+def author_posts(author):
+    return Timeline(
+        CardList(visible(PostCard.objects.filter(author_id=author.pk))),
+        visible(ArchivedPost.objects.filter(author=author)
+                .select_related('author', 'group')))
+
+
+def search_posts(query):
+    return Timeline(
+        CardList(visible(PostCard.objects.filter(text__icontains=query))),
+        visible(ArchivedPost.objects.filter(text__icontains=query)
+                .select_related('author', 'group')))
+
+
+def archive_cutoff(days=None):
+    """Посты, опубликованные раньше этого момента, уходят в архив."""
+    if days is None:
+        days = settings.POSTS_ARCHIVE_DAYS
+    return timezone.now() - timedelta(days=days)
+
+
+def archive_posts(days=None, batch_size=500):
+    """Переносит старые посты с комментариями в архив, по пачке
+    в транзакции. Возвращает число перенесённых постов."""
+    cutoff = archive_cutoff(days)
+    view_counter.flush()
+    fold_likes()
+    moved = 0
+    while True:
+        with transaction.atomic():
+            posts = list(Post.objects.filter(pub_date__lt=cutoff)
+                         .order_by('pk').values(*POST_FIELDS)[:batch_size])
+            if not posts:
+                return moved
+            ids = [post['id'] for post in posts]
+            ArchivedPost.objects.bulk_create(
+                ArchivedPost(**post) for post in posts)
+            comments = Comment.objects.filter(post_id__in=ids)
+            ArchivedComment.objects.bulk_create(
+                (ArchivedComment(**comment)
+                 for comment in comments.values(*COMMENT_FIELDS).iterator()),
+                batch_size=batch_size)
+            comments.delete()
+            # Удаляем зависимые записи явно, а не каскадом от Post.
+            for model, field in DROPPED:
+                model.objects.filter(**{f'{field}__in': ids}).delete()
+            Post.objects.filter(pk__in=ids).delete()
+        moved += len(posts)
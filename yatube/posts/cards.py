@@ -0,0 +1,52 @@
+"""
+Кэш карточек постов.
+
+Карточка (автор, дата, картинка, текст, ссылки) одинакова на главной,
+в группе, профиле, ленте подписок и в популярном. Готовый HTML хранится
+в кэше под ключом из id поста, его updated_at и версий автора и группы,
+поэтому правка любого из них просто даёт новый ключ, а старая запись
+вытесняется сама. Версии автора и группы — контрольные суммы полей,
+которые попадают в карточку, так что для них не нужны ни запросы, ни
+отдельные ключи: вся страница читается одним get_many. Счётчики и
+отметка «нравится» меняются часто и рисуются вне кэша.
+"""
+import zlib
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+CARD_TEMPLATE = 'includes/post_card.html'
+# Увеличивается при изменении разметки карточки.
+CARD_LAYOUT = 3
+CARD_TIMEOUT = 24 * 60 * 60
+
+
+def fields_version(*values):
+    return zlib.crc32('\x00'.join(map(str, values)).encode())
+
+
+def card_key(post):
+    version = getattr(post, 'updated_at', None) or post.archived
+    author, group = post.author, post.group
+    # У постов из posts.readmodel полное имя автора хранится в самом посте.
+    name = getattr(post, 'author_name', None) or author.get_full_name()
+    return 'card:{}:{}:{}:{}:{}:{}'.format(
+        CARD_LAYOUT, post._meta.model_name, post.pk,
+        version.timestamp(),
+        fields_version(author.username, name),
+        group and fields_version(group.slug, group.title))
+
+
+def render_cards(posts):
+    """Пары (пост, HTML карточки): готовые берутся из кэша одним
+    get_many, недостающие рисуются и кладутся одним set_many."""
+    posts = list(posts)
+    keys = [card_key(post) for post in posts]
+    cards = cache.get_many(keys)
+    missing = {key: render_to_string(CARD_TEMPLATE, {'post': post})
+               for key, post in zip(keys, posts) if key not in cards}
+    if missing:
+        cache.set_many(missing, CARD_TIMEOUT)
+        cards.update(missing)
+    return [(post, mark_safe(cards[key])) for key, post in zip(keys, posts)]
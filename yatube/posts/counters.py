@@ -0,0 +1,135 @@
+"""
+Счётчики просмотров постов.
+
+UPDATE на каждый просмотр выстроил бы всех читателей в очередь за
+блокировкой записи SQLite. Поэтому просмотры копятся в памяти процесса
+и записываются одним UPDATE ... CASE на всю пачку: при FLUSH_SIZE разных
+постах в буфере — сразу, иначе — фоновым потоком рабочего процесса
+раз в FLUSH_SECONDS секунд, даже если новых просмотров нет. При падении
+процесса теряются только просмотры, не успевшие попасть в базу, — не
+больше чем за FLUSH_SECONDS секунд. Если запись не удалась, приращения
+возвращаются в буфер до следующей попытки. Остаток буфера записывается
+при штатном завершении процесса.
+
+После записи отправляется сигнал views_flushed с приращениями, по
+которому, например, posts.trending учитывает просмотры в популярном.
+"""
+import atexit
+import logging
+import os
+import time
+from collections import defaultdict
+from threading import Lock, Thread
+
+from django.db import connections
+from django.db.models import Case, F, IntegerField, Value, When
+from django.dispatch import Signal
+
+from .models import ArchivedPost, Post, PostCard
+
+logger = logging.getLogger(__name__)
+
+FLUSH_SIZE = 100
+FLUSH_SECONDS = 10
+
+views_flushed = Signal(providing_args=['views'])
+
+
+def increment(field, deltas):
+    """Прибавляет к счётчику field постов и их карточек приращения
+    {post_id: delta} одним UPDATE на таблицу. Посты, которые успели
+    уйти в архив, получают приращение в ArchivedPost."""
+    if not deltas:
+        return
+    change = {field: F(field) + Case(
+        *(When(pk=post_id, then=Value(delta))
+          for post_id, delta in deltas.items()),
+        output_field=IntegerField())}
+    updated = Post.objects.filter(pk__in=deltas).update(**change)
+    PostCard.objects.filter(pk__in=deltas).update(**change)
+    if updated < len(deltas):
+        ArchivedPost.objects.filter(pk__in=deltas).update(**change)
+
+
+class ViewCounter:
+
+    def __init__(self, interval=FLUSH_SECONDS):
+        self.lock = Lock()
+        self.views = defaultdict(int)
+        self.started = time.monotonic()
+        self.interval = interval
+        self.timer_pid = None
+
+    def add(self, post_id):
+        # Поток записи не переживает fork: запускаем его заново в
+        # дочернем процессе.
+        if self.timer_pid not in (None, os.getpid()):
+            self.start_timer()
+        with self.lock:
+            self.views[post_id] += 1
+            due = (len(self.views) >= FLUSH_SIZE
+                   or time.monotonic() - self.started >= self.interval)
+        if due:
+            self.flush()
+
+    def start_timer(self):
+        """Запускает поток записи буфера по времени, вызывается при старте
+        рабочего процесса (см. yatube/wsgi.py)."""
+        if self.timer_pid == os.getpid():
+            return
+        with self.lock:
+            if self.timer_pid == os.getpid():
+                return
+            self.timer_pid = os.getpid()
+        Thread(target=self.run_timer, name='view-counter',
+               daemon=True).start()
+
+    def run_timer(self):
+        while True:
+            delay = self.started + self.interval - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+                continue
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Не удалось записать просмотры')
+                time.sleep(self.interval)
+            finally:
+                # Соединение потока не должно висеть между записями.
+                connections.close_all()
+
+    def pending(self, post_id):
+        return self.views.get(post_id, 0)
+
+    def flush(self):
+        """Записывает накопленные приращения одним UPDATE."""
+        with self.lock:
+            views, self.views = self.views, defaultdict(int)
+            self.started = time.monotonic()
+        if not views:
+            return views
+        try:
+            increment('views', views)
+        except Exception:
+            with self.lock:
+                for post_id, count in views.items():
+                    self.views[post_id] += count
+            raise
+        views_flushed.send(Post, views=dict(views))
+        return views
+
+
+view_counter = ViewCounter()
+
+
+@atexit.register
+def flush_on_exit():
+    try:
+        view_counter.flush()
+    except Exception:
+        logger.exception('Не удалось записать просмотры при завершении')
+
+
+def record_view(post):
+    view_counter.add(post.pk)
@@ -0,0 +1,103 @@
+"""
+Лента подписок: посты авторов и сообществ, на которые подписан
+пользователь.
+
+Условие «автор в подписках ИЛИ сообщество в подписках» заставляет SQLite
+просматривать всю таблицу, а author_id IN (...) — собирать посты всех
+авторов и сортировать их. Вместо этого каждый автор и каждое сообщество
+читаются отдельным запросом к PostCard по своему индексу ((author_id,
+-pub_date) и (group_id, -pub_date)): такой запрос уже упорядочен
+по (-pub_date, -id) и останавливается после size + 1 строк, а потоки
+сливаются кучей (heapq.merge). Пост, попавший в несколько потоков,
+показывается один раз. Страницы листаются курсором — позицией последнего
+показанного поста, поэтому глубокие страницы не дороже первой.
+
+Когда подписок больше MAX_SOURCES, запросов на страницу стало бы
+слишком много; тогда авторы и сообщества читаются двумя потоками
+с IN и сортировкой.
+"""
+import heapq
+from datetime import datetime, timedelta, timezone
+
+from django.db.models import Q
+
+from .models import Follow, GroupFollow, PostCard
+from .purge import visible
+from .readmodel import CARD_FIELDS, as_posts
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# Больше источников — один поток на авторов и один на сообщества.
+MAX_SOURCES = 30
+
+
+def encode_cursor(post):
+    micros = (post.pub_date - EPOCH) // timedelta(microseconds=1)
+    return f'{micros}.{post.pk}'
+
+
+def decode_cursor(cursor):
+    """Возвращает (pub_date, id) или None для неверного курсора."""
+    try:
+        micros, pk = map(int, cursor.split('.'))
+    except (AttributeError, ValueError):
+        return None
+    return EPOCH + timedelta(microseconds=micros), pk
+
+
+def sort_key(post):
+    return post.pub_date, post.pk
+
+
+def feed_sources(user):
+    """Потоки постов по источникам подписок пользователя."""
+    authors = list(Follow.objects.filter(user=user)
+                   .values_list('author_id', flat=True))
+    groups = list(GroupFollow.objects.filter(user=user)
+                  .values_list('group_id', flat=True))
+    if len(authors) + len(groups) <= MAX_SOURCES:
+        return ([PostCard.objects.filter(author_id=author_id)
+                 for author_id in authors]
+                + [PostCard.objects.filter(group_id=group_id)
+                   for group_id in groups])
+    sources = []
+    if authors:
+        sources.append(PostCard.objects.filter(author_id__in=authors))
+    if groups:
+        sources.append(PostCard.objects.filter(group_id__in=groups))
+    return sources
+
+
+def merge_streams(streams, size):
+    """Сливает потоки, отсортированные по убыванию (pub_date, id), и
+    возвращает до size постов без повторов."""
+    result = []
+    last = None
+    for post in heapq.merge(*streams, key=sort_key, reverse=True):
+        if post.pk == last:
+            continue
+        last = post.pk
+        result.append(post)
+        if len(result) == size:
+            break
+    return result
+
+
+def feed_page(user, cursor=None, size=10):
+    """Страница ленты после курсора и курсор следующей страницы (None,
+    если это последняя)."""
+    position = decode_cursor(cursor) if cursor else None
+    streams = []
+    for source in feed_sources(user):
+        posts = visible(source)
+        if position:
+            pub_date, pk = position
+            posts = posts.filter(Q(pub_date__lt=pub_date)
+                                 | Q(pub_date=pub_date, pk__lt=pk))
+        # Первые size + 1 уникальных постов ленты заведомо лежат среди
+        # первых size + 1 постов каждого потока.
+        streams.append(as_posts(posts.order_by('-pub_date', '-pk')
+                                .values(*CARD_FIELDS)[:size + 1]))
+    posts = merge_streams(streams, size + 1)
+    if len(posts) > size:
+        return posts[:size], encode_cursor(posts[size - 1])
+    return posts, None
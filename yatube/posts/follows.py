@@ -0,0 +1,105 @@
+"""
+Подписки на авторов и сообщества.
+
+Подписка — одна вставка INSERT ... ON CONFLICT DO NOTHING по уникальному
+ключу (user, author), отписка — один DELETE. Обе операции возвращают,
+изменилось ли состояние, и только тогда отправляют сигналы followed и
+unfollowed, по которым обновляется граф подписок posts.graph.
+"""
+from django.db import connections, router, transaction
+from django.dispatch import Signal
+
+from .models import Follow, GroupFollow, Suggestion
+
+followed = Signal(providing_args=['user_id', 'author_ids'])
+unfollowed = Signal(providing_args=['user_id', 'author_ids'])
+
+
+def insert_ignore(model, **values):
+    """Вставляет строку, если её ещё нет по уникальному ключу. Возвращает
+    True, если строка добавлена."""
+    connection = connections[router.db_for_write(model)]
+    ops, quote = connection.ops, connection.ops.quote_name
+    fields = [model._meta.get_field(name) for name in values]
+    sql = '{} {} ({}) VALUES ({}) {}'.format(
+        ops.insert_statement(ignore_conflicts=True),
+        quote(model._meta.db_table),
+        ', '.join(quote(field.column) for field in fields),
+        ', '.join(['%s'] * len(fields)),
+        ops.ignore_conflicts_suffix_sql(ignore_conflicts=True))
+    params = [field.get_db_prep_save(value, connection)
+              for field, value in zip(fields, values.values())]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount == 1
+
+
+def follow(user, author):
+    if user.pk == author.pk or not insert_ignore(
+            Follow, user_id=user.pk, author_id=author.pk):
+        return False
+    followed.send(Follow, user_id=user.pk, author_ids=[author.pk])
+    return True
+
+
+def unfollow(user, author):
+    deleted, _ = Follow.objects.filter(user=user, author=author).delete()
+    if not deleted:
+        return False
+    unfollowed.send(Follow, user_id=user.pk, author_ids=[author.pk])
+    return True
+
+
+def follow_many(user, authors):
+    """Подписывает на всех авторов одной транзакцией. Возвращает id
+    авторов, подписка на которых действительно добавлена."""
+    ids = {author.pk for author in authors} - {user.pk}
+    with transaction.atomic(using=router.db_for_write(Follow)):
+        existing = set(Follow.objects.filter(
+            user=user, author_id__in=ids).values_list('author_id', flat=True))
+        added = sorted(ids - existing)
+        Follow.objects.bulk_create(
+            [Follow(user=user, author_id=author_id) for author_id in added],
+            ignore_conflicts=True)
+    if added:
+        followed.send(Follow, user_id=user.pk, author_ids=added)
+    return added
+
+
+def unfollow_many(user, authors):
+    """Отписывает от всех авторов одной транзакцией. Возвращает id
+    авторов, подписка на которых действительно удалена."""
+    ids = {author.pk for author in authors}
+    subscriptions = Follow.objects.filter(user=user, author_id__in=ids)
+    with transaction.atomic(using=router.db_for_write(Follow)):
+        removed = sorted(subscriptions.values_list('author_id', flat=True))
+        subscriptions.filter(author_id__in=removed).delete()
+    if removed:
+        unfollowed.send(Follow, user_id=user.pk, author_ids=removed)
+    return removed
+
+
+def follow_group(user, group):
+    return insert_ignore(GroupFollow, user_id=user.pk, group_id=group.pk)
+
+
+def unfollow_group(user, group):
+    deleted, _ = GroupFollow.objects.filter(user=user, group=group).delete()
+    return bool(deleted)
+
+
+def suggestions(user, limit=5):
+    """Рекомендованные авторы одним запросом, без тех, на кого
+    пользователь подписался после расчёта. Без своих рекомендаций —
+    самые читаемые авторы."""
+    if not user.is_authenticated:
+        return []
+    own = list(Suggestion.objects.filter(user=user)
+               .exclude(author__following__user=user)
+               .select_related('author')[:limit])
+    if own:
+        return own
+    return list(Suggestion.objects.filter(user=None)
+                .exclude(author=user)
+                .exclude(author__following__user=user)
+                .select_related('author')[:limit])
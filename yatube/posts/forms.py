@@ -1,16 +1,40 @@
 from xml.etree.ElementTree import Comment
 
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image
 
+from .images import normalize_image
 from .models import Comment, Post
 
 
-class PostForm(forms.ModelForm):
+class NormalizedImageMixin:
+    """Обрабатывает загруженную картинку поста (posts.images)."""
+
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        # Новая загрузка приходит как UploadedFile, прежняя картинка —
+        # как FieldFile.
+        if not isinstance(image, UploadedFile):
+            return image
+        try:
+            return normalize_image(image)
+        except (OSError, Image.DecompressionBombError):
+            raise forms.ValidationError('Не удалось обработать картинку.')
+
+
+class PostForm(NormalizedImageMixin, forms.ModelForm):
     class Meta:
         model = Post
         fields = ('group', 'text', 'image')
 
 
+class AdminPostForm(NormalizedImageMixin, forms.ModelForm):
+    class Meta:
+        model = Post
+        fields = '__all__'
+
+
 class CommentForm(forms.ModelForm):
     class Meta:
         model = Comment
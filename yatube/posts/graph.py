@@ -0,0 +1,165 @@
+"""
+Граф подписок в памяти процесса.
+
+Для каждого пользователя хранятся отсортированные массивы id авторов,
+на которых он подписан, и id его подписчиков (array('i')), так что
+проверка подписки — бинарный поиск, а взаимные подписки — слияние двух
+отсортированных массивов, без запросов к базе.
+
+Подписки и отписки этого процесса применяются сразу по сигналам
+posts.follows и записываются в FollowLog. Остальные процессы не чаще
+раза в FOLLOW_GRAPH_SYNC секунд дочитывают журнал с последней
+прочитанной записи, а раз в FOLLOW_GRAPH_REBUILD секунд граф строится
+заново, чтобы учесть изменения в обход журнала (например, удаление
+пользователя) и чтобы старые записи журнала можно было удалять.
+
+Первый раз граф строится при старте рабочего процесса (см.
+yatube/wsgi.py), а не первым запросом. Старые записи журнала удаляет
+команда prune_follow_log: запросы граф только читают.
+"""
+import time
+from array import array
+from bisect import bisect_left
+from datetime import timedelta
+from threading import Lock
+
+from django.conf import settings
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .follows import followed, unfollowed
+from .models import Follow, FollowLog
+
+EMPTY = array('i')
+
+
+def contains(values, value):
+    position = bisect_left(values, value)
+    return position < len(values) and values[position] == value
+
+
+def intersect(first, second):
+    """Пересечение двух отсортированных массивов слиянием."""
+    result = []
+    i = j = 0
+    while i < len(first) and j < len(second):
+        if first[i] < second[j]:
+            i += 1
+        elif first[i] > second[j]:
+            j += 1
+        else:
+            result.append(first[i])
+            i += 1
+            j += 1
+    return result
+
+
+class FollowGraph:
+
+    def __init__(self):
+        self.lock = Lock()
+        self.following = {}
+        self.followers = {}
+        self.last_log = 0
+        self.built = None
+        self.synced = None
+
+    def reset(self):
+        with self.lock:
+            self.following, self.followers = {}, {}
+            self.last_log = 0
+            self.built = self.synced = None
+
+    def build(self):
+        """Загружает все подписки заново."""
+        last_log = (FollowLog.objects.order_by('-pk')
+                    .values_list('pk', flat=True).first() or 0)
+        following, followers = {}, {}
+        edges = (Follow.objects.order_by('user_id', 'author_id')
+                 .values_list('user_id', 'author_id').iterator())
+        for user_id, author_id in edges:
+            following.setdefault(user_id, array('i')).append(author_id)
+            followers.setdefault(author_id, array('i')).append(user_id)
+        for values in followers.values():
+            values[:] = array('i', sorted(values))
+        with self.lock:
+            self.following, self.followers = following, followers
+            self.last_log = last_log
+            self.built = self.synced = time.monotonic()
+
+    def sync(self):
+        now = time.monotonic()
+        if (self.built is None
+                or now - self.built > settings.FOLLOW_GRAPH_REBUILD):
+            self.build()
+        elif now - self.synced > settings.FOLLOW_GRAPH_SYNC:
+            changes = list(FollowLog.objects.filter(pk__gt=self.last_log)
+                           .order_by('pk')
+                           .values_list('pk', 'user_id', 'author_id',
+                                        'followed'))
+            with self.lock:
+                for pk, user_id, author_id, is_followed in changes:
+                    self.apply(user_id, author_id, is_followed)
+                    self.last_log = pk
+                self.synced = now
+
+    def apply(self, user_id, author_id, is_followed):
+        """Добавляет или убирает ребро; повторное применение ничего не
+        меняет."""
+        for index, key, value in ((self.following, user_id, author_id),
+                                  (self.followers, author_id, user_id)):
+            values = index.setdefault(key, array('i'))
+            position = bisect_left(values, value)
+            present = position < len(values) and values[position] == value
+            if is_followed and not present:
+                values.insert(position, value)
+            elif not is_followed and present:
+                del values[position]
+
+    def is_following(self, user_id, author_id):
+        self.sync()
+        return contains(self.following.get(user_id, EMPTY), author_id)
+
+    def mutuals(self, user_id):
+        """id тех, с кем пользователь подписан друг на друга."""
+        self.sync()
+        return intersect(self.following.get(user_id, EMPTY),
+                         self.followers.get(user_id, EMPTY))
+
+    def counts(self, user_id):
+        self.sync()
+        return {'followers': len(self.followers.get(user_id, EMPTY)),
+                'following': len(self.following.get(user_id, EMPTY))}
+
+
+follow_graph = FollowGraph()
+
+
+def prune_log():
+    """Удаляет записи журнала, которые все процессы уже учли, построив
+    граф заново. Возвращает число удалённых записей."""
+    deleted, _ = FollowLog.objects.filter(
+        created__lt=timezone.now() - timedelta(
+            seconds=2 * settings.FOLLOW_GRAPH_REBUILD)).delete()
+    return deleted
+
+
+def record(user_id, author_ids, is_followed):
+    FollowLog.objects.bulk_create(
+        FollowLog(user_id=user_id, author_id=author_id, followed=is_followed)
+        for author_id in author_ids)
+    if follow_graph.built is None:
+        return
+    with follow_graph.lock:
+        for author_id in author_ids:
+            follow_graph.apply(user_id, author_id, is_followed)
+
+
+@receiver(followed)
+def record_follow(sender, user_id, author_ids, **kwargs):
+    record(user_id, author_ids, True)
+
+
+@receiver(unfollowed)
+def record_unfollow(sender, user_id, author_ids, **kwargs):
+    record(user_id, author_ids, False)
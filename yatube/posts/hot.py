@@ -0,0 +1,97 @@
+"""
+Самые востребованные страницы — цели для команды warm_cache.
+
+Если есть журнал доступа веб-сервера, цели — самые частые успешные
+GET-запросы из него. Иначе они выводятся из активности в PostCard за
+последние дни: первые страницы главной, групп и профилей, где больше
+всего свежих постов, просмотров, комментариев и отметок, и популярное.
+Ленты подписок личные и не прогреваются.
+
+Из журнала берутся только адреса лент из WARM_VIEWS. Страница поста
+не кэшируется целиком, а её запрос засчитал бы просмотр и событие
+популярного; прочие адреса могут что-то менять и по GET (подписка,
+выгрузка).
+"""
+import math
+import re
+from collections import Counter
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.db.models import (Count, ExpressionWrapper, F, IntegerField,
+                              Sum)
+from django.urls import Resolver404, resolve, reverse
+from django.utils import timezone
+
+from .models import PostCard
+from .purge import visible
+from .views import PAGES
+
+# Запрос и код ответа в строке журнала формата common/combined.
+LOG_LINE = re.compile(r'"GET (?P<path>\S+) HTTP/[\d.]+" (?P<status>\d{3}) ')
+SKIP_PREFIXES = ('/static/', '/media/', '/admin/', '/auth/', '/__debug__/')
+# Ленты, которые стоит прогревать.
+WARM_VIEWS = {'posts:index', 'posts:group_list', 'posts:profile',
+              'posts:trending', 'posts:trending_group'}
+
+
+def is_warm_target(path):
+    if path.startswith(SKIP_PREFIXES):
+        return False
+    try:
+        match = resolve(urlsplit(path).path)
+    except Resolver404:
+        return False
+    return match.view_name in WARM_VIEWS
+
+
+def log_targets(lines, limit):
+    """Самые частые успешные GET-запросы журнала к лентам. Возвращает
+    адреса и долю запросов к страницам сайта, которую они покрывают."""
+    hits = Counter()
+    for line in lines:
+        match = LOG_LINE.search(line)
+        if match and match['status'] == '200':
+            hits[match['path']] += 1
+    total = sum(count for path, count in hits.items()
+                if not path.startswith(SKIP_PREFIXES))
+    top = [(path, count) for path, count in hits.most_common()
+           if is_warm_target(path)][:limit]
+    return [path for path, _ in top], (
+        sum(count for _, count in top) / total if total else 0)
+
+
+def page_urls(url, posts, pages):
+    count = min(pages, max(math.ceil(posts / PAGES), 1))
+    return [url] + [f'{url}?page={number}' for number in range(2, count + 1)]
+
+
+def most_active(cards, field, limit):
+    """Значения field с наибольшей активностью: числом постов плюс их
+    просмотрами, комментариями и отметками."""
+    rows = (cards.order_by().values(field)
+            .annotate(activity=ExpressionWrapper(
+                Count('pk') + Sum(F('views') + F('comments') + F('likes')),
+                output_field=IntegerField()))
+            .order_by('-activity')[:limit])
+    return [row[field] for row in rows]
+
+
+def hot_targets(pages=3, groups=10, profiles=10, days=7):
+    """Адреса первых pages страниц главной, самых активных за days дней
+    групп и профилей и популярного."""
+    cards = visible(PostCard.objects.all())
+    recent = cards.filter(pub_date__gte=timezone.now() - timedelta(days=days))
+    urls = page_urls(reverse('posts:index'), cards.count(), pages)
+    urls.append(reverse('posts:trending'))
+    for field, limit, name in (('group_slug', groups, 'posts:group_list'),
+                               ('author_username', profiles,
+                                'posts:profile')):
+        top = most_active(recent.exclude(**{field: ''}), field, limit)
+        totals = dict(cards.filter(**{f'{field}__in': top}).order_by()
+                      .values(field).annotate(count=Count('pk'))
+                      .values_list(field, 'count'))
+        for value in top:
+            urls.extend(page_urls(reverse(name, args=[value]),
+                                  totals.get(value, 0), pages))
+    return urls
@@ -0,0 +1,67 @@
+"""
+Обработка картинок постов при загрузке.
+
+Фото с телефона весит несколько мегабайт, хранит EXIF (с координатами)
+и часто повёрнуто только тегом Orientation. normalize_image поворачивает
+картинку по этому тегу, уменьшает её до POST_IMAGE_MAX_SIZE по большей
+стороне и пережимает: непрозрачные — в прогрессивный JPEG, прозрачные —
+в WebP (или PNG, если Pillow собран без WebP). Метаданные, кроме
+цветового профиля, не сохраняются. Анимированные картинки остаются
+как есть.
+
+Ширина, высота и размер итогового файла записываются в пост (см.
+Post.save), чтобы шаблоны выводили width/height без чтения файла.
+"""
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.images import get_image_dimensions
+from PIL import Image, ImageOps, features
+
+WEBP = features.check('webp')
+
+
+def has_alpha(image):
+    return image.mode in ('RGBA', 'LA', 'PA') or (
+        image.mode == 'P' and 'transparency' in image.info)
+
+
+def normalize_image(file):
+    """Возвращает обработанную копию загруженной картинки как
+    ContentFile или сам file для анимации."""
+    file.seek(0)
+    with Image.open(file) as image:
+        if getattr(image, 'is_animated', False):
+            file.seek(0)
+            return file
+        icc_profile = image.info.get('icc_profile')
+        image = ImageOps.exif_transpose(image)
+        limit = settings.POST_IMAGE_MAX_SIZE
+        image.thumbnail((limit, limit), Image.LANCZOS)
+        buffer = BytesIO()
+        if not has_alpha(image):
+            extension = '.jpg'
+            image.convert('RGB').save(
+                buffer, 'JPEG', quality=settings.POST_IMAGE_QUALITY,
+                optimize=True, progressive=True, icc_profile=icc_profile)
+        elif WEBP:
+            extension = '.webp'
+            image.convert('RGBA').save(
+                buffer, 'WEBP', quality=settings.POST_IMAGE_QUALITY,
+                method=6, icc_profile=icc_profile)
+        else:
+            extension = '.png'
+            image.save(buffer, 'PNG', optimize=True,
+                       icc_profile=icc_profile)
+    name = os.path.splitext(os.path.basename(file.name))[0] + extension
+    return ContentFile(buffer.getvalue(), name=name)
+
+
+def image_meta(image):
+    """(ширина, высота, байт) файла картинки, нули — если файла нет."""
+    if not image:
+        return 0, 0, 0
+    width, height = get_image_dimensions(image)
+    return width or 0, height or 0, image.size
@@ -0,0 +1,68 @@
+"""
+Отметки «нравится».
+
+Кто что отметил, хранит Like с уникальным ключом (user, post). Счётчик
+Post.likes не обновляется при каждой отметке, иначе популярный пост стал
+бы горячей строкой: отметка добавляет +1 или -1 в журнал LikeDelta в той
+же транзакции, а fold_likes сворачивает журнал в Post.likes одним
+UPDATE на пачку. Счётчик на карточках отстаёт на интервал свёртки.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from .counters import increment
+from .follows import insert_ignore
+from .models import Like, LikeDelta
+
+BATCH_SIZE = 5000
+
+
+def like(user, post):
+    """Ставит отметку. Возвращает True, если её ещё не было."""
+    with transaction.atomic():
+        if not insert_ignore(Like, user_id=user.pk, post_id=post.pk,
+                             created=timezone.now()):
+            return False
+        LikeDelta.objects.create(post_id=post.pk, delta=1)
+    return True
+
+
+def unlike(user, post):
+    """Снимает отметку. Возвращает True, если она была."""
+    with transaction.atomic():
+        deleted, _ = Like.objects.filter(user=user, post=post).delete()
+        if not deleted:
+            return False
+        LikeDelta.objects.create(post_id=post.pk, delta=-1)
+    return True
+
+
+def liked_ids(user, posts):
+    """id постов из posts, отмеченных пользователем, одним запросом."""
+    if not user.is_authenticated:
+        return set()
+    return set(Like.objects.filter(
+        user=user, post_id__in=[post.pk for post in posts])
+        .values_list('post_id', flat=True))
+
+
+def fold_likes(batch_size=BATCH_SIZE):
+    """Переносит журнал LikeDelta в Post.likes. Возвращает число
+    обработанных записей журнала."""
+    folded = 0
+    while True:
+        with transaction.atomic():
+            rows = list(LikeDelta.objects.order_by('pk')
+                        .values_list('pk', 'post_id', 'delta')[:batch_size])
+            if not rows:
+                return folded
+            deltas = defaultdict(int)
+            for _, post_id, delta in rows:
+                deltas[post_id] += delta
+            increment('likes', {post_id: delta
+                                for post_id, delta in deltas.items()
+                                if delta})
+            LikeDelta.objects.filter(pk__lte=rows[-1][0]).delete()
+        folded += len(rows)
@@ -0,0 +1,25 @@
+import gzip
+import io
+import sys
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+def open_writer(path, compress=False):
+    """Открывает NDJSON-поток на запись ('-' — stdout)."""
+    if path == '-':
+        raw = sys.stdout.buffer
+        if compress:
+            raw = gzip.GzipFile(fileobj=raw, mode='wb')
+        return io.TextIOWrapper(raw, encoding='utf-8')
+    if compress or path.endswith('.gz'):
+        return gzip.open(path, 'wt', encoding='utf-8')
+    return open(path, 'w', encoding='utf-8')
+
+
+def open_reader(path):
+    """Открывает NDJSON-поток на чтение, gzip определяется по сигнатуре."""
+    raw = sys.stdin.buffer if path == '-' else open(path, 'rb')
+    if raw.peek(2)[:2] == GZIP_MAGIC:
+        raw = gzip.GzipFile(fileobj=raw, mode='rb')
+    return io.TextIOWrapper(raw, encoding='utf-8')
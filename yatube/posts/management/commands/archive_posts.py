@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.archive import archive_posts
+
+
+class Command(BaseCommand):
+    help = 'Переносит старые посты с комментариями в архивные таблицы.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            default=settings.POSTS_ARCHIVE_DAYS,
+                            help='Архивировать посты старше N дней.')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        moved = archive_posts(options['days'], options['batch_size'])
+        self.stdout.write(f'Перенесено в архив постов: {moved}')
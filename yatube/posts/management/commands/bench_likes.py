@@ -0,0 +1,116 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.db.backends.sqlite3.base import DEFAULT_PRAGMAS, is_busy
+
+SCHEMA = (
+    'CREATE TABLE post (id INTEGER PRIMARY KEY, likes INTEGER NOT NULL)',
+    'CREATE TABLE "like" (user_id INTEGER, post_id INTEGER, '
+    'UNIQUE (user_id, post_id))',
+    'CREATE TABLE like_delta (id INTEGER PRIMARY KEY, post_id INTEGER, '
+    'delta INTEGER)',
+)
+# Как после отметки меняется счётчик: строкой поста или записью журнала.
+STRATEGIES = (
+    ('counter', 'UPDATE post SET likes = likes + 1 WHERE id = ?'),
+    ('delta', 'INSERT INTO like_delta (post_id, delta) VALUES (?, 1)'),
+)
+FOLD = ('UPDATE post SET likes = likes + (SELECT coalesce(sum(delta), 0) '
+        'FROM like_delta WHERE like_delta.post_id = post.id)')
+
+
+class Command(BaseCommand):
+    help = 'Измеряет пропускную способность отметок «нравится» под '\
+           'конкурентной записью: счётчик в строке поста против журнала '\
+           'LikeDelta, как в posts.likes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--likes', type=int, default=500,
+                            help='Отметок на один поток.')
+        parser.add_argument('--posts', type=int, default=3,
+                            help='Сколько популярных постов отмечают.')
+
+    def handle(self, *args, **options):
+        for name, statement in STRATEGIES:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                path = os.path.join(tmp_dir, 'bench.sqlite3')
+                result = self.run_strategy(path, statement, options)
+            self.stdout.write(
+                f'{name:>8}: {result["likes"] / result["elapsed"]:8.0f} '
+                f'отметок/с, busy-ошибок {result["busy"]}, '
+                f'p99 {result["p99"] * 1000:.1f} мс, '
+                f'итог {result["total"]}, свёртка {result["fold"] * 1000:.1f}'
+                f' мс')
+
+    def connect(self, path):
+        conn = sqlite3.connect(path, isolation_level=None,
+                               check_same_thread=False)
+        for pragma, value in DEFAULT_PRAGMAS.items():
+            conn.execute(f'PRAGMA {pragma} = {value}')
+        return conn
+
+    def run_strategy(self, path, statement, options):
+        conn = self.connect(path)
+        for sql in SCHEMA:
+            conn.execute(sql)
+        conn.executemany('INSERT INTO post (id, likes) VALUES (?, 0)',
+                         [(n,) for n in range(options['posts'])])
+        self.lock = threading.Lock()
+        self.stats = {'likes': 0, 'busy': 0, 'latency': []}
+        threads = [
+            threading.Thread(target=self.worker,
+                             args=(path, statement, n, options))
+            for n in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        fold_started = time.perf_counter()
+        if 'like_delta' in statement:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(FOLD)
+            conn.execute('DELETE FROM like_delta')
+            conn.execute('COMMIT')
+        fold = time.perf_counter() - fold_started
+        total = conn.execute('SELECT sum(likes) FROM post').fetchone()[0]
+        conn.close()
+        latency = sorted(self.stats['latency']) or [0]
+        p99 = latency[min(len(latency) - 1, int(len(latency) * 0.99))]
+        return {**self.stats, 'elapsed': elapsed, 'p99': p99,
+                'total': total, 'fold': fold}
+
+    def worker(self, path, statement, number, options):
+        conn = self.connect(path)
+        for i in range(options['likes']):
+            user_id = number * options['likes'] + i
+            post_id = random.randrange(options['posts'])
+            started = time.perf_counter()
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                cursor = conn.execute(
+                    'INSERT OR IGNORE INTO "like" (user_id, post_id) '
+                    'VALUES (?, ?)', (user_id, post_id))
+                if cursor.rowcount:
+                    conn.execute(statement, (post_id,))
+                conn.execute('COMMIT')
+            except sqlite3.OperationalError as error:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                if not is_busy(error):
+                    raise
+                with self.lock:
+                    self.stats['busy'] += 1
+                continue
+            with self.lock:
+                self.stats['likes'] += 1
+                self.stats['latency'].append(time.perf_counter() - started)
+        conn.close()
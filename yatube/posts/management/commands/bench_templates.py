@@ -0,0 +1,90 @@
+import copy
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core.warmup import warm_templates
+from posts.models import PostCard
+
+LOADERS = ['django.template.loaders.filesystem.Loader',
+           'django.template.loaders.app_directories.Loader']
+CACHED = [('django.template.loaders.cached.Loader', LOADERS)]
+# Как в бою, но без страничного и фрагментного кэша: замеряется
+# отрисовка. DEBUG выключен и для панели отладки, и для движка шаблонов.
+PRODUCTION = {
+    'DEBUG': False,
+    'CACHES': {'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+}
+
+
+def with_loaders(loaders):
+    templates = copy.deepcopy(settings.TEMPLATES)
+    templates[0]['APP_DIRS'] = False
+    templates[0]['OPTIONS']['loaders'] = loaders
+    return templates
+
+
+def default_urls():
+    urls = [reverse('posts:index'), reverse('posts:trending')]
+    card = PostCard.objects.values('author_username', 'group_slug').first()
+    if card:
+        urls.append(reverse('posts:profile', args=[card['author_username']]))
+        if card['group_slug']:
+            urls.append(reverse('posts:group_list',
+                                args=[card['group_slug']]))
+    return urls
+
+
+class Command(BaseCommand):
+    help = 'Замеряет время первого и повторных запросов к страницам: '\
+           'без кэша шаблонов, с кэширующим загрузчиком и с прогревом '\
+           'шаблонов при старте (core.warmup).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', action='append', dest='urls',
+                            help='Адрес страницы; можно указать несколько. '
+                                 'По умолчанию главная, популярное, '
+                                 'профиль и группа.')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Повторных запросов к каждой странице.')
+
+    def handle(self, *args, **options):
+        urls = options['urls'] or default_urls()
+        profiles = (
+            ('без кэша', LOADERS, False),
+            ('кэш', CACHED, False),
+            ('кэш+прогрев', CACHED, True),
+        )
+        # Первые запросы процесса импортируют представления и
+        # middleware; в замеры это не попадает.
+        with override_settings(**PRODUCTION):
+            for url in urls:
+                Client().get(url)
+        for name, loaders, warm in profiles:
+            with override_settings(TEMPLATES=with_loaders(loaders),
+                                   **PRODUCTION):
+                client = Client()
+                warmup = 0
+                if warm:
+                    started = time.perf_counter()
+                    warm_templates()
+                    warmup = time.perf_counter() - started
+                first = [self.timed(client, url) for url in urls]
+                steady = [statistics.median(
+                    self.timed(client, url)
+                    for _ in range(options['repeat'])) for url in urls]
+            self.stdout.write(f'{name} (прогрев {warmup * 1000:.0f} мс):')
+            for url, cold, warm_time in zip(urls, first, steady):
+                self.stdout.write(
+                    f'  {url:<40} первый {cold * 1000:7.1f} мс, '
+                    f'медиана {warm_time * 1000:7.1f} мс')
+
+    def timed(self, client, url):
+        started = time.perf_counter()
+        client.get(url)
+        return time.perf_counter() - started
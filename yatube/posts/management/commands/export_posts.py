@@ -0,0 +1,64 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from posts.models import Comment, Follow, Group, Post
+
+from ._ndjson import open_writer
+
+User = get_user_model()
+
+# Порядок важен: при импорте записи ссылаются только на уже загруженные.
+# Пользователи и группы выгружаются по натуральным ключам (username, slug),
+# посты — со своими pk, чтобы комментарии можно было перенести без карты id.
+EXPORTS = (
+    ('auth.user', User.objects.order_by('pk'),
+     ('username', 'first_name', 'last_name', 'email')),
+    ('posts.group', Group.objects.order_by('pk'),
+     ('slug', 'title', 'description')),
+    ('posts.post', Post.objects.order_by('pk'),
+     ('pk', 'text', 'pub_date', 'author__username', 'group__slug',
+      'image')),
+    ('posts.comment', Comment.objects.order_by('pk'),
+     ('post_id', 'author__username', 'text', 'created')),
+    ('posts.follow', Follow.objects.order_by('pk'),
+     ('user__username', 'author__username')),
+)
+
+
+class Encoder(DjangoJSONEncoder):
+    """Сохраняет микросекунды дат, которые DjangoJSONEncoder отбрасывает."""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class Command(BaseCommand):
+    help = 'Потоковая выгрузка пользователей, групп, постов, комментариев '\
+           'и подписок в NDJSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Файл выгрузки, '-' — stdout.")
+        parser.add_argument('--gzip', action='store_true',
+                            help='Сжать выгрузку gzip.')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        encoder = Encoder(ensure_ascii=False)
+        stream = open_writer(options['path'], options['gzip'])
+        with stream:
+            for model, queryset, fields in EXPORTS:
+                rows = queryset.values_list(*fields).iterator(
+                    chunk_size=options['chunk_size'])
+                count = 0
+                for row in rows:
+                    record = {'model': model,
+                              'fields': dict(zip(fields, row))}
+                    stream.write(encoder.encode(record))
+                    stream.write('\n')
+                    count += 1
+                self.stderr.write(f'{model}: {count}')
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.images import image_meta
+from posts.models import ArchivedPost, Post
+from posts.readmodel import refresh_cards
+
+
+class Command(BaseCommand):
+    help = 'Записывает размеры картинок постов, загруженных до того, '\
+           'как их стали сохранять при загрузке.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        filled = 0
+        for model in (Post, ArchivedPost):
+            posts = (model.objects.exclude(image='')
+                     .filter(image_width=0).order_by('pk').only('image'))
+            last_pk = 0
+            while True:
+                batch = list(posts.filter(pk__gt=last_pk)
+                             [:options['batch_size']])
+                if not batch:
+                    break
+                last_pk = batch[-1].pk
+                filled_ids = []
+                with transaction.atomic():
+                    for post in batch:
+                        try:
+                            width, height, size = image_meta(post.image)
+                        except (OSError, ValueError):
+                            self.stderr.write(f'{model.__name__} {post.pk}: '
+                                              f'не прочитан {post.image}')
+                            continue
+                        model.objects.filter(pk=post.pk).update(
+                            image_width=width, image_height=height,
+                            image_bytes=size)
+                        filled_ids.append(post.pk)
+                filled += len(filled_ids)
+                # srcset карточек был нарезан без ширины картинки.
+                if model is Post and filled_ids:
+                    refresh_cards(Post.objects.filter(pk__in=filled_ids))
+        self.stdout.write(f'Записаны размеры картинок: {filled}')
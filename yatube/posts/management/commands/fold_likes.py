@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.likes import BATCH_SIZE, fold_likes
+
+
+class Command(BaseCommand):
+    help = 'Переносит журнал отметок «нравится» в счётчики постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Работать постоянно, сворачивая журнал '
+                                 'каждые N секунд.')
+
+    def handle(self, *args, **options):
+        while True:
+            folded = fold_likes(options['batch_size'])
+            if folded:
+                self.stdout.write(f'Обработано записей журнала: {folded}')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
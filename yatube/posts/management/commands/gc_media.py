@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.orphans import collect
+
+
+class Command(BaseCommand):
+    help = 'Удаляет файлы картинок, на которые не ссылается ни один пост, '\
+           'вместе с их миниатюрами.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только показать, что будет убрано.')
+        parser.add_argument('--grace', type=float,
+                            default=settings.MEDIA_GC_GRACE_HOURS,
+                            help='Не трогать файлы моложе N часов.')
+        parser.add_argument('--quarantine', nargs='?',
+                            const=settings.MEDIA_QUARANTINE,
+                            help='Переносить файлы в каталог (по умолчанию '
+                                 'MEDIA_QUARANTINE) вместо удаления.')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        removed = recent = size = 0
+        for orphan, stale in collect(options['grace'],
+                                     options['quarantine'], dry_run):
+            if not stale:
+                recent += 1
+                continue
+            removed += 1
+            size += orphan.size
+            if dry_run or options['verbosity'] > 1:
+                self.stdout.write(orphan.name)
+        action = ('Будет убрано' if dry_run else 'Перенесено в карантин'
+                  if options['quarantine'] else 'Удалено')
+        self.stdout.write(f'{action} файлов: {removed} '
+                          f'({size / 1024 / 1024:.1f} МБ), моложе '
+                          f'{options["grace"]:g} ч: {recent}')
@@ -0,0 +1,148 @@
+import json
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils.dateparse import parse_datetime
+
+from core.storage import is_content_name, media_storage
+from posts.archive import archive_cutoff, archive_posts
+from posts.models import ArchivedPost, Comment, Follow, Group, Post
+from posts.readmodel import recount_comments, refresh_cards
+
+from ._ndjson import open_reader
+
+User = get_user_model()
+
+
+@contextmanager
+def keep_dates(model, field_name):
+    """Отключает auto_now_add, чтобы сохранить даты из выгрузки."""
+    field = model._meta.get_field(field_name)
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def resolve(model, field, keys):
+    """Возвращает словарь натуральный ключ -> pk одним запросом."""
+    return dict(model.objects.filter(**{f'{field}__in': set(keys)})
+                .values_list(field, 'pk'))
+
+
+class Command(BaseCommand):
+    help = 'Потоковая загрузка NDJSON-выгрузки export_posts пачками '\
+           'bulk_create.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Файл выгрузки, '-' — stdin.")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        # Посты получают pk со сдвигом за максимальный существующий:
+        # внешние ключи комментариев пересчитываются без карты id в памяти.
+        self.post_offset = max(
+            Post.objects.aggregate(m=Max('pk'))['m'] or 0,
+            ArchivedPost.objects.aggregate(m=Max('pk'))['m'] or 0)
+        self.loaders = {
+            'auth.user': self.load_users,
+            'posts.group': self.load_groups,
+            'posts.post': self.load_posts,
+            'posts.comment': self.load_comments,
+            'posts.follow': self.load_follows,
+        }
+        self.counts = dict.fromkeys(self.loaders, 0)
+        self.cutoff = archive_cutoff()
+        batch_size = options['batch_size']
+        model, batch = None, []
+        with open_reader(options['path']) as stream:
+            for line in stream:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record['model'] != model or len(batch) >= batch_size:
+                    self.flush(model, batch)
+                    model, batch = record['model'], []
+                batch.append(record['fields'])
+            self.flush(model, batch)
+        # Старые посты загружаются в Post, чтобы получить id из его
+        # последовательности, и вместе с комментариями уходят в архив:
+        # иначе они оказались бы в ленте профиля раньше архивных.
+        archived = archive_posts(batch_size=batch_size)
+        self.stdout.write(f'В архив перенесено постов: {archived}')
+        for name, count in self.counts.items():
+            self.stdout.write(f'{name}: {count}')
+
+    def flush(self, model, batch):
+        if not batch:
+            return
+        if model not in self.loaders:
+            raise CommandError(f'Неизвестная модель в выгрузке: {model}')
+        with transaction.atomic():
+            self.loaders[model](batch)
+        self.counts[model] += len(batch)
+
+    def load_users(self, batch):
+        password = make_password(None)
+        User.objects.bulk_create(
+            [User(password=password, **fields) for fields in batch],
+            ignore_conflicts=True)
+
+    def load_groups(self, batch):
+        Group.objects.bulk_create(
+            [Group(**fields) for fields in batch], ignore_conflicts=True)
+
+    def load_posts(self, batch):
+        authors = resolve(User, 'username',
+                          (row['author__username'] for row in batch))
+        groups = resolve(Group, 'slug',
+                         (row['group__slug'] for row in batch
+                          if row['group__slug']))
+        posts = [
+            Post(pk=row['pk'] + self.post_offset,
+                 text=row['text'],
+                 pub_date=parse_datetime(row['pub_date']),
+                 author_id=authors[row['author__username']],
+                 group_id=groups.get(row['group__slug']),
+                 image=row['image'])
+            for row in batch
+        ]
+        with keep_dates(Post, 'pub_date'):
+            Post.objects.bulk_create(posts)
+        # Одинаковые картинки хранятся один раз, ссылки считает хранилище.
+        for post in posts:
+            if is_content_name(post.image.name):
+                media_storage.retain(post.image.name)
+        # bulk_create не отправляет post_save, карточки строятся здесь;
+        # постам, которые уйдут в архив, они не нужны.
+        refresh_cards(Post.objects.filter(
+            pk__in=[post.pk for post in posts], pub_date__gte=self.cutoff))
+
+    def load_comments(self, batch):
+        authors = resolve(User, 'username',
+                          (row['author__username'] for row in batch))
+        comments = [
+            Comment(post_id=row['post_id'] + self.post_offset,
+                    author_id=authors[row['author__username']],
+                    text=row['text'],
+                    created=parse_datetime(row['created']))
+            for row in batch
+        ]
+        with keep_dates(Comment, 'created'):
+            Comment.objects.bulk_create(comments)
+        recount_comments({comment.post_id for comment in comments})
+
+    def load_follows(self, batch):
+        users = resolve(User, 'username',
+                        [row['user__username'] for row in batch]
+                        + [row['author__username'] for row in batch])
+        Follow.objects.bulk_create(
+            [Follow(user_id=users[row['user__username']],
+                    author_id=users[row['author__username']])
+             for row in batch],
+            ignore_conflicts=True)
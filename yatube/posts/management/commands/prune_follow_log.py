@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.graph import prune_log
+
+
+class Command(BaseCommand):
+    help = 'Удаляет старые записи журнала подписок, по которому '\
+           'процессы обновляют граф подписок в памяти.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Работать постоянно, удаляя записи '
+                                 'каждые N секунд.')
+
+    def handle(self, *args, **options):
+        while True:
+            deleted = prune_log()
+            if deleted:
+                self.stdout.write(f'Удалено записей журнала: {deleted}')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
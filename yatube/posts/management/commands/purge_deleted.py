@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.purge import BATCH_SIZE, run_pending
+
+
+class Command(BaseCommand):
+    help = 'Удаляет пачками пользователей и посты, поставленные '\
+           'в очередь на удаление из админки.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Работать постоянно, проверяя очередь '
+                                 'каждые N секунд.')
+
+    def handle(self, *args, **options):
+        while True:
+            count = run_pending(options['batch_size'])
+            if count:
+                self.stdout.write(f'Завершено удалений: {count}')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.readmodel import BATCH_SIZE, refresh_cards
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает карточки постов для лент (PostCard) с миниатюрами.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        count = refresh_cards(Post.objects.all(), options['batch_size'])
+        self.stdout.write(f'Пересобрано карточек: {count}')
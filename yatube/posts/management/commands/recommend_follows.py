@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.recommend import (BATCH_SIZE, CHUNK_SIZE, TOP_K,
+                             recommend_follows)
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает рекомендации «на кого подписаться» по графу '
+            'подписок. Запускается периодически, например из cron.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=TOP_K,
+                            help='Сколько авторов рекомендовать.')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Пользователей в одной транзакции записи.')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                            help='Подписок в одном запросе при загрузке.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        users = recommend_follows(options['top_k'], options['batch_size'],
+                                  options['chunk_size'])
+        self.stdout.write(
+            f'Рекомендации обновлены для {users} пользователей '
+            f'за {time.monotonic() - started:.1f} с')
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core.storage import is_content_name, media_storage
+from posts.models import ArchivedPost, Post
+from posts.readmodel import refresh_cards
+
+
+class Command(BaseCommand):
+    help = 'Переносит картинки постов со старыми именами в хранилище '\
+           'по содержимому, объединяя одинаковые файлы.'
+
+    def handle(self, *args, **options):
+        moved = missing = 0
+        for model in (Post, ArchivedPost):
+            rows = model.objects.exclude(image='').values_list('pk', 'image')
+            for pk, name in list(rows):
+                if is_content_name(name):
+                    continue
+                if not media_storage.exists(name):
+                    self.stderr.write(f'{model.__name__} {pk}: нет файла '
+                                      f'{name}')
+                    missing += 1
+                    continue
+                with transaction.atomic():
+                    with media_storage.open(name) as content:
+                        stored = media_storage.save(name, content)
+                    if model is Post:
+                        Post.objects.filter(pk=pk).update(
+                            image=stored, updated_at=timezone.now())
+                        refresh_cards(Post.objects.filter(pk=pk))
+                    else:
+                        model.objects.filter(pk=pk).update(image=stored)
+                    media_storage.delete(name)
+                moved += 1
+        self.stdout.write(f'Перенесено картинок: {moved}, без файла: '
+                          f'{missing}')
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.trending import BATCH_SIZE, update_trending
+
+
+class Command(BaseCommand):
+    help = 'Сворачивает события вовлечённости в оценки и пересобирает '\
+           'топы популярных постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Работать постоянно, обновляя топы '
+                                 'каждые N секунд.')
+
+    def handle(self, *args, **options):
+        while True:
+            folded = update_trending(options['batch_size'])
+            self.stdout.write(f'Обработано событий: {folded}')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,66 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.warmup import cache_is_shared, warm_pages
+from posts.hot import hot_targets, log_targets
+
+
+class Command(BaseCommand):
+    help = 'Прогревает страничный и фрагментный кэш и миниатюры самых '\
+           'востребованных страниц после выкладки или сброса кэша.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', help='Журнал доступа веб-сервера; '
+                                          'цели — самые частые запросы.')
+        parser.add_argument('--top', type=int, default=200,
+                            help='Сколько адресов брать из журнала.')
+        parser.add_argument('--pages', type=int, default=3,
+                            help='Первых страниц каждой ленты.')
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--profiles', type=int, default=10)
+        parser.add_argument('--days', type=int, default=7,
+                            help='За сколько дней считать активность.')
+        parser.add_argument('--processes', type=int, default=2,
+                            help='0 — прогревать в текущем процессе.')
+        parser.add_argument('--rate', type=float, default=10,
+                            help='Не больше запросов в секунду, 0 — без '
+                                 'ограничения.')
+        parser.add_argument('--host', default=settings.WARMUP_HOST,
+                            help='Хост сайта, как в запросах посетителей.')
+        parser.add_argument('--scheme', choices=('http', 'https'),
+                            default=settings.WARMUP_SCHEME)
+
+    def handle(self, *args, **options):
+        if not cache_is_shared():
+            self.stderr.write(
+                'Кэш страниц хранится в памяти процесса: сервер не увидит '
+                'прогретые страницы, прогреются только миниатюры.')
+        if options['log']:
+            with open(options['log'], errors='replace') as lines:
+                urls, share = log_targets(lines, options['top'])
+            self.stdout.write(f'Адреса из журнала покрывают {share:.0%} '
+                              f'запросов')
+        else:
+            urls = hot_targets(options['pages'], options['groups'],
+                               options['profiles'], options['days'])
+        started = time.perf_counter()
+        results = warm_pages(urls, options['processes'], options['rate'],
+                             options['host'], options['scheme'])
+        elapsed = time.perf_counter() - started
+        warmed = [seconds for _, status, seconds in results if status == 200]
+        for url, status, _ in results:
+            if status != 200:
+                self.stderr.write(f'{url}: {status or "ошибка"}')
+        self.stdout.write(
+            f'Прогрето страниц: {len(warmed)} из {len(urls)} '
+            f'({len(warmed) / len(urls) if urls else 0:.0%}) '
+            f'за {elapsed:.1f} с')
+        if warmed:
+            warmed.sort()
+            self.stdout.write(
+                f'Отрисовка: медиана {statistics.median(warmed) * 1000:.0f}'
+                f' мс, p95 {warmed[int(len(warmed) * 0.95)] * 1000:.0f} мс,'
+                f' максимум {warmed[-1] * 1000:.0f} мс')
@@ -0,0 +1,31 @@
+# Generated by Django 2.2.16 on 2026-10-19 15:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Purge',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('user', 'Пользователь'), ('post', 'Пост')], max_length=4, verbose_name='Тип')),
+                ('object_id', models.PositiveIntegerField(verbose_name='id объекта')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Поставлено')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='Завершено')),
+                ('deleted', models.PositiveIntegerField(default=0, verbose_name='Удалено записей')),
+            ],
+            options={
+                'ordering': ['created'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='purge',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_purge'),
+        ),
+    ]
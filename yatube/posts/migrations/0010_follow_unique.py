@@ -0,0 +1,30 @@
+# Generated by Django 2.2.16 on 2026-10-19 15:56
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicates(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    duplicates = (Follow.objects.values('user_id', 'author_id')
+                  .annotate(count=Count('id'), keep=Min('id'))
+                  .filter(count__gt=1))
+    for row in duplicates:
+        Follow.objects.filter(
+            user_id=row['user_id'], author_id=row['author_id']).exclude(
+            pk=row['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_purge'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_follow'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.16 on 2026-10-19 16:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_suggestion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FollowLog',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.IntegerField()),
+                ('author_id', models.IntegerField()),
+                ('followed', models.BooleanField()),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
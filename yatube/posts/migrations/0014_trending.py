@@ -0,0 +1,64 @@
+# Generated by Django 2.2.16 on 2026-10-19 16:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_follow_log'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post_id', models.IntegerField(null=True)),
+                ('author_id', models.IntegerField(null=True)),
+                ('weight', models.FloatField()),
+                ('created', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TrendingRank',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+            ],
+            options={
+                'ordering': ['position'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TrendingScore',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending_score', serialize=False, to='posts.Post')),
+                ('group_id', models.IntegerField(null=True)),
+                ('score', models.FloatField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='trendingscore',
+            index=models.Index(fields=['-score'], name='posts_trend_score_3c368b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trendingscore',
+            index=models.Index(fields=['group_id', '-score'], name='posts_trend_group_i_7153b5_idx'),
+        ),
+        migrations.AddField(
+            model_name='trendingrank',
+            name='group',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='posts.Group'),
+        ),
+        migrations.AddField(
+            model_name='trendingrank',
+            name='post',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='posts.Post'),
+        ),
+        migrations.AddIndex(
+            model_name='trendingrank',
+            index=models.Index(fields=['group', 'position'], name='posts_trend_group_i_197cd6_idx'),
+        ),
+    ]
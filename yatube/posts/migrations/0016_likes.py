@@ -0,0 +1,47 @@
+# Generated by Django 2.2.16 on 2026-10-19 16:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0015_post_views'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LikeDelta',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post_id', models.IntegerField()),
+                ('delta', models.SmallIntegerField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='archivedpost',
+            name='likes',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Отметки «нравится»'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='likes',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Отметки «нравится»'),
+        ),
+        migrations.CreateModel(
+            name='Like',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='like_set', to='posts.Post', verbose_name='Пост')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='likes', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='like',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='unique_like'),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 2.2.16 on 2026-10-19 16:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+
+
+def fill_cards(apps, schema_editor):
+    """Карточки существующих постов. Миниатюры достроит команда
+    rebuild_cards, до тех пор карточка рисует их тегом thumbnail."""
+    Post = apps.get_model('posts', 'Post')
+    PostCard = apps.get_model('posts', 'PostCard')
+    posts = (Post.objects.select_related('author', 'group')
+             .annotate(comment_count=Count('comments')).order_by('pk'))
+    cards = []
+    for post in posts.iterator():
+        author, group = post.author, post.group
+        cards.append(PostCard(
+            post_id=post.pk, pub_date=post.pub_date,
+            updated_at=post.updated_at, text=post.text,
+            image=post.image.name or '', author_id=author.pk,
+            author_username=author.username,
+            author_name=f'{author.first_name} {author.last_name}'.strip(),
+            group_id=group and group.pk,
+            group_slug=group.slug if group else '',
+            group_title=group.title if group else '',
+            comments=post.comment_count, views=post.views, likes=post.likes))
+        if len(cards) == 500:
+            PostCard.objects.bulk_create(cards)
+            cards = []
+    PostCard.objects.bulk_create(cards)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_post_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostCard',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='card', serialize=False, to='posts.Post')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('updated_at', models.DateTimeField(verbose_name='Дата изменения')),
+                ('text', models.TextField(verbose_name='Текст поста')),
+                ('image', models.CharField(blank=True, max_length=100, verbose_name='Картинка')),
+                ('thumbnail', models.CharField(blank=True, max_length=255, verbose_name='Миниатюра')),
+                ('author_id', models.IntegerField()),
+                ('author_username', models.CharField(max_length=150)),
+                ('author_name', models.CharField(blank=True, max_length=300)),
+                ('group_id', models.IntegerField(null=True)),
+                ('group_slug', models.CharField(blank=True, max_length=50)),
+                ('group_title', models.CharField(blank=True, max_length=200)),
+                ('comments', models.PositiveIntegerField(default=0, verbose_name='Комментарии')),
+                ('views', models.PositiveIntegerField(default=0, verbose_name='Просмотры')),
+                ('likes', models.PositiveIntegerField(default=0, verbose_name='Отметки «нравится»')),
+            ],
+            options={
+                'ordering': ['-pub_date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='postcard',
+            index=models.Index(fields=['-pub_date'], name='posts_postc_pub_dat_1bb783_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postcard',
+            index=models.Index(fields=['author_id', '-pub_date'], name='posts_postc_author__f8e2da_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postcard',
+            index=models.Index(fields=['group_id', '-pub_date'], name='posts_postc_group_i_fa288d_idx'),
+        ),
+        migrations.RunPython(fill_cards, migrations.RunPython.noop),
+    ]
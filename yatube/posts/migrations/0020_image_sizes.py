@@ -0,0 +1,53 @@
+# Generated by Django 2.2.16 on 2026-10-19 16:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_content_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedpost',
+            name='image_bytes',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Размер картинки, байт'),
+        ),
+        migrations.AddField(
+            model_name='archivedpost',
+            name='image_height',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Высота картинки'),
+        ),
+        migrations.AddField(
+            model_name='archivedpost',
+            name='image_width',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Ширина картинки'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_bytes',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Размер картинки, байт'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_height',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Высота картинки'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_width',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Ширина картинки'),
+        ),
+        migrations.AddField(
+            model_name='postcard',
+            name='image_height',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='postcard',
+            name='image_width',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
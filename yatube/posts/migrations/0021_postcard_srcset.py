@@ -0,0 +1,25 @@
+# Generated by Django 2.2.16 on 2026-10-19 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Адрес одной миниатюры заменён на srcset. Старые адреса не
+    # переносятся: пустой srcset карточка строит при отрисовке, а команда
+    # rebuild_cards заполняет его заранее.
+
+    dependencies = [
+        ('posts', '0020_image_sizes'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='postcard',
+            name='thumbnail',
+        ),
+        migrations.AddField(
+            model_name='postcard',
+            name='srcset',
+            field=models.TextField(blank=True, verbose_name='Миниатюры (srcset)'),
+        ),
+    ]
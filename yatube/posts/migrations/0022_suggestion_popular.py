@@ -0,0 +1,20 @@
+# Generated by Django 2.2.16 on 2026-10-19 17:06
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_postcard_srcset'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='suggestion',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='suggestions', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+    ]
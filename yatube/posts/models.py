@@ -1,6 +1,10 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from core.storage import media_storage
+
+from .images import image_meta
+
 User = get_user_model()
 
 
@@ -33,15 +37,86 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=media_storage,
         blank=True
     )
+    image_width = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Ширина картинки'
+    )
+    image_height = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Высота картинки'
+    )
+    image_bytes = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Размер картинки, байт'
+    )
+    views = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Просмотры'
+    )
+    likes = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Отметки «нравится»'
+    )
+    updated_at = models.DateTimeField(auto_now=True,
+                                      verbose_name='Дата изменения')
+
+    # Счётчики пишут posts.counters и posts.likes отдельными UPDATE.
+    COUNTER_FIELDS = ('views', 'likes')
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['author', '-pub_date']),
+            models.Index(fields=['group', '-pub_date']),
+        ]
 
     def __str__(self):
         return self.text
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        post = super().from_db(db, field_names, values)
+        # Картинка, с которой пост прочитан: при замене её файл
+        # освобождается.
+        post._stored_image = post.__dict__.get('image')
+        return post
+
+    def save(self, *args, **kwargs):
+        # Несохранённый файл при записи поста получает ещё одну ссылку
+        # в хранилище, даже если его имя совпадёт с прежним.
+        uploaded = ('image' in self.__dict__ and bool(self.image)
+                    and not self.image._committed)
+        if 'image' in self.__dict__ and not self.image:
+            self.image_width = self.image_height = self.image_bytes = 0
+        elif uploaded:
+            (self.image_width, self.image_height,
+             self.image_bytes) = image_meta(self.image)
+        # Сохранение формы с прочитанными раньше счётчиками не должно
+        # затирать их.
+        if self.pk and not self._state.adding and not kwargs.get(
+                'update_fields'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS]
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if 'image' not in self.__dict__ or (
+                update_fields is not None and 'image' not in update_fields):
+            return
+        previous = getattr(self, '_stored_image', None)
+        if previous and (uploaded or previous != self.image.name):
+            self.image.storage.delete(previous)
+        self._stored_image = self.image.name
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -72,3 +147,279 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name="following"
     )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'author'],
+                                    name='unique_follow'),
+        ]
+
+
+class FollowLog(models.Model):
+    """Журнал изменений подписок. По нему процессы догоняют свой
+    posts.graph.FollowGraph без полной перезагрузки."""
+    user_id = models.IntegerField()
+    author_id = models.IntegerField()
+    followed = models.BooleanField()
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+
+
+class GroupFollow(models.Model):
+    """Подписка пользователя на сообщество."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='group_follows',
+        verbose_name='Подписчик'
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        related_name='followers',
+        verbose_name='Сообщество'
+    )
+
+    class Meta:
+        verbose_name = 'Подписка на сообщество'
+        verbose_name_plural = 'Подписки на сообщества'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'group'],
+                                    name='unique_group_follow'),
+        ]
+
+
+class Suggestion(models.Model):
+    """Рекомендация «на кого подписаться», рассчитанная командой
+    recommend_follows. Рекомендации без пользователя — самые читаемые
+    авторы для тех, у кого нет своих."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='suggestions',
+        verbose_name='Пользователь'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Рекомендуемый автор'
+    )
+    score = models.FloatField(verbose_name='Оценка')
+    mutuals = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Подписки пользователя, читающие автора'
+    )
+
+    class Meta:
+        ordering = ['-score']
+        verbose_name = 'Рекомендация'
+        verbose_name_plural = 'Рекомендации'
+        indexes = [models.Index(fields=['user', '-score'])]
+
+
+class ArchivedPost(models.Model):
+    """Старый пост, перенесённый из Post командой archive_posts.
+
+    Сохраняет id исходного поста, поэтому ссылки /posts/<id>/ не ломаются.
+    """
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField(verbose_name='Текст поста')
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_posts',
+        verbose_name='Автор'
+    )
+    group = models.ForeignKey(
+        Group,
+        verbose_name='Группа',
+        blank=True,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name='archived_posts'
+    )
+    image = models.ImageField(
+        'Картинка',
+        upload_to='posts/',
+        storage=media_storage,
+        blank=True
+    )
+    image_width = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Ширина картинки')
+    image_height = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Высота картинки')
+    image_bytes = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Размер картинки, байт')
+    views = models.PositiveIntegerField(default=0, editable=False,
+                                        verbose_name='Просмотры')
+    likes = models.PositiveIntegerField(default=0, editable=False,
+                                        verbose_name='Отметки «нравится»')
+    archived = models.DateTimeField(auto_now_add=True,
+                                    verbose_name='Дата архивации')
+
+    class Meta:
+        ordering = ['-pub_date']
+        indexes = [models.Index(fields=['author', '-pub_date'])]
+
+    def __str__(self):
+        return self.text
+
+
+class ArchivedComment(models.Model):
+    id = models.IntegerField(primary_key=True)
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name='comments'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_comments'
+    )
+    text = models.TextField(verbose_name='Текст комментария')
+    created = models.DateTimeField(verbose_name='Дата публикации коммента')
+
+
+class Purge(models.Model):
+    """Отложенное удаление пользователя или поста со всеми зависимыми
+    записями. Пока удаление не завершено, объект скрыт с сайта."""
+    USER = 'user'
+    POST = 'post'
+    KINDS = ((USER, 'Пользователь'), (POST, 'Пост'))
+
+    kind = models.CharField('Тип', max_length=4, choices=KINDS)
+    object_id = models.PositiveIntegerField('id объекта')
+    created = models.DateTimeField('Поставлено', auto_now_add=True)
+    finished = models.DateTimeField('Завершено', null=True, blank=True)
+    deleted = models.PositiveIntegerField('Удалено записей', default=0)
+
+    class Meta:
+        ordering = ['created']
+        constraints = [models.UniqueConstraint(fields=['kind', 'object_id'],
+                                               name='unique_purge')]
+
+    def __str__(self):
+        return f'{self.get_kind_display()} {self.object_id}'
+
+
+class TrendingEvent(models.Model):
+    """Необработанное событие вовлечённости: комментарий или просмотры
+    поста (post_id) либо новый подписчик автора (author_id)."""
+    post_id = models.IntegerField(null=True)
+    author_id = models.IntegerField(null=True)
+    weight = models.FloatField()
+    created = models.DateTimeField()
+
+
+class TrendingScore(models.Model):
+    """Затухающая оценка поста, хранится как log2 суммы весов событий,
+    приведённых к общей точке отсчёта (см. posts.trending)."""
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending_score'
+    )
+    group_id = models.IntegerField(null=True)
+    score = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-score']),
+            models.Index(fields=['group_id', '-score']),
+        ]
+
+
+class TrendingRank(models.Model):
+    """Готовый топ популярных постов: общий (group пусто) и по группам."""
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        null=True,
+        related_name='+'
+    )
+    position = models.PositiveIntegerField()
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+
+    class Meta:
+        ordering = ['position']
+        indexes = [models.Index(fields=['group', 'position'])]
+
+
+class Like(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='likes',
+        verbose_name='Пользователь'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='like_set',
+        verbose_name='Пост'
+    )
+    created = models.DateTimeField(auto_now_add=True,
+                                   verbose_name='Дата')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique_like'),
+        ]
+
+
+class LikeDelta(models.Model):
+    """Журнал изменений Post.likes: +1 или -1 на каждую смену отметки.
+    Сворачивается в Post.likes командой fold_likes."""
+    post_id = models.IntegerField()
+    delta = models.SmallIntegerField()
+
+
+class PostCard(models.Model):
+    """Всё, что нужно карточке поста в лентах, в одной строке.
+
+    Поддерживается сигналами из posts.readmodel, поэтому ленты читают
+    одну таблицу по индексу без соединений с пользователями и группами.
+    """
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='card'
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+    updated_at = models.DateTimeField(verbose_name='Дата изменения')
+    text = models.TextField(verbose_name='Текст поста')
+    image = models.CharField(max_length=100, blank=True,
+                             verbose_name='Картинка')
+    image_width = models.PositiveIntegerField(default=0)
+    image_height = models.PositiveIntegerField(default=0)
+    srcset = models.TextField(blank=True, verbose_name='Миниатюры (srcset)')
+    author_id = models.IntegerField()
+    author_username = models.CharField(max_length=150)
+    author_name = models.CharField(max_length=300, blank=True)
+    group_id = models.IntegerField(null=True)
+    group_slug = models.CharField(max_length=50, blank=True)
+    group_title = models.CharField(max_length=200, blank=True)
+    comments = models.PositiveIntegerField(default=0,
+                                           verbose_name='Комментарии')
+    views = models.PositiveIntegerField(default=0, verbose_name='Просмотры')
+    likes = models.PositiveIntegerField(default=0,
+                                        verbose_name='Отметки «нравится»')
+
+    class Meta:
+        ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['-pub_date']),
+            models.Index(fields=['author_id', '-pub_date']),
+            models.Index(fields=['group_id', '-pub_date']),
+        ]
@@ -0,0 +1,176 @@
+"""
+Поиск и уборка файлов картинок, на которые не ссылается ни один пост.
+
+Файлы в каталогах upload_to обходятся os.scandir, а имена картинок
+читаются из Post и ArchivedPost итератором, оба потока — по возрастанию
+имени. Сравнение слиянием отсортированных потоков держит в памяти
+только текущие имена, сколько бы ни было файлов и постов.
+
+Порядок имён из базы должен совпадать с побайтовым (так сортирует
+SQLite). Перед удалением каждый найденный файл ещё раз проверяется
+в транзакции: на него не должен ссылаться ни пост, ни запись StoredFile
+с ссылками. Транзакция SQLite начинается с BEGIN IMMEDIATE, как и
+ContentAddressedStorage.retain(), так что повторная загрузка того же
+содержимого не вклинится между проверкой и удалением, а после удаления
+запишет файл заново. Срок, моложе которого файл не трогается,
+считается от StoredFile.created: при повторной загрузке старого
+содержимого файл не перезаписывается и его mtime не меняется. Для
+файлов без записи (старые имена) — от mtime.
+
+Миниатюры в каталоге sorl-thumbnail (cache/) убираются, если их нет
+среди миниатюр картинок, на которые ссылаются посты.
+"""
+import heapq
+import os
+import shutil
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import transaction
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.default import kvstore as thumbnail_store
+
+from core.models import StoredFile
+from core.storage import media_storage
+
+from .models import ArchivedPost, Post
+
+IMAGE_MODELS = (Post, ArchivedPost)
+
+Orphan = namedtuple('Orphan', 'name size mtime')
+
+
+def upload_directories():
+    return sorted({model._meta.get_field('image').upload_to.strip('/')
+                   for model in IMAGE_MODELS})
+
+
+def walk_files(root, directory):
+    """Файлы каталога с подкаталогами как Orphan-кандидаты по
+    возрастанию имени относительно root."""
+    path = os.path.join(root, directory)
+    try:
+        entries = list(os.scandir(path))
+    except FileNotFoundError:
+        return
+    # «имя/» для каталогов: тогда обход в глубину идёт в том же порядке,
+    # что и сортировка полных имён строкой.
+    entries.sort(key=lambda entry: entry.name + '/' * entry.is_dir())
+    for entry in entries:
+        name = f'{directory}/{entry.name}'
+        if entry.is_dir(follow_symlinks=False):
+            yield from walk_files(root, name)
+        elif entry.is_file(follow_symlinks=False):
+            stat = entry.stat(follow_symlinks=False)
+            yield Orphan(name, stat.st_size, stat.st_mtime)
+
+
+def referenced_names():
+    """Имена картинок всех постов по возрастанию."""
+    return heapq.merge(*(model.objects.exclude(image='').order_by('image')
+                         .values_list('image', flat=True).iterator()
+                         for model in IMAGE_MODELS))
+
+
+def is_referenced(name):
+    return any(model.objects.filter(image=name).exists()
+               for model in IMAGE_MODELS)
+
+
+def find_orphans(files, referenced):
+    """Слияние двух отсортированных потоков: файлы, которых нет среди
+    referenced."""
+    referenced = iter(referenced)
+    current = next(referenced, None)
+    for file in files:
+        while current is not None and current < file.name:
+            current = next(referenced, None)
+        if file.name != current:
+            yield file
+
+
+def thumbnail_directory():
+    return thumbnail_settings.THUMBNAIL_PREFIX.strip('/')
+
+
+def live_thumbnails():
+    """Имена миниатюр картинок, на которые ссылаются посты, по данным
+    хранилища ключей sorl-thumbnail."""
+    live = set()
+    for key in thumbnail_store._find_keys(identity='thumbnails'):
+        source = thumbnail_store._get(key)
+        if source is None or not is_referenced(source.name):
+            continue
+        for thumbnail_key in (thumbnail_store._get(
+                key, identity='thumbnails') or []):
+            thumbnail = thumbnail_store._get(thumbnail_key)
+            if thumbnail is not None:
+                live.add(thumbnail.name)
+    return live
+
+
+def sweep(orphan, border, quarantine, dry_run):
+    """Перепроверяет и убирает файл картинки. None — файл нужен, False —
+    не истёк срок, True — убран."""
+    with transaction.atomic():
+        if is_referenced(orphan.name):
+            return None
+        stored = StoredFile.objects.filter(name=orphan.name).first()
+        if stored is not None and stored.refs > 0:
+            return None
+        created = (stored.created.timestamp() if stored is not None
+                   else orphan.mtime)
+        # Свежий файл может принадлежать ещё не сохранённому посту.
+        if created > border:
+            return False
+        if not dry_run:
+            remove(orphan.name, quarantine)
+        return True
+
+
+def collect(grace_hours=None, quarantine=None, dry_run=False):
+    """Находит файлы без ссылок и удаляет (или переносит в каталог
+    quarantine) те, что старше grace_hours часов, вместе с миниатюрами,
+    а затем — миниатюры картинок, которых больше нет. Выдаёт пары
+    (Orphan, убран ли файл: False — ещё не истёк срок); при dry_run
+    ничего не меняет."""
+    if grace_hours is None:
+        grace_hours = settings.MEDIA_GC_GRACE_HOURS
+    border = time.time() - grace_hours * 60 * 60
+    files = heapq.merge(*(walk_files(settings.MEDIA_ROOT, directory)
+                          for directory in upload_directories()))
+    for orphan in find_orphans(files, referenced_names()):
+        removed = sweep(orphan, border, quarantine, dry_run)
+        if removed is not None:
+            yield orphan, removed
+    live = live_thumbnails()
+    for orphan in walk_files(settings.MEDIA_ROOT, thumbnail_directory()):
+        if orphan.name in live:
+            continue
+        # Миниатюра могла появиться после чтения списка живых.
+        if orphan.mtime > border:
+            yield orphan, False
+            continue
+        if not dry_run:
+            remove_file(orphan.name, quarantine)
+        yield orphan, True
+    if not dry_run:
+        # Записи о миниатюрах и картинках, файлов которых больше нет.
+        thumbnail_store.cleanup()
+
+
+def remove(name, quarantine=None):
+    media_storage.delete_thumbnails(name)
+    StoredFile.objects.filter(name=name).delete()
+    remove_file(name, quarantine)
+
+
+def remove_file(name, quarantine=None):
+    path = media_storage.path(name)
+    if quarantine:
+        target = os.path.join(quarantine, name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.move(path, target)
+    else:
+        os.remove(path)
@@ -0,0 +1,126 @@
+"""
+Отложенное каскадное удаление пользователей и постов.
+
+Удаление плодовитого автора через collector Django загружает в память все
+его посты, комментарии и подписки и удаляет их одной долгой транзакцией,
+блокируя SQLite. Вместо этого schedule_purge сразу скрывает объект
+(пользователь становится неактивным, его посты исключаются из выборок),
+а задача posts.purge (или команда purge_deleted) удаляет зависимые записи
+пачками, каждая в своей короткой транзакции, и записывает прогресс
+в Purge. Файлы картинок удалённых постов освобождаются в хранилище.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.storage import media_storage
+from core.tasks import enqueue
+
+from .models import (ArchivedComment, ArchivedPost, Comment, Follow,
+                     GroupFollow, Like, Post, PostCard, Purge, Suggestion,
+                     User)
+
+HIDDEN_KEY = 'purge:hidden'
+# Другие процессы увидят новое удаление не позже чем через HIDDEN_TTL.
+HIDDEN_TTL = 60
+BATCH_SIZE = 500
+
+
+def schedule_purge(obj):
+    kind = Purge.USER if isinstance(obj, User) else Purge.POST
+    with transaction.atomic():
+        if kind == Purge.USER:
+            User.objects.filter(pk=obj.pk).update(is_active=False)
+        purge, _ = Purge.objects.get_or_create(kind=kind, object_id=obj.pk)
+        enqueue('posts.purge', {'purge': purge.pk}, key=f'purge:{purge.pk}',
+                priority=-10)
+    cache.delete(HIDDEN_KEY)
+
+
+def hidden_ids():
+    """id пользователей и постов, ожидающих удаления."""
+    hidden = cache.get(HIDDEN_KEY)
+    if hidden is None:
+        hidden = {Purge.USER: set(), Purge.POST: set()}
+        pending = Purge.objects.filter(finished__isnull=True)
+        for kind, object_id in pending.values_list('kind', 'object_id'):
+            hidden[kind].add(object_id)
+        cache.set(HIDDEN_KEY, hidden, HIDDEN_TTL)
+    return hidden
+
+
+def is_hidden(obj):
+    kind = Purge.USER if isinstance(obj, User) else Purge.POST
+    return obj.pk in hidden_ids()[kind]
+
+
+def visible(posts):
+    """Исключает из выборки постов скрытые посты и посты скрытых авторов."""
+    hidden = hidden_ids()
+    if hidden[Purge.USER]:
+        posts = posts.exclude(author_id__in=hidden[Purge.USER])
+    if hidden[Purge.POST]:
+        posts = posts.exclude(pk__in=hidden[Purge.POST])
+    return posts
+
+
+def dependents(purge):
+    """Выборки зависимых записей в порядке удаления: сначала листья,
+    чтобы collector не находил каскадов и не грузил связанные объекты."""
+    if purge.kind == Purge.POST:
+        return (
+            Comment.objects.filter(post_id=purge.object_id),
+            Like.objects.filter(post_id=purge.object_id),
+            PostCard.objects.filter(pk=purge.object_id),
+            Post.objects.filter(pk=purge.object_id),
+        )
+    user_id = purge.object_id
+    return (
+        Comment.objects.filter(Q(author_id=user_id)
+                               | Q(post__author_id=user_id)),
+        ArchivedComment.objects.filter(Q(author_id=user_id)
+                                       | Q(post__author_id=user_id)),
+        Follow.objects.filter(Q(user_id=user_id) | Q(author_id=user_id)),
+        GroupFollow.objects.filter(user_id=user_id),
+        Like.objects.filter(Q(user_id=user_id) | Q(post__author_id=user_id)),
+        Suggestion.objects.filter(Q(user_id=user_id) | Q(author_id=user_id)),
+        PostCard.objects.filter(author_id=user_id),
+        Post.objects.filter(author_id=user_id),
+        ArchivedPost.objects.filter(author_id=user_id),
+        User.objects.filter(pk=user_id),
+    )
+
+
+def release_images(posts):
+    """Снимает ссылки постов на файлы картинок; файл без ссылок
+    удаляется после фиксации транзакции."""
+    for name in posts.exclude(image='').values_list('image', flat=True):
+        media_storage.delete(name)
+
+
+def run_purge(purge, batch_size=BATCH_SIZE):
+    """Удаляет зависимые записи пачками, обновляя прогресс."""
+    for queryset in dependents(purge):
+        model = queryset.model
+        while True:
+            with transaction.atomic():
+                ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+                if not ids:
+                    break
+                if model in (Post, ArchivedPost):
+                    release_images(model.objects.filter(pk__in=ids))
+                deleted, _ = model.objects.filter(pk__in=ids).delete()
+                Purge.objects.filter(pk=purge.pk).update(
+                    deleted=F('deleted') + deleted)
+    Purge.objects.filter(pk=purge.pk).update(finished=timezone.now())
+    cache.delete(HIDDEN_KEY)
+
+
+def run_pending(batch_size=BATCH_SIZE):
+    pending = list(Purge.objects.filter(finished__isnull=True))
+    count = 0
+    for purge in pending:
+        run_purge(purge, batch_size)
+        count += 1
+    return count
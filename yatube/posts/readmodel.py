@@ -0,0 +1,207 @@
+"""
+Модель чтения для лент: PostCard.
+
+Даже с select_related каждая лента соединяет Post с пользователями и
+группами и собирает по три объекта на карточку. PostCard хранит в одной
+строке всё, что показывает карточка: текст, дату, картинку, её размеры и
+srcset миниатюр, имя и логин автора, адрес и название группы, число
+комментариев, просмотров и отметок. Ленты читают её values() по индексу
+(-pub_date), (author_id, -pub_date) или (group_id, -pub_date), без
+соединений.
+
+Нарезка миниатюр для srcset занимает заметное время, поэтому при
+сохранении поста карточка записывается с пустым srcset, а заполняет его
+задача posts.srcset в runworker. Пока её нет, тег post_image строит
+srcset сам.
+
+Строки обновляются сигналами при сохранении поста, пользователя, группы
+и комментария, счётчики просмотров и отметок — вместе с Post в
+posts.counters. bulk_create и update() сигналов не отправляют: после них
+нужно вызвать refresh_cards и recount_comments (или команду
+rebuild_cards).
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.tasks import enqueue
+
+from .models import Comment, Group, Post, PostCard
+from .thumbnails import build_srcset
+
+User = get_user_model()
+
+CARD_FIELDS = ('post_id', 'pub_date', 'updated_at', 'text', 'image',
+               'image_width', 'image_height', 'srcset', 'author_id',
+               'author_username', 'author_name', 'group_id', 'group_slug',
+               'group_title', 'comments', 'views', 'likes')
+BATCH_SIZE = 500
+
+
+def card_values(post):
+    """Поля карточки, которые берутся из поста, автора и группы, кроме
+    srcset."""
+    author, group = post.author, post.group
+    return {
+        'pub_date': post.pub_date,
+        'updated_at': post.updated_at,
+        'text': post.text,
+        'image': post.image.name or '',
+        'image_width': post.image_width,
+        'image_height': post.image_height,
+        'author_id': author.pk,
+        'author_username': author.username,
+        'author_name': author.get_full_name(),
+        'group_id': group and group.pk,
+        'group_slug': group.slug if group else '',
+        'group_title': group.title if group else '',
+    }
+
+
+def refresh_cards(posts, batch_size=BATCH_SIZE):
+    """Пересобирает карточки постов из выборки posts пачками, вместе
+    с миниатюрами. Возвращает число карточек."""
+    posts = (posts.select_related('author', 'group')
+             .annotate(comment_count=Count('comments')).order_by('pk'))
+    refreshed = 0
+    last_pk = 0
+    while True:
+        batch = list(posts.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return refreshed
+        ids = [post.pk for post in batch]
+        with transaction.atomic():
+            PostCard.objects.filter(pk__in=ids).delete()
+            PostCard.objects.bulk_create(
+                PostCard(post_id=post.pk, comments=post.comment_count,
+                         views=post.views, likes=post.likes,
+                         srcset=build_srcset(post.image, post.image_width),
+                         **card_values(post))
+                for post in batch)
+        refreshed += len(batch)
+        last_pk = ids[-1]
+
+
+def fill_srcset(post_ids):
+    """Строит srcset карточек постов post_ids. Карточку, картинку
+    которой успели сменить, оставляет следующей задаче."""
+    posts = Post.objects.filter(pk__in=post_ids).exclude(image='')
+    for post in posts.only('image', 'image_width'):
+        PostCard.objects.filter(pk=post.pk, image=post.image.name).update(
+            srcset=build_srcset(post.image, post.image_width))
+
+
+def recount_comments(post_ids):
+    """Пересчитывает число комментариев в карточках постов одним
+    UPDATE."""
+    counts = (Comment.objects.filter(post_id=OuterRef('pk'))
+              .order_by().values('post_id').annotate(count=Count('pk'))
+              .values('count'))
+    PostCard.objects.filter(pk__in=post_ids).update(
+        comments=Coalesce(Subquery(counts), 0))
+
+
+def as_posts(rows):
+    """Посты из строк PostCard.values(*CARD_FIELDS) без запросов к базе:
+    автор и группа собираются из сохранённых в строке полей."""
+    posts = []
+    for row in rows:
+        post = Post(id=row['post_id'], pub_date=row['pub_date'],
+                    updated_at=row['updated_at'], text=row['text'],
+                    image=row['image'], image_width=row['image_width'],
+                    image_height=row['image_height'],
+                    author_id=row['author_id'],
+                    group_id=row['group_id'], views=row['views'],
+                    likes=row['likes'])
+        post.author = User(id=row['author_id'],
+                           username=row['author_username'])
+        if row['group_id'] is not None:
+            post.group = Group(id=row['group_id'], slug=row['group_slug'],
+                               title=row['group_title'])
+        post.author_name = row['author_name']
+        post.srcset = row['srcset']
+        post.comment_count = row['comments']
+        posts.append(post)
+    return posts
+
+
+class CardList:
+    """Выборка PostCard для Paginator: срез отдаёт посты (см. as_posts)."""
+    ordered = True
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+
+    def count(self):
+        return self.queryset.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        return as_posts(self.queryset.values(*CARD_FIELDS)[index])
+
+
+@receiver(post_save, sender=Post)
+def save_card(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    values = card_values(instance)
+    cards = PostCard.objects.filter(pk=instance.pk)
+    if created:
+        PostCard.objects.create(post_id=instance.pk, **values)
+        changed = True
+    else:
+        # Сменившаяся картинка сбрасывает srcset прежней.
+        changed = cards.exclude(image=values['image']).update(
+            srcset='', **values)
+        if not changed and not cards.update(**values):
+            refresh_cards(Post.objects.filter(pk=instance.pk))
+    if changed and values['image']:
+        enqueue('posts.srcset', {'post': instance.pk})
+
+
+@receiver(post_save, sender=User)
+def update_author(sender, instance, raw=False, update_fields=None,
+                  **kwargs):
+    # Вход пользователя сохраняет только last_login.
+    if raw or update_fields and not {
+            'username', 'first_name', 'last_name'} & set(update_fields):
+        return
+    username, name = instance.username, instance.get_full_name()
+    (PostCard.objects.filter(author_id=instance.pk)
+     .exclude(author_username=username, author_name=name)
+     .update(author_username=username, author_name=name))
+
+
+@receiver(post_save, sender=Group)
+def update_group(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    (PostCard.objects.filter(group_id=instance.pk)
+     .exclude(group_slug=instance.slug, group_title=instance.title)
+     .update(group_slug=instance.slug, group_title=instance.title))
+
+
+@receiver(post_delete, sender=Group)
+def clear_group(sender, instance, **kwargs):
+    PostCard.objects.filter(group_id=instance.pk).update(
+        group_id=None, group_slug='', group_title='')
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        PostCard.objects.filter(pk=instance.post_id).update(
+            comments=F('comments') + 1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    PostCard.objects.filter(pk=instance.post_id, comments__gt=0).update(
+        comments=F('comments') - 1)
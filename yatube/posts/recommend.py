@@ -0,0 +1,212 @@
+"""
+Рекомендации «на кого подписаться».
+
+Граф подписок загружается из Follow пачками в массивы NumPy: id
+пользователей сжимаются в номера 0..n-1, а рёбра раскладываются в две
+CSR-структуры — подписки и подписчики каждого пользователя. На ребро
+уходит около 16 байт, так что миллионы подписок помещаются в десятки
+мегабайт.
+
+Для каждого пользователя u складываются две оценки кандидата c:
+- друзья друзей: сколько авторов из подписок u читают c;
+- соподписки: пользователи, читающие тех же авторов, что и u, голосуют
+  за свои подписки с весом косинусного сходства с u.
+
+Обход ограничен MAX_FANOUT подписчиками на автора и MAX_NEIGHBORS
+похожими пользователями, поэтому популярные авторы не раздувают расчёт.
+Результаты пишутся в Suggestion пачками, и в памяти не копятся.
+Самые читаемые авторы сохраняются и отдельным списком без пользователя:
+его показывают тем, кого нет в графе (см. posts.follows.suggestions).
+Рекомендации пользователей, выбывших из графа, удаляются.
+"""
+import numpy as np
+from django.db import transaction
+
+from .models import Follow, Suggestion
+
+TOP_K = 10
+MUTUAL_WEIGHT = 1.0
+COFOLLOW_WEIGHT = 1.0
+MAX_FANOUT = 1000
+MAX_NEIGHBORS = 100
+CHUNK_SIZE = 50000
+BATCH_SIZE = 1000
+
+
+def load_edges(chunk_size=CHUNK_SIZE):
+    """Все подписки как массив пар (user_id, author_id)."""
+    edges = np.empty((Follow.objects.count(), 2), dtype=np.int64)
+    size = 0
+    last_pk = 0
+    while True:
+        chunk = list(Follow.objects.filter(pk__gt=last_pk).order_by('pk')
+                     .values_list('pk', 'user_id', 'author_id')[:chunk_size])
+        if not chunk:
+            break
+        rows = np.array(chunk, dtype=np.int64)
+        # Подписки, добавленные во время загрузки, не помещаются в массив
+        # и войдут в следующий расчёт.
+        rows = rows[:len(edges) - size]
+        edges[size:size + len(rows)] = rows[:, 1:]
+        size += len(rows)
+        last_pk = chunk[-1][0]
+    return edges[:size]
+
+
+class FollowGraph:
+    """Граф подписок в CSR-массивах по сжатым номерам пользователей."""
+
+    def __init__(self, edges):
+        self.ids, compact = np.unique(edges, return_inverse=True)
+        compact = compact.reshape(-1, 2).astype(np.int32)
+        size = len(self.ids)
+        self.out_ptr, self.out_idx = self.csr(compact[:, 0], compact[:, 1],
+                                              size)
+        self.in_ptr, self.in_idx = self.csr(compact[:, 1], compact[:, 0],
+                                            size)
+        self.out_degree = np.diff(self.out_ptr)
+        self.in_degree = np.diff(self.in_ptr)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @staticmethod
+    def csr(rows, columns, size):
+        order = np.lexsort((columns, rows))
+        ptr = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=size), out=ptr[1:])
+        return ptr, columns[order]
+
+    @staticmethod
+    def gather(ptr, idx, rows, limit=None):
+        """Соседи строк rows одним массивом и номер строки для каждого
+        соседа; limit ограничивает число соседей у строки."""
+        starts = ptr[rows]
+        lengths = ptr[rows + 1] - starts
+        if limit is not None:
+            lengths = np.minimum(lengths, limit)
+        ends = np.cumsum(lengths)
+        positions = np.arange(ends[-1] if len(ends) else 0)
+        offsets = np.repeat(starts - ends + lengths, lengths)
+        owners = np.repeat(np.arange(len(rows)), lengths)
+        return idx[positions + offsets], owners
+
+    def following(self, node):
+        return self.out_idx[self.out_ptr[node]:self.out_ptr[node + 1]]
+
+    def suggest(self, node, top_k=TOP_K):
+        """Лучшие кандидаты для node: номера, оценки и число подписок
+        node, читающих кандидата."""
+        followees = self.following(node)
+        fof, _ = self.gather(self.out_ptr, self.out_idx, followees)
+        fof_authors, mutual_counts = np.unique(fof, return_counts=True)
+
+        similar, _ = self.gather(self.in_ptr, self.in_idx, followees,
+                                 MAX_FANOUT)
+        neighbours, shared = np.unique(similar, return_counts=True)
+        keep = neighbours != node
+        neighbours, shared = neighbours[keep], shared[keep]
+        if len(neighbours) > MAX_NEIGHBORS:
+            best = np.argpartition(-shared, MAX_NEIGHBORS)[:MAX_NEIGHBORS]
+            neighbours, shared = neighbours[best], shared[best]
+        weights = shared / np.sqrt(
+            len(followees) * self.out_degree[neighbours])
+        votes, owners = self.gather(self.out_ptr, self.out_idx, neighbours)
+        cof_authors, inverse = np.unique(votes, return_inverse=True)
+        cof_scores = np.bincount(inverse, weights=weights[owners],
+                                 minlength=len(cof_authors))
+
+        candidates = np.union1d(fof_authors, cof_authors)
+        mutuals = spread(candidates, fof_authors, mutual_counts)
+        scores = (MUTUAL_WEIGHT * mutuals
+                  + COFOLLOW_WEIGHT * spread(candidates, cof_authors,
+                                             cof_scores))
+        fresh = ~np.isin(candidates, followees) & (candidates != node)
+        candidates, scores, mutuals = (
+            candidates[fresh], scores[fresh], mutuals[fresh])
+        if len(candidates) > top_k:
+            best = np.argpartition(-scores, top_k)[:top_k]
+            candidates, scores, mutuals = (
+                candidates[best], scores[best], mutuals[best])
+        order = np.argsort(-scores, kind='stable')
+        return candidates[order], scores[order], mutuals[order]
+
+
+def spread(keys, subset, values):
+    """Значения для subset (отсортированного подмножества keys),
+    разложенные по позициям keys; на остальных позициях нули."""
+    result = np.zeros(len(keys), dtype=np.float64)
+    result[np.searchsorted(keys, subset)] = values
+    return result
+
+
+def popular(graph, top_k=TOP_K):
+    """Самые читаемые авторы — для тех, у кого ещё нет подписок."""
+    count = min(top_k + 1, len(graph))
+    best = np.argpartition(-graph.in_degree, count - 1)[:count]
+    best = best[np.argsort(-graph.in_degree[best], kind='stable')]
+    # Авторы без подписчиков в граф попали только своими подписками.
+    return best[graph.in_degree[best] > 0]
+
+
+def save(graph, results):
+    users = [int(graph.ids[node]) for node, _ in results]
+    with transaction.atomic():
+        Suggestion.objects.filter(user_id__in=users).delete()
+        Suggestion.objects.bulk_create(
+            Suggestion(user_id=int(graph.ids[node]),
+                       author_id=int(graph.ids[candidate]),
+                       score=float(score), mutuals=int(mutual))
+            for node, rows in results
+            for candidate, score, mutual in zip(*rows))
+
+
+def save_popular(graph, fallback):
+    with transaction.atomic():
+        Suggestion.objects.filter(user=None).delete()
+        Suggestion.objects.bulk_create(
+            Suggestion(author_id=int(graph.ids[author]),
+                       score=float(graph.in_degree[author]))
+            for author in fallback)
+
+
+def drop_stale(graph, batch_size=BATCH_SIZE):
+    """Удаляет рекомендации пользователей, которых нет в графе.
+    Возвращает число таких пользователей."""
+    users = np.array(Suggestion.objects.exclude(user=None)
+                     .values_list('user_id', flat=True).distinct(),
+                     dtype=np.int64)
+    stale = users[~np.isin(users, graph.ids)].tolist()
+    for start in range(0, len(stale), batch_size):
+        Suggestion.objects.filter(
+            user_id__in=stale[start:start + batch_size]).delete()
+    return len(stale)
+
+
+def recommend_follows(top_k=TOP_K, batch_size=BATCH_SIZE,
+                      chunk_size=CHUNK_SIZE):
+    """Пересчитывает рекомендации для всех участников графа подписок.
+    Возвращает число пользователей с рекомендациями."""
+    graph = FollowGraph(load_edges(chunk_size))
+    fallback = popular(graph, top_k) if len(graph) else []
+    save_popular(graph, fallback[:top_k])
+    drop_stale(graph, batch_size)
+    results = []
+    saved = 0
+    for node in range(len(graph)):
+        if graph.out_degree[node]:
+            rows = graph.suggest(node, top_k)
+        else:
+            authors = np.array([author for author in fallback
+                                if author != node][:top_k], dtype=np.int32)
+            rows = (authors, graph.in_degree[authors].astype(np.float64),
+                    np.zeros(len(authors), dtype=np.int32))
+        results.append((node, rows))
+        if len(results) == batch_size:
+            save(graph, results)
+            saved += len(results)
+            results = []
+    if results:
+        save(graph, results)
+        saved += len(results)
+    return saved
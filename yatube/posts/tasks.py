@@ -0,0 +1,18 @@
+from core.tasks import task
+
+from .models import Purge
+from .purge import run_purge
+from .readmodel import fill_srcset
+
+
+@task('posts.purge')
+def purge_task(payload):
+    purge = Purge.objects.filter(pk=payload['purge'],
+                                 finished__isnull=True).first()
+    if purge is not None:
+        run_purge(purge)
+
+
+@task('posts.srcset', batch=True)
+def srcset_task(payloads):
+    fill_srcset({payload['post'] for payload in payloads})
@@ -0,0 +1,22 @@
+from django import template
+from django.utils.html import format_html
+
+from posts.thumbnails import SIZES, build_srcset, height_for, parse_srcset
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_image(post, layout='feed'):
+    """<img> картинки поста с srcset, размерами и ленивой загрузкой.
+    Посты из PostCard приносят готовый srcset."""
+    srcset = (getattr(post, 'srcset', '')
+              or build_srcset(post.image, post.image_width))
+    if not srcset:
+        return ''
+    src, width = parse_srcset(srcset)[-1]
+    return format_html(
+        '<img class="card-img img-fluid my-2" src="{}" srcset="{}" '
+        'sizes="{}" width="{}" height="{}" loading="lazy" '
+        'decoding="async" alt="">',
+        src, srcset, SIZES[layout], width, height_for(width))
@@ -0,0 +1,71 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts.models import Post
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, POST_IMAGE_MAX_SIZE=100)
+class PostAdminTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        self.author = User.objects.create_user(username='author')
+        self.client.force_login(self.admin)
+
+    def test_add_post_with_author_and_image(self):
+        buffer = BytesIO()
+        Image.new('RGB', (300, 150), 'red').save(buffer, 'PNG')
+        response = self.client.post(reverse('admin:posts_post_add'), {
+            'text': 'Пост из админки',
+            'author': self.author.pk,
+            'image': SimpleUploadedFile('photo.png', buffer.getvalue(),
+                                        'image/png')})
+        self.assertEqual(response.status_code, 302)
+        post = Post.objects.get()
+        self.assertEqual(post.author, self.author)
+        self.assertTrue(post.image.name.endswith('.jpg'))
+        self.assertEqual((post.image_width, post.image_height), (100, 50))
+
+    def test_change_post_author(self):
+        post = Post.objects.create(author=self.admin, text='Пост')
+        url = reverse('admin:posts_post_change', args=[post.pk])
+        response = self.client.get(url)
+        self.assertIn('author', response.context['adminform'].form.fields)
+        response = self.client.post(url, {'text': 'Пост',
+                                          'author': self.author.pk})
+        self.assertEqual(response.status_code, 302)
+        post.refresh_from_db()
+        self.assertEqual(post.author, self.author)
+
+    def test_delete_user_checks_dependent_permissions(self):
+        """Удалить автора может только тот, кому можно удалять и его
+        посты."""
+        Post.objects.create(author=self.author, text='Пост')
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        staff.user_permissions.set(Permission.objects.filter(
+            codename__in=('view_user', 'delete_user')))
+        self.client.force_login(staff)
+        url = reverse('admin:auth_user_delete', args=[self.author.pk])
+        response = self.client.get(url)
+        self.assertEqual(response.context['perms_lacking'],
+                         {Post._meta.verbose_name})
+        self.client.force_login(self.admin)
+        response = self.client.get(url)
+        self.assertFalse(response.context['perms_lacking'])
@@ -0,0 +1,100 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from posts.archive import archive_posts, search_posts
+from posts.counters import increment, view_counter
+from posts.likes import like
+from posts.models import ArchivedPost, Comment, Like, LikeDelta, Post, PostCard
+
+User = get_user_model()
+
+
+class ArchiveTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.old_post = Post.objects.create(author=cls.user,
+                                           text='Старый пост')
+        Comment.objects.create(post=cls.old_post, author=cls.user,
+                               text='Старый комментарий')
+        Post.objects.filter(pk=cls.old_post.pk).update(
+            pub_date=timezone.now() - timedelta(days=400))
+        cls.new_post = Post.objects.create(author=cls.user,
+                                           text='Новый пост')
+
+    def setUp(self):
+        self.moved = archive_posts(days=365, batch_size=1)
+
+    def test_old_posts_moved_with_comments(self):
+        """Старые посты с комментариями уходят в архив, новые остаются."""
+        self.assertEqual(self.moved, 1)
+        self.assertEqual(list(Post.objects.all()), [self.new_post])
+        archived = ArchivedPost.objects.get(pk=self.old_post.pk)
+        self.assertEqual(archived.comments.get().text, 'Старый комментарий')
+        self.assertFalse(Comment.objects.exists())
+
+    def test_post_detail_finds_archived_post(self):
+        """Страница архивного поста открывается по старому адресу."""
+        response = self.client.get(reverse(
+            'posts:post_detail', kwargs={'post_id': self.old_post.pk}))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['is_archived'])
+        self.assertContains(response, 'Старый комментарий')
+
+    def test_profile_lists_live_then_archived(self):
+        """Профиль показывает живые и архивные посты по убыванию даты."""
+        response = self.client.get(reverse(
+            'posts:profile', kwargs={'username': self.user.username}))
+        texts = [post.text for post in response.context['page_obj']]
+        self.assertEqual(texts, ['Новый пост', 'Старый пост'])
+
+    def test_search_finds_archived_posts(self):
+        self.assertEqual(len(search_posts('пост')), 2)
+
+    def test_search_page_lists_live_then_archived(self):
+        response = self.client.get(reverse('posts:search'), {'q': 'пост'})
+        texts = [post.text for post in response.context['page_obj']]
+        self.assertEqual(texts, ['Новый пост', 'Старый пост'])
+        response = self.client.get(reverse('posts:search'), {'q': 'Старый'})
+        self.assertEqual(
+            [post.text for post in response.context['page_obj']],
+            ['Старый пост'])
+
+    def test_search_without_query(self):
+        response = self.client.get(reverse('posts:search'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['page_obj'].paginator.count, 0)
+
+
+class ArchiveCountersTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='auth')
+        self.post = Post.objects.create(author=self.user, text='Старый пост')
+        Post.objects.filter(pk=self.post.pk).update(
+            pub_date=timezone.now() - timedelta(days=400))
+        view_counter.flush()
+
+    def test_pending_counters_kept(self):
+        """Неучтённые отметки и просмотры попадают в архивный пост, а
+        отметки и карточка удаляются."""
+        like(self.user, self.post)
+        view_counter.add(self.post.pk)
+        archive_posts(days=365)
+        archived = ArchivedPost.objects.get(pk=self.post.pk)
+        self.assertEqual((archived.likes, archived.views), (1, 1))
+        self.assertFalse(LikeDelta.objects.exists())
+        self.assertFalse(Like.objects.exists())
+        self.assertFalse(PostCard.objects.exists())
+
+    def test_late_increment_lands_in_archive(self):
+        """Приращение, записанное после переноса, не теряется."""
+        archive_posts(days=365)
+        increment('views', {self.post.pk: 3})
+        self.assertEqual(
+            ArchivedPost.objects.get(pk=self.post.pk).views, 3)
@@ -0,0 +1,65 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from posts.cards import card_key, render_cards
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class CardCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.group = Group.objects.create(title='Группа', slug='group',
+                                          description='Описание')
+        self.post = Post.objects.create(author=self.author, group=self.group,
+                                        text='Текст поста')
+
+    def tearDown(self):
+        cache.clear()
+
+    def fresh(self):
+        return Post.objects.select_related('author', 'group').get(
+            pk=self.post.pk)
+
+    def test_key_follows_post_author_and_group(self):
+        key = card_key(self.fresh())
+        self.assertEqual(card_key(self.fresh()), key)
+        for obj, field, value in ((self.post, 'text', 'Новый текст'),
+                                  (self.author, 'first_name', 'Имя'),
+                                  (self.group, 'title', 'Другая')):
+            setattr(obj, field, value)
+            obj.save()
+            new_key = card_key(self.fresh())
+            self.assertNotEqual(new_key, key)
+            key = new_key
+
+    def test_cached_card_is_not_rendered_again(self):
+        first = render_cards([self.fresh()])
+        self.assertIn('Текст поста', first[0][1])
+        with mock.patch('posts.cards.render_to_string') as render:
+            second = render_cards([self.fresh()])
+        render.assert_not_called()
+        self.assertEqual(second[0][1], first[0][1])
+
+    def test_page_reads_cache_once(self):
+        for number in range(5):
+            Post.objects.create(author=self.author, text=f'Пост {number}')
+        with mock.patch('posts.cards.cache') as mocked:
+            mocked.get_many.return_value = {}
+            response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Пост 4')
+        self.assertEqual(mocked.get_many.call_count, 1)
+        self.assertEqual(mocked.set_many.call_count, 1)
+
+    def test_edit_shows_on_page(self):
+        url = reverse('posts:profile', args=[self.author.username])
+        self.client.get(url)
+        self.post.text = 'Исправленный текст'
+        self.post.save()
+        self.assertContains(self.client.get(url), 'Исправленный текст')
@@ -0,0 +1,84 @@
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from posts.models import ArchivedPost, Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ExportImportTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            group=cls.group
+        )
+        Comment.objects.create(post=cls.post, author=cls.reader,
+                               text='Тестовый комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'dump.ndjson.gz')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_export_import_roundtrip(self):
+        """Выгрузка и загрузка переносят посты со связями и датами."""
+        call_command('export_posts', self.path, '--chunk-size', 1,
+                     stderr=StringIO())
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        call_command('import_posts', self.path, '--batch-size', 1,
+                     stdout=StringIO())
+        post = Post.objects.get()
+        self.assertEqual(post.text, self.post.text)
+        self.assertEqual(post.pub_date, self.post.pub_date)
+        self.assertEqual(post.author.username, 'auth')
+        self.assertEqual(post.group.slug, 'slug')
+        comment = post.comments.get()
+        self.assertEqual(comment.author.username, 'reader')
+        self.assertTrue(Follow.objects.filter(
+            user__username='reader', author__username='auth').exists())
+
+    def test_import_keeps_existing_posts(self):
+        """Импорт поверх живой базы не перезаписывает посты."""
+        call_command('export_posts', self.path,
+                     stderr=StringIO())
+        call_command('import_posts', self.path,
+                     stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(Comment.objects.count(), 2)
+
+    def test_import_archives_old_posts(self):
+        """Посты старше порога архива загружаются сразу в архив вместе
+        с комментариями."""
+        Post.objects.filter(pk=self.post.pk).update(
+            pub_date=timezone.now() - timedelta(days=400))
+        call_command('export_posts', self.path, stderr=StringIO())
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        call_command('import_posts', self.path, stdout=StringIO())
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(Comment.objects.exists())
+        post = ArchivedPost.objects.get()
+        self.assertEqual(post.text, self.post.text)
+        self.assertEqual(post.comments.get().author.username, 'reader')
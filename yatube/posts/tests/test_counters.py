@@ -0,0 +1,84 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.counters import ViewCounter, view_counter
+from posts.models import Post, TrendingEvent
+
+User = get_user_model()
+
+
+class ViewCounterTests(TestCase):
+
+    def setUp(self):
+        view_counter.flush()
+        self.author = User.objects.create_user(username='author')
+        self.posts = [Post.objects.create(author=self.author,
+                                          text=f'Пост {number}')
+                      for number in range(3)]
+
+    def test_views_buffered_until_flush(self):
+        """Просмотры не пишутся в базу на каждый запрос."""
+        url = reverse('posts:post_detail',
+                      kwargs={'post_id': self.posts[0].pk})
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertFalse(any(query['sql'].startswith('UPDATE')
+                             for query in queries.captured_queries))
+        self.client.get(url)
+        self.assertEqual(view_counter.pending(self.posts[0].pk), 2)
+        self.posts[0].refresh_from_db()
+        self.assertEqual(self.posts[0].views, 0)
+
+    def test_flush_is_one_update_per_table(self):
+        for post, count in zip(self.posts, (3, 1, 2)):
+            for _ in range(count):
+                view_counter.add(post.pk)
+        with CaptureQueriesContext(connection) as queries:
+            view_counter.flush()
+        updates = [query['sql'].split()[1]
+                   for query in queries.captured_queries
+                   if query['sql'].startswith('UPDATE')]
+        self.assertEqual(updates, ['"posts_post"', '"posts_postcard"'])
+        self.assertEqual(
+            list(Post.objects.order_by('pk').values_list('views', flat=True)),
+            [3, 1, 2])
+        self.assertEqual(TrendingEvent.objects.count(), 3)
+
+    def test_edit_keeps_views(self):
+        """Сохранение поста со старым значением не затирает просмотры."""
+        post = Post.objects.get(pk=self.posts[0].pk)
+        view_counter.add(post.pk)
+        view_counter.flush()
+        post.text = 'Новый текст'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual((post.text, post.views), ('Новый текст', 1))
+
+    def test_timer_flushes_without_new_views(self):
+        """Буфер записывается по времени, даже если просмотров больше
+        нет."""
+        counter = ViewCounter(interval=0.05)
+        with mock.patch.object(counter, 'flush') as flush:
+            counter.start_timer()
+            counter.add(self.posts[0].pk)
+            for _ in range(100):
+                if flush.called:
+                    break
+                time.sleep(0.01)
+            # Поток продолжит работать: ему нечего записывать в базу.
+            counter.views.clear()
+        flush.assert_called()
+
+    def test_failed_flush_keeps_views(self):
+        counter = ViewCounter()
+        counter.views[self.posts[0].pk] = 2
+        with mock.patch('posts.counters.increment',
+                        side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                counter.flush()
+        self.assertEqual(counter.pending(self.posts[0].pk), 2)
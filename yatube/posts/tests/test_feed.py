@@ -0,0 +1,110 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from posts.feed import feed_page, feed_sources, merge_streams
+from posts.models import Follow, Group, GroupFollow, Post
+from posts.readmodel import refresh_cards
+
+User = get_user_model()
+
+
+class FeedTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.stranger = User.objects.create_user(username='stranger')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        GroupFollow.objects.create(user=cls.reader, group=cls.group)
+        now = timezone.now()
+        cls.expected = []
+        for number in range(15):
+            if number % 3 == 0:
+                post = Post(author=cls.author, group=cls.group)
+            elif number % 3 == 1:
+                post = Post(author=cls.author)
+            else:
+                post = Post(author=cls.stranger, group=cls.group)
+            post.text = f'Пост {number}'
+            post.save()
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=now - timedelta(minutes=number))
+            cls.expected.append(post.text)
+        Post.objects.create(author=cls.stranger, text='Чужой пост')
+        # update() не отправляет сигналов, карточки пересобираются вручную.
+        refresh_cards(Post.objects.all())
+
+    def test_merge_streams_deduplicates(self):
+        first = [Post(pk=3, pub_date=timezone.now()),
+                 Post(pk=1, pub_date=timezone.now() - timedelta(hours=1))]
+        second = [first[0], Post(pk=2, pub_date=first[1].pub_date)]
+        merged = merge_streams([first, second], 10)
+        self.assertEqual([post.pk for post in merged], [3, 2, 1])
+
+    def test_feed_pages_with_cursor(self):
+        """Лента объединяет авторов и сообщества без повторов и листается
+        курсором."""
+        texts = []
+        cursor = None
+        while True:
+            posts, cursor = feed_page(self.reader, cursor, size=4)
+            texts.extend(post.text for post in posts)
+            if cursor is None:
+                break
+        self.assertEqual(texts, self.expected)
+
+    def test_feed_queries_per_page(self):
+        """Страница ленты — два запроса подписок и по запросу на источник,
+        без OR по подпискам."""
+        with CaptureQueriesContext(connection) as queries:
+            posts, _ = feed_page(self.reader, size=4)
+            [post.author.username for post in posts]
+        self.assertLessEqual(len(queries), 4)
+        self.assertFalse(any(' OR ' in query['sql']
+                             for query in queries.captured_queries))
+
+    def test_stream_per_source(self):
+        """Каждый автор и сообщество — свой упорядоченный поток; сверх
+        MAX_SOURCES — общие потоки с IN."""
+        sql = [str(source.query) for source in feed_sources(self.reader)]
+        self.assertEqual(len(sql), 2)
+        self.assertFalse(any(' IN ' in query for query in sql))
+        with mock.patch('posts.feed.MAX_SOURCES', 1):
+            sql = [str(source.query)
+                   for source in feed_sources(self.reader)]
+            self.assertEqual(len(sql), 2)
+            self.assertTrue(all(' IN ' in query for query in sql))
+            posts, _ = feed_page(self.reader, size=20)
+        self.assertEqual([post.text for post in posts], self.expected)
+
+    def test_follow_index_view(self):
+        self.client.force_login(self.reader)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(len(response.context['page_obj']), 10)
+        response = self.client.get(reverse('posts:follow_index'),
+                                   {'cursor': response.context['next_cursor']})
+        self.assertEqual(len(response.context['page_obj']), 5)
+        self.assertIsNone(response.context['next_cursor'])
+
+    def test_group_follow_view(self):
+        self.client.force_login(self.stranger)
+        self.client.get(reverse('posts:group_follow',
+                                kwargs={'slug': self.group.slug}))
+        self.client.get(reverse('posts:group_follow',
+                                kwargs={'slug': self.group.slug}))
+        self.assertEqual(GroupFollow.objects.filter(
+            user=self.stranger).count(), 1)
+        self.client.get(reverse('posts:group_unfollow',
+                                kwargs={'slug': self.group.slug}))
+        self.assertFalse(GroupFollow.objects.filter(
+            user=self.stranger).exists())
@@ -0,0 +1,69 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from posts.follows import follow, follow_many, unfollow, unfollow_many
+from posts.graph import follow_graph
+from posts.models import Follow, FollowLog
+
+User = get_user_model()
+
+
+class FollowServiceTests(TestCase):
+
+    def setUp(self):
+        follow_graph.reset()
+        self.user = User.objects.create_user(username='user')
+        self.authors = [User.objects.create_user(username=f'author{number}')
+                        for number in range(3)]
+
+    def tearDown(self):
+        follow_graph.reset()
+
+    def test_follow_reports_transition(self):
+        """Повторная подписка ничего не меняет и не пишет дубль."""
+        author = self.authors[0]
+        self.assertTrue(follow(self.user, author))
+        self.assertFalse(follow(self.user, author))
+        self.assertFalse(follow(self.user, self.user))
+        self.assertEqual(Follow.objects.count(), 1)
+
+    def test_unfollow_reports_transition(self):
+        author = self.authors[0]
+        self.assertFalse(unfollow(self.user, author))
+        follow(self.user, author)
+        self.assertTrue(unfollow(self.user, author))
+        self.assertFalse(Follow.objects.exists())
+
+    def test_counters_follow_real_transitions(self):
+        """Счётчики меняются только при реальной смене состояния."""
+        author = self.authors[0]
+        follow_graph.build()
+        follow(self.user, author)
+        follow(self.user, author)
+        self.assertEqual(follow_graph.counts(author.pk)['followers'], 1)
+        self.assertEqual(follow_graph.counts(self.user.pk)['following'], 1)
+        unfollow(self.user, author)
+        unfollow(self.user, author)
+        self.assertEqual(follow_graph.counts(author.pk)['followers'], 0)
+        self.assertEqual(FollowLog.objects.count(), 2)
+
+    def test_follow_many(self):
+        follow(self.user, self.authors[0])
+        added = follow_many(self.user, self.authors + [self.user])
+        self.assertEqual(added, [author.pk for author in self.authors[1:]])
+        self.assertEqual(follow_graph.counts(self.user.pk)['following'], 3)
+        removed = unfollow_many(self.user, self.authors[:2])
+        self.assertEqual(removed, [author.pk for author in self.authors[:2]])
+        self.assertEqual(Follow.objects.get().author, self.authors[2])
+
+    def test_follow_bulk_view(self):
+        """Массовая подписка одним POST-запросом."""
+        self.client.force_login(self.user)
+        url = reverse('posts:follow_bulk')
+        response = self.client.post(
+            url, {'author': ['author0', 'author1', 'unknown']})
+        self.assertRedirects(response, reverse('posts:follow_index'))
+        self.assertEqual(Follow.objects.filter(user=self.user).count(), 2)
+        self.client.post(url, {'author': ['author0'], 'action': 'unfollow'})
+        self.assertEqual(Follow.objects.get().author.username, 'author1')
+        self.assertEqual(self.client.get(url).status_code, 405)
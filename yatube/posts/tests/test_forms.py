@@ -1,14 +1,25 @@
+import shutil
+import tempfile
+
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from posts.models import Comment, Group, Post
 
 User = get_user_model()
 
+MEDIA_ROOT = tempfile.mkdtemp()
+
 
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
 class PostFormTests(TestCase):
 
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
@@ -71,7 +82,8 @@ class PostFormTests(TestCase):
                                             author=self.post.author,
                                             group=self.post.pk).exists())
         self.assertEqual(response.context.get('page_obj')[0].image.name,
-                         self.post.image.name)
+                         Post.objects.latest('pk').image.name)
+        self.assertTrue(Post.objects.latest('pk').image)
 
     def test_edit_post(self):
         """Test post save after edit"""
@@ -0,0 +1,91 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from posts.follows import follow
+from posts.graph import follow_graph, prune_log
+from posts.models import Follow, FollowLog
+
+User = get_user_model()
+
+
+class FollowGraphTests(TestCase):
+
+    def setUp(self):
+        follow_graph.reset()
+        self.ann, self.bob, self.cat = (
+            User.objects.create_user(username=name)
+            for name in ('ann', 'bob', 'cat'))
+        Follow.objects.bulk_create([
+            Follow(user=self.ann, author=self.bob),
+            Follow(user=self.bob, author=self.ann),
+            Follow(user=self.ann, author=self.cat),
+        ])
+
+    def tearDown(self):
+        follow_graph.reset()
+
+    def test_answers_from_memory(self):
+        """После построения граф отвечает без запросов к базе."""
+        follow_graph.build()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(follow_graph.is_following(self.ann.pk,
+                                                      self.cat.pk))
+            self.assertFalse(follow_graph.is_following(self.cat.pk,
+                                                       self.ann.pk))
+            self.assertEqual(follow_graph.mutuals(self.ann.pk),
+                             [self.bob.pk])
+            self.assertEqual(follow_graph.counts(self.ann.pk),
+                             {'followers': 1, 'following': 2})
+        self.assertEqual(len(queries), 0)
+
+    def test_local_follow_applied_immediately(self):
+        follow_graph.build()
+        follow(self.cat, self.ann)
+        self.assertEqual(follow_graph.mutuals(self.ann.pk),
+                         [self.bob.pk, self.cat.pk])
+
+    @override_settings(FOLLOW_GRAPH_SYNC=0)
+    def test_sync_reads_log_of_other_processes(self):
+        """Изменения других процессов приходят через журнал."""
+        follow_graph.build()
+        Follow.objects.filter(user=self.ann, author=self.cat).delete()
+        FollowLog.objects.create(user_id=self.ann.pk, author_id=self.cat.pk,
+                                 followed=False)
+        self.assertFalse(follow_graph.is_following(self.ann.pk,
+                                                   self.cat.pk))
+
+    def test_profile_uses_graph(self):
+        self.client.force_login(self.cat)
+        self.client.get(reverse('posts:profile',
+                                kwargs={'username': self.ann.username}))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(
+                'posts:profile', kwargs={'username': self.ann.username}))
+        self.assertTrue(response.context['follows_you'])
+        self.assertFalse(response.context['following'])
+        self.assertEqual(response.context['counts']['followers'], 1)
+        self.assertFalse(any(
+            query['sql'].startswith('SELECT (1) AS "a" FROM "posts_follow"')
+            for query in queries.captured_queries))
+
+    @override_settings(FOLLOW_GRAPH_REBUILD=60)
+    def test_build_does_not_write(self):
+        """Построение графа только читает базу; старый журнал удаляет
+        prune_log."""
+        old = FollowLog.objects.create(user_id=self.ann.pk,
+                                       author_id=self.cat.pk, followed=True)
+        FollowLog.objects.filter(pk=old.pk).update(
+            created=timezone.now() - timedelta(minutes=5))
+        fresh = FollowLog.objects.create(user_id=self.cat.pk,
+                                         author_id=self.ann.pk, followed=True)
+        with CaptureQueriesContext(connection) as queries:
+            follow_graph.build()
+        self.assertTrue(all(query['sql'].startswith('SELECT')
+                            for query in queries.captured_queries))
+        self.assertEqual(prune_log(), 1)
+        self.assertEqual(list(FollowLog.objects.all()), [fresh])
@@ -0,0 +1,96 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase
+from django.utils.cache import get_cache_key
+from core.warmup import warm_pages
+from posts.cards import card_key
+from posts.hot import hot_targets, log_targets
+from posts.models import Group, Post, PostCard
+from posts.readmodel import CardList
+
+User = get_user_model()
+
+LOG = [
+    '1.2.3.4 - - [19/Oct/2026:10:00:00 +0000] "GET / HTTP/1.1" 200 512',
+    '1.2.3.4 - - [19/Oct/2026:10:00:01 +0000] "GET / HTTP/1.1" 200 512',
+    '1.2.3.4 - - [19/Oct/2026:10:00:02 +0000] "GET /group/hot/ HTTP/1.1" '
+    '200 512 "-" "Mozilla"',
+    '1.2.3.4 - - [19/Oct/2026:10:00:03 +0000] "GET /static/a.css HTTP/1.1" '
+    '200 512',
+    '1.2.3.4 - - [19/Oct/2026:10:00:04 +0000] "GET /missing/ HTTP/1.1" '
+    '404 0',
+    '1.2.3.4 - - [19/Oct/2026:10:00:05 +0000] "GET /trending/ HTTP/1.1" '
+    '200 512',
+    '1.2.3.4 - - [19/Oct/2026:10:00:06 +0000] "GET /posts/1/ HTTP/1.1" '
+    '200 512',
+    '1.2.3.4 - - [19/Oct/2026:10:00:07 +0000] "GET /posts/1/ HTTP/1.1" '
+    '200 512',
+    '1.2.3.4 - - [19/Oct/2026:10:00:08 +0000] "GET /posts/1/ HTTP/1.1" '
+    '200 512',
+]
+
+
+class WarmCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.hot = Group.objects.create(title='Горячая', slug='hot',
+                                        description='Описание')
+        self.cold = Group.objects.create(title='Тихая', slug='cold',
+                                         description='Описание')
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        for number in range(12):
+            Post.objects.create(author=self.author, group=self.hot,
+                                text=f'Пост {number}')
+        post = Post.objects.create(author=self.reader, group=self.cold,
+                                   text='Тихий пост')
+        PostCard.objects.filter(pk=post.pk).update(views=5)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_hot_targets(self):
+        urls = hot_targets(pages=3, groups=1, profiles=2)
+        self.assertEqual(urls[:3], ['/', '/?page=2', '/trending/'])
+        self.assertIn('/group/hot/?page=2', urls)
+        self.assertNotIn('/group/hot/?page=3', urls)
+        self.assertNotIn('/group/cold/', urls)
+        self.assertIn('/profile/author/', urls)
+        self.assertIn('/profile/reader/', urls)
+
+    def test_log_targets(self):
+        """Страницы постов не прогреваются: их запрос засчитал бы
+        просмотр."""
+        urls, share = log_targets(LOG, 2)
+        self.assertEqual(urls, ['/', '/group/hot/'])
+        self.assertEqual(share, 3 / 7)
+
+    def test_command_fills_card_cache(self):
+        call_command('warm_cache', processes=0, rate=0, groups=1,
+                     profiles=1)
+        posts = CardList(PostCard.objects.filter(group_id=self.hot.pk))[:10]
+        keys = [card_key(post) for post in posts]
+        self.assertEqual(len(cache.get_many(keys)), 10)
+
+    def test_page_cache_key_matches_site(self):
+        """Прогретая главная лежит под ключом запроса к настоящему
+        хосту, а не к testserver."""
+        results = warm_pages(['/'], processes=0, rate=0,
+                             host='localhost', scheme='https')
+        self.assertEqual(results[0][1], 200)
+        site = RequestFactory().get('/', secure=True, HTTP_HOST='localhost')
+        key = get_cache_key(site, key_prefix='index_page', cache=cache)
+        self.assertIsNotNone(cache.get(key))
+        other = RequestFactory().get('/')
+        self.assertIsNone(get_cache_key(other, key_prefix='index_page',
+                                        cache=cache))
+
+    def test_command_warns_about_local_cache(self):
+        stderr = StringIO()
+        call_command('warm_cache', processes=0, rate=0, groups=0,
+                     profiles=0, pages=0, stdout=StringIO(), stderr=stderr)
+        self.assertIn('в памяти процесса', stderr.getvalue())
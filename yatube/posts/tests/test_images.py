@@ -0,0 +1,148 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from core.models import StoredFile
+from core.storage import is_content_name, media_storage
+from posts.images import WEBP
+from posts.models import Post, PostCard
+from posts.purge import run_pending, schedule_purge
+from posts.thumbnails import parse_srcset
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+# Тег EXIF Orientation.
+ORIENTATION = 0x0112
+
+
+def image_bytes(size=(40, 20), color='red', mode='RGB', format='JPEG',
+                orientation=None):
+    exif = Image.Exif()
+    if orientation:
+        exif[ORIENTATION] = orientation
+    buffer = BytesIO()
+    Image.new(mode, size, color).save(buffer, format, exif=exif)
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, POST_IMAGE_MAX_SIZE=100)
+class PostImageTests(TransactionTestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='auth')
+        self.client.force_login(self.user)
+
+    def upload(self, content=None, name='photo.jpg', post=None):
+        image = SimpleUploadedFile(name, content or image_bytes(),
+                                   'image/jpeg')
+        url = (reverse('posts:post_edit', kwargs={'post_id': post.pk})
+               if post else reverse('posts:post_create'))
+        self.client.post(url, {'text': 'Пост с картинкой', 'image': image})
+        return Post.objects.latest('pk')
+
+    def test_same_image_uploaded_once(self):
+        first, second = self.upload(), self.upload(name='copy.jpg')
+        self.assertTrue(is_content_name(first.image.name))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(StoredFile.objects.get().refs, 2)
+        response = self.client.get(first.image.url)
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_replaced_image_released(self):
+        post = self.upload()
+        old = post.image.name
+        self.upload(image_bytes(color='blue'), post=post)
+        post.refresh_from_db()
+        self.assertNotEqual(post.image.name, old)
+        self.assertFalse(media_storage.exists(old))
+        self.assertTrue(media_storage.exists(post.image.name))
+
+    def test_same_image_reuploaded(self):
+        """Повторная загрузка той же картинки в пост не добавляет
+        ссылку."""
+        post = self.upload()
+        post = self.upload(post=post)
+        stored = StoredFile.objects.get()
+        self.assertEqual(stored.name, post.image.name)
+        self.assertEqual(stored.refs, 1)
+
+    def test_purge_releases_image(self):
+        post, copy = self.upload(), self.upload()
+        schedule_purge(post)
+        run_pending()
+        self.assertTrue(media_storage.exists(copy.image.name))
+        schedule_purge(copy)
+        run_pending()
+        self.assertFalse(media_storage.exists(copy.image.name))
+
+    def test_rehash_media(self):
+        with open(media_storage.path('posts/legacy.jpg'), 'wb') as image:
+            image.write(image_bytes())
+        post = Post.objects.create(author=self.user, text='Старый пост',
+                                   image='posts/legacy.jpg')
+        name = media_storage.save('posts/copy.jpg',
+                                  ContentFile(image_bytes()))
+        call_command('rehash_media', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.image.name, name)
+        self.assertEqual(PostCard.objects.get(pk=post.pk).image, name)
+        self.assertFalse(media_storage.exists('posts/legacy.jpg'))
+        self.assertEqual(StoredFile.objects.get().refs, 2)
+
+    def test_upload_normalized(self):
+        """Фото поворачивается по EXIF, уменьшается и пережимается
+        в прогрессивный JPEG без метаданных."""
+        post = self.upload(image_bytes((300, 150), orientation=6),
+                           name='Photo.JPEG')
+        self.assertTrue(post.image.name.endswith('.jpg'))
+        self.assertEqual((post.image_width, post.image_height), (50, 100))
+        self.assertEqual(post.image_bytes, post.image.size)
+        card = PostCard.objects.get(pk=post.pk)
+        self.assertEqual((card.image_width, card.image_height), (50, 100))
+        with Image.open(post.image.path) as stored:
+            self.assertEqual(stored.size, (50, 100))
+            self.assertTrue(stored.info.get('progressive'))
+            self.assertNotIn(ORIENTATION, stored.getexif())
+
+    def test_transparent_upload_keeps_alpha(self):
+        post = self.upload(image_bytes(mode='RGBA', color=(0, 0, 0, 0),
+                                       format='PNG'), name='logo.png')
+        self.assertTrue(post.image.name.endswith('.webp' if WEBP
+                                                 else '.png'))
+        with Image.open(post.image.path) as stored:
+            self.assertIn('A', stored.getbands())
+
+    def test_broken_upload_rejected(self):
+        count = Post.objects.count()
+        response = self.client.post(reverse('posts:post_create'), {
+            'text': 'Пост', 'image': SimpleUploadedFile(
+                'photo.jpg', image_bytes()[:100], 'image/jpeg')})
+        self.assertTrue(response.context['form'].errors['image'])
+        self.assertEqual(Post.objects.count(), count)
+
+    def test_fill_image_sizes(self):
+        name = media_storage.save('posts/photo.jpg',
+                                  ContentFile(image_bytes((30, 10))))
+        post = Post.objects.create(author=self.user, text='Старый пост',
+                                   image=name)
+        call_command('fill_image_sizes', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual((post.image_width, post.image_height), (30, 10))
+        card = PostCard.objects.get(pk=post.pk)
+        self.assertEqual(card.image_width, 30)
+        self.assertEqual([width for _, width in parse_srcset(card.srcset)],
+                         [320])
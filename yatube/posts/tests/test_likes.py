@@ -0,0 +1,74 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.likes import fold_likes, like, liked_ids, unlike
+from posts.models import Like, LikeDelta, Post
+
+User = get_user_model()
+
+
+class LikeTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='user')
+        self.author = User.objects.create_user(username='author')
+        self.posts = [Post.objects.create(author=self.author,
+                                          text=f'Пост {number}')
+                      for number in range(12)]
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_like_is_idempotent(self):
+        post = self.posts[0]
+        self.assertTrue(like(self.user, post))
+        self.assertFalse(like(self.user, post))
+        self.assertTrue(unlike(self.user, post))
+        self.assertFalse(unlike(self.user, post))
+        self.assertEqual(LikeDelta.objects.count(), 2)
+        self.assertFalse(Like.objects.exists())
+
+    def test_fold_updates_counters(self):
+        """Журнал сворачивается в Post.likes, пост не пишется на каждую
+        отметку."""
+        other = User.objects.create_user(username='other')
+        like(self.user, self.posts[0])
+        like(other, self.posts[0])
+        like(other, self.posts[1])
+        unlike(other, self.posts[1])
+        self.assertEqual(Post.objects.get(pk=self.posts[0].pk).likes, 0)
+        self.assertEqual(fold_likes(batch_size=3), 4)
+        likes = dict(Post.objects.filter(pk__in=[self.posts[0].pk,
+                                                 self.posts[1].pk])
+                     .values_list('pk', 'likes'))
+        self.assertEqual(likes, {self.posts[0].pk: 2, self.posts[1].pk: 0})
+        self.assertFalse(LikeDelta.objects.exists())
+
+    def test_liked_by_me_in_one_query(self):
+        like(self.user, self.posts[0])
+        like(self.user, self.posts[-1])
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.context['liked'], {self.posts[-1].pk})
+        like_queries = [query for query in queries.captured_queries
+                        if 'posts_like' in query['sql']]
+        self.assertEqual(len(like_queries), 1)
+        self.assertEqual(liked_ids(self.user, self.posts),
+                         {self.posts[0].pk, self.posts[-1].pk})
+
+    def test_like_view(self):
+        self.client.force_login(self.user)
+        url = reverse('posts:post_like', kwargs={'post_id': self.posts[0].pk})
+        response = self.client.post(url, {'next': '/group/x/'})
+        self.assertRedirects(response, '/group/x/',
+                             fetch_redirect_response=False)
+        response = self.client.post(url, {'action': 'unlike',
+                                          'next': 'https://evil.com/'})
+        self.assertRedirects(response, reverse(
+            'posts:post_detail', kwargs={'post_id': self.posts[0].pk}))
+        self.assertFalse(Like.objects.exists())
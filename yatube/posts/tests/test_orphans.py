@@ -0,0 +1,143 @@
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from sorl.thumbnail import get_thumbnail
+
+from core.models import StoredFile
+from core.storage import media_storage
+from posts.models import ArchivedPost, Post
+from posts.orphans import find_orphans, walk_files
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+SMALL_GIF = (b'\x47\x49\x46\x38\x39\x61\x02\x00\x01\x00\x80\x00\x00\x00'
+             b'\x00\x00\xFF\xFF\xFF\x21\xF9\x04\x00\x00\x00\x00\x00\x2C'
+             b'\x00\x00\x00\x00\x02\x00\x01\x00\x00\x02\x02\x0C\x0A\x00'
+             b'\x3B')
+DAY_AGO = time.time() - 25 * 60 * 60
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class OrphanMediaTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='auth')
+        self.quarantine = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(os.path.join(MEDIA_ROOT, 'posts'), ignore_errors=True)
+        shutil.rmtree(os.path.join(MEDIA_ROOT, 'cache'), ignore_errors=True)
+        shutil.rmtree(self.quarantine, ignore_errors=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def write(self, name, mtime=DAY_AGO):
+        path = media_storage.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as image:
+            image.write(SMALL_GIF)
+        os.utime(path, (mtime, mtime))
+
+    def gc(self, *args):
+        out = StringIO()
+        call_command('gc_media', *args, stdout=out)
+        return out.getvalue()
+
+    def test_walk_order_matches_string_order(self):
+        names = ['posts/a-b.gif', 'posts/a/b.gif', 'posts/a0.gif',
+                 'posts/ab/cd/file.gif']
+        for name in names:
+            self.write(name)
+        walked = [file.name for file in walk_files(MEDIA_ROOT, 'posts')]
+        self.assertEqual(walked, sorted(names))
+        orphans = find_orphans(walk_files(MEDIA_ROOT, 'posts'),
+                               ['posts/a-b.gif', 'posts/ab/cd/file.gif'])
+        self.assertEqual([file.name for file in orphans],
+                         ['posts/a/b.gif', 'posts/a0.gif'])
+
+    def test_dry_run_reports_only(self):
+        self.write('posts/old.gif')
+        self.write('posts/new.gif', mtime=time.time())
+        output = self.gc('--dry-run')
+        self.assertIn('posts/old.gif', output)
+        self.assertNotIn('posts/new.gif', output)
+        self.assertIn('Будет убрано файлов: 1', output)
+        self.assertIn('моложе 24 ч: 1', output)
+        self.assertTrue(media_storage.exists('posts/old.gif'))
+
+    def test_referenced_files_kept(self):
+        self.write('posts/live.gif')
+        self.write('posts/archived.gif')
+        self.write('posts/orphan.gif')
+        Post.objects.create(author=self.user, text='Пост',
+                            image='posts/live.gif')
+        ArchivedPost.objects.create(id=100, author=self.user, text='Архив',
+                                    pub_date='2020-01-01T00:00Z',
+                                    image='posts/archived.gif')
+        self.gc()
+        self.assertTrue(media_storage.exists('posts/live.gif'))
+        self.assertTrue(media_storage.exists('posts/archived.gif'))
+        self.assertFalse(media_storage.exists('posts/orphan.gif'))
+
+    def test_orphan_removed_with_thumbnails(self):
+        name = media_storage.save('posts/gc.gif', ContentFile(SMALL_GIF))
+        os.utime(media_storage.path(name), (DAY_AGO, DAY_AGO))
+        post = Post.objects.create(author=self.user, text='Пост', image=name)
+        thumbnail = get_thumbnail(post.image, '10x10').name
+        self.assertTrue(media_storage.exists(thumbnail))
+        Post.objects.filter(pk=post.pk).update(image='')
+        # Ссылку потеряли в обход хранилища, запись осталась без ссылок.
+        StoredFile.objects.filter(name=name).update(
+            refs=0, created=timezone.now() - timedelta(days=1))
+        self.gc()
+        self.assertFalse(media_storage.exists(name))
+        self.assertFalse(media_storage.exists(thumbnail))
+        self.assertFalse(StoredFile.objects.exists())
+
+    def test_quarantine(self):
+        self.write('posts/orphan.gif')
+        self.gc('--quarantine', self.quarantine)
+        self.assertFalse(media_storage.exists('posts/orphan.gif'))
+        self.assertTrue(os.path.isfile(
+            os.path.join(self.quarantine, 'posts/orphan.gif')))
+
+    def test_retained_file_kept(self):
+        """Файл с живыми ссылками в StoredFile не удаляется, даже если
+        пост ещё не сохранён."""
+        name = media_storage.save('posts/kept.gif', ContentFile(SMALL_GIF))
+        os.utime(media_storage.path(name), (DAY_AGO, DAY_AGO))
+        self.gc()
+        self.assertTrue(media_storage.exists(name))
+
+    def test_grace_counts_from_stored_file(self):
+        """Срок считается от записи StoredFile, а не от mtime файла."""
+        name = media_storage.save('posts/again.gif', ContentFile(SMALL_GIF))
+        os.utime(media_storage.path(name), (DAY_AGO, DAY_AGO))
+        StoredFile.objects.filter(name=name).update(refs=0)
+        self.assertIn('моложе 24 ч: 1', self.gc())
+        self.assertTrue(media_storage.exists(name))
+
+    def test_stray_thumbnails_removed(self):
+        """Миниатюры без живой картинки убираются, живые остаются."""
+        self.write('posts/live.gif')
+        post = Post.objects.create(author=self.user, text='Пост',
+                                   image='posts/live.gif')
+        thumbnail = get_thumbnail(post.image, '10x10').name
+        os.utime(media_storage.path(thumbnail), (DAY_AGO, DAY_AGO))
+        self.write('cache/ab/cd/stray.jpg')
+        self.gc()
+        self.assertTrue(media_storage.exists(thumbnail))
+        self.assertFalse(media_storage.exists('cache/ab/cd/stray.jpg'))
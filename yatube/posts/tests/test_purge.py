@@ -0,0 +1,63 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from posts.models import Comment, Follow, Post, Purge
+from posts.purge import run_pending, schedule_purge
+
+User = get_user_model()
+
+
+class PurgeTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.post = Post.objects.create(author=self.author,
+                                        text='Пост автора')
+        Post.objects.create(author=self.reader, text='Пост читателя')
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='Комментарий читателя')
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_scheduled_user_is_hidden(self):
+        """Пользователь скрыт сразу после постановки в очередь."""
+        schedule_purge(self.author)
+        self.author.refresh_from_db()
+        self.assertFalse(self.author.is_active)
+        response = self.client.get(reverse('posts:index'))
+        texts = [post.text for post in response.context['page_obj']]
+        self.assertEqual(texts, ['Пост читателя'])
+        response = self.client.get(reverse(
+            'posts:profile', kwargs={'username': self.author.username}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_purge_deletes_dependents_in_batches(self):
+        """Фоновое удаление убирает автора со всеми зависимыми записями."""
+        schedule_purge(self.author)
+        self.assertEqual(run_pending(batch_size=1), 1)
+        self.assertFalse(User.objects.filter(username='author').exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(Post.objects.get().text, 'Пост читателя')
+        purge = Purge.objects.get()
+        self.assertIsNotNone(purge.finished)
+        self.assertEqual(purge.deleted, 5)
+
+    def test_admin_delete_schedules_purge(self):
+        """Удаление поста в админке ставит его в очередь."""
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        self.client.force_login(admin)
+        self.client.post(
+            reverse('admin:posts_post_delete', args=[self.post.pk]),
+            {'post': 'yes'})
+        self.assertTrue(Post.objects.filter(pk=self.post.pk).exists())
+        self.assertTrue(Purge.objects.filter(
+            kind=Purge.POST, object_id=self.post.pk).exists())
+        response = self.client.get(reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}))
+        self.assertEqual(response.status_code, 404)
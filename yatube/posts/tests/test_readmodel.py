@@ -0,0 +1,84 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.counters import increment
+from posts.models import Comment, Group, Post, PostCard
+from posts.readmodel import recount_comments, refresh_cards
+
+User = get_user_model()
+
+
+class PostCardTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author',
+                                               first_name='Лев',
+                                               last_name='Толстой')
+        self.group = Group.objects.create(title='Группа', slug='group',
+                                          description='Описание')
+        self.post = Post.objects.create(author=self.author, group=self.group,
+                                        text='Текст поста')
+
+    def tearDown(self):
+        cache.clear()
+
+    def card(self):
+        return PostCard.objects.get(pk=self.post.pk)
+
+    def test_card_follows_changes(self):
+        card = self.card()
+        self.assertEqual((card.author_name, card.group_slug),
+                         ('Лев Толстой', 'group'))
+        self.post.text = 'Новый текст'
+        self.post.save()
+        self.author.first_name = 'Алексей'
+        self.author.save()
+        self.group.title = 'Другая группа'
+        self.group.save()
+        Comment.objects.create(post=self.post, author=self.author,
+                               text='Комментарий')
+        increment('views', {self.post.pk: 3})
+        card = self.card()
+        self.assertEqual(
+            (card.text, card.author_name, card.group_title, card.comments,
+             card.views),
+            ('Новый текст', 'Алексей Толстой', 'Другая группа', 1, 3))
+        self.group.delete()
+        self.assertIsNone(self.card().group_id)
+        self.post.delete()
+        self.assertFalse(PostCard.objects.exists())
+
+    def test_refresh_after_bulk_create(self):
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Пост {number}')
+            for number in range(3))
+        self.assertEqual(PostCard.objects.count(), 1)
+        self.assertEqual(refresh_cards(Post.objects.all(), batch_size=2), 4)
+        self.assertEqual(PostCard.objects.count(), 4)
+        Comment.objects.bulk_create(
+            [Comment(post=self.post, author=self.author, text='Раз'),
+             Comment(post=self.post, author=self.author, text='Два')])
+        recount_comments([self.post.pk])
+        self.assertEqual(self.card().comments, 2)
+
+    def test_listings_read_one_table(self):
+        urls = (reverse('posts:index'),
+                reverse('posts:group_list', args=[self.group.slug]),
+                reverse('posts:profile', args=[self.author.username]))
+        for url in urls:
+            cache.clear()
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                self.assertContains(response, 'Лев Толстой')
+                self.assertContains(response, 'Комментариев: 0')
+                cards = [query['sql'] for query in queries.captured_queries
+                         if 'posts_postcard' in query['sql']]
+                self.assertTrue(cards)
+                self.assertFalse(any('JOIN' in sql for sql in cards))
+                self.assertFalse(any('"posts_post"' in query['sql']
+                                     for query in queries.captured_queries))
@@ -0,0 +1,80 @@
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from posts.models import Follow, Suggestion
+from posts.recommend import FollowGraph, recommend_follows
+
+User = get_user_model()
+
+
+class RecommendTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        names = ['ann', 'bob', 'cat', 'dan', 'eve', 'fox']
+        cls.users = {name: User.objects.create_user(username=name)
+                     for name in names}
+        edges = [('ann', 'bob'), ('ann', 'cat'), ('bob', 'dan'),
+                 ('cat', 'dan'), ('cat', 'eve'), ('fox', 'bob'),
+                 ('fox', 'eve')]
+        Follow.objects.bulk_create(
+            Follow(user=cls.users[user], author=cls.users[author])
+            for user, author in edges)
+
+    def test_gather_limits_fanout(self):
+        graph = FollowGraph(np.array([[1, 2], [1, 3], [1, 4], [5, 2]]))
+        neighbours, owners = graph.gather(graph.out_ptr, graph.out_idx,
+                                          np.array([0, 4]), limit=2)
+        self.assertEqual(graph.ids[neighbours].tolist(), [2, 3, 2])
+        self.assertEqual(owners.tolist(), [0, 0, 1])
+
+    def test_friends_of_friends_ranked_first(self):
+        """Автора, которого читают обе подписки, рекомендуют первым;
+        на уже читаемых не указывают."""
+        recommend_follows(top_k=3, batch_size=2, chunk_size=2)
+        rows = list(Suggestion.objects.filter(user=self.users['ann'])
+                    .values_list('author__username', 'mutuals'))
+        self.assertEqual(rows[0], ('dan', 2))
+        self.assertIn(('eve', 1), rows)
+        self.assertNotIn('bob', [name for name, _ in rows])
+
+    def test_recompute_replaces_suggestions(self):
+        recommend_follows()
+        recommend_follows()
+        self.assertEqual(Suggestion.objects.filter(
+            user=self.users['ann'], author=self.users['dan']).count(), 1)
+
+    def test_feed_shows_suggestions(self):
+        recommend_follows()
+        self.client.force_login(self.users['ann'])
+        response = self.client.get(reverse('posts:follow_index'))
+        authors = [item.author.username
+                   for item in response.context['suggestions']]
+        self.assertEqual(authors[0], 'dan')
+        Follow.objects.create(user=self.users['ann'],
+                              author=self.users['dan'])
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertNotIn('dan', [item.author.username
+                                 for item in response.context['suggestions']])
+
+    def test_users_outside_graph_get_popular(self):
+        """Пользователь без подписок и подписчиков видит самых читаемых
+        авторов."""
+        newcomer = User.objects.create_user(username='gus')
+        recommend_follows()
+        self.client.force_login(newcomer)
+        response = self.client.get(reverse('posts:follow_index'))
+        authors = [item.author.username
+                   for item in response.context['suggestions']]
+        self.assertIn(authors[0], ('bob', 'dan', 'eve'))
+        self.assertNotIn('ann', authors)
+
+    def test_stale_suggestions_dropped(self):
+        """Рекомендации тех, кто выбыл из графа, удаляются."""
+        recommend_follows()
+        Follow.objects.filter(user=self.users['ann']).delete()
+        recommend_follows()
+        self.assertFalse(Suggestion.objects.filter(
+            user=self.users['ann']).exists())
@@ -0,0 +1,168 @@
+import os
+import shutil
+import tempfile
+from html.parser import HTMLParser
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from core.models import Task
+from core.storage import media_storage
+from core.tasks import autodiscover, work
+from posts.models import Follow, Group, Post, PostCard
+from posts.thumbnails import RATIO, parse_srcset
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+POSTS = 4
+# (ширина окна, плотность точек)
+MOBILE = (360, 2)
+DESKTOP = (1280, 1)
+
+
+class Images(HTMLParser):
+
+    def __init__(self):
+        super().__init__()
+        self.images = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'img' and 'srcset' in attrs:
+            self.images.append(attrs)
+
+
+def slot_width(sizes, viewport):
+    """Ширина картинки на странице по атрибуту sizes, как её считает
+    браузер."""
+    for size in sizes.split(', '):
+        if size.startswith('('):
+            condition, length = size[1:].split(') ')
+            if viewport >= int(condition.split(': ')[1][:-2]):
+                return int(length[:-2])
+        else:
+            return viewport - int(size.split(' - ')[1][:-3])
+
+
+def chosen(image, viewport, density):
+    """Адрес из srcset, который загрузит браузер: самый узкий, которого
+    хватает на ширину картинки с учётом плотности точек."""
+    candidates = parse_srcset(image['srcset'])
+    need = slot_width(image['sizes'], viewport) * density
+    for url, width in candidates:
+        if width >= need:
+            return url
+    return candidates[-1][0]
+
+
+def noise(width, height):
+    """Фото-подобная картинка: шум плохо сжимается, как и снимки."""
+    buffer = BytesIO()
+    Image.frombytes('RGB', (width, height),
+                    os.urandom(width * height * 3)).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ResponsiveImagesTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.upload(POSTS)
+
+    @classmethod
+    def upload(cls, count, size=(1200, 700)):
+        client = Client()
+        client.force_login(cls.author)
+        for number in range(count):
+            client.post(reverse('posts:post_create'), {
+                'text': f'Пост {number}', 'group': cls.group.pk,
+                'image': SimpleUploadedFile(f'{number}.jpg', noise(*size),
+                                            'image/jpeg')})
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def images(self, url):
+        parser = Images()
+        parser.feed(self.client.get(url).content.decode())
+        return parser.images
+
+    def page_bytes(self, images, viewport, density):
+        return sum(media_storage.size(
+            chosen(image, viewport, density)[len(settings.MEDIA_URL):])
+            for image in images)
+
+    def test_feeds_use_srcset(self):
+        post = Post.objects.first()
+        pages = {
+            reverse('posts:index'): POSTS,
+            reverse('posts:group_list', args=[self.group.slug]): POSTS,
+            reverse('posts:profile', args=[self.author.username]): POSTS,
+            reverse('posts:follow_index'): POSTS,
+            reverse('posts:post_detail', args=[post.pk]): 1,
+        }
+        for url, count in pages.items():
+            with self.subTest(url=url):
+                images = self.images(url)
+                self.assertEqual(len(images), count)
+                for image in images:
+                    self.assertEqual(image['loading'], 'lazy')
+                    self.assertEqual(int(image['height']),
+                                     round(int(image['width']) * RATIO))
+                    self.assertEqual(len(parse_srcset(image['srcset'])), 4)
+
+    def test_image_bytes_per_page(self):
+        """Телефон загружает заметно меньше, компьютер — не больше, чем
+        прежняя единственная обрезка 960x339."""
+        post = Post.objects.first()
+        for url in (reverse('posts:index'),
+                    reverse('posts:post_detail', args=[post.pk])):
+            with self.subTest(url=url):
+                images = self.images(url)
+                mobile = self.page_bytes(images, *MOBILE)
+                desktop = self.page_bytes(images, *DESKTOP)
+                single = sum(media_storage.size(
+                    parse_srcset(image['srcset'])[-1][0][
+                        len(settings.MEDIA_URL):]) for image in images)
+                self.assertLess(mobile, desktop * 0.75)
+                self.assertLessEqual(desktop, single)
+
+    def test_small_image_not_upscaled_into_widths(self):
+        self.upload(1, size=(500, 300))
+        post = Post.objects.latest('pk')
+        image, = self.images(reverse('posts:post_detail', args=[post.pk]))
+        self.assertEqual([width for _, width in parse_srcset(
+            image['srcset'])], [320, 480])
+
+    def test_srcset_filled_by_worker(self):
+        self.upload(1)
+        post = Post.objects.latest('pk')
+        card = PostCard.objects.get(pk=post.pk)
+        self.assertEqual(card.srcset, '')
+        self.assertTrue(Task.objects.filter(
+            name='posts.srcset', status=Task.QUEUED).exists())
+        autodiscover()
+        work()
+        card.refresh_from_db()
+        self.assertEqual([width for _, width in parse_srcset(card.srcset)],
+                         [320, 480, 720, 960])
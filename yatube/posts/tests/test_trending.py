@@ -0,0 +1,73 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from posts.follows import follow
+from posts.models import (Comment, Group, Post, TrendingEvent,
+                          TrendingScore)
+from posts.trending import log_add, update_trending
+
+User = get_user_model()
+
+
+class TrendingTests(TestCase):
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(title='Группа', slug='group',
+                                          description='Описание')
+        self.quiet = Post.objects.create(author=self.reader, text='Тихий')
+        self.hot = Post.objects.create(author=self.reader, text='Горячий',
+                                       group=self.group)
+
+    def test_log_add(self):
+        self.assertAlmostEqual(log_add(3, 3), 4)
+        self.assertAlmostEqual(log_add(None, 5), 5)
+        self.assertAlmostEqual(log_add(2000, 1), 2000)
+
+    def test_events_rank_posts(self):
+        """Пост с комментариями обгоняет пост без них; события свёрнуты."""
+        Comment.objects.create(post=self.hot, author=self.author,
+                               text='Комментарий')
+        TrendingEvent.objects.create(post_id=self.quiet.pk, weight=0.2,
+                                     created=timezone.now())
+        self.assertEqual(update_trending(batch_size=1), 2)
+        self.assertFalse(TrendingEvent.objects.exists())
+        response = self.client.get(reverse('posts:trending'))
+        self.assertEqual([post.text for post in response.context['posts']],
+                         ['Горячий', 'Тихий'])
+        response = self.client.get(reverse(
+            'posts:trending_group', kwargs={'slug': self.group.slug}))
+        self.assertEqual([post.text for post in response.context['posts']],
+                         ['Горячий'])
+
+    def test_scores_decay(self):
+        """Старое событие весит меньше нового с тем же весом."""
+        now = timezone.now()
+        TrendingEvent.objects.create(post_id=self.hot.pk, weight=3,
+                                     created=now - timedelta(days=1))
+        TrendingEvent.objects.create(post_id=self.quiet.pk, weight=1,
+                                     created=now)
+        update_trending()
+        ranked = list(TrendingScore.objects.order_by('-score')
+                      .values_list('post_id', flat=True))
+        self.assertEqual(ranked, [self.quiet.pk, self.hot.pk])
+
+    def test_new_follower_boosts_author_posts(self):
+        follow(self.author, self.reader)
+        update_trending()
+        self.assertEqual(TrendingScore.objects.count(), 2)
+
+    def test_page_cost_independent_of_table_size(self):
+        Comment.objects.create(post=self.hot, author=self.author,
+                               text='Комментарий')
+        update_trending()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:trending'))
+        self.assertFalse(any('posts_trendingscore' in query['sql']
+                             for query in queries.captured_queries))
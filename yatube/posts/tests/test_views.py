@@ -1,9 +1,13 @@
+import gzip
+
 from django import forms
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
 from posts.models import Comment, Follow, Group, Post
+from posts.readmodel import refresh_cards
+from posts.views import EXPORT_FIELDS
 
 User = get_user_model()
 
@@ -171,6 +175,7 @@ class PaginatorViewsTest(TestCase):
                 author=cls.author,
                 group=cls.group))
         Post.objects.bulk_create(cls.posts)
+        refresh_cards(Post.objects.all())
 
     def test_paginator(self):
         """Тест паджинатора"""
@@ -256,3 +261,58 @@ class FollowTests(TestCase):
         response = self.client_auth_following.get('/follow/')
         self.assertNotContains(response,
                                'Тестовая запись для тестирования ленты')
+
+
+class ProfileExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='exporter')
+        Post.objects.bulk_create(
+            Post(author=cls.author, text=f'Пост {i}') for i in range(5))
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.author)
+        self.url = reverse('posts:profile_export',
+                           kwargs={'username': self.author.username})
+
+    def test_export_csv(self):
+        """Автор скачивает все свои посты в CSV."""
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(rows), 6)
+        self.assertTrue(rows[-1].endswith('Пост 4'))
+
+    def test_export_csv_without_posts(self):
+        """Выгрузка автора без постов — один заголовок."""
+        author = User.objects.create_user(username='silent')
+        self.client.force_login(author)
+        response = self.client.get(reverse(
+            'posts:profile_export', kwargs={'username': author.username}))
+        rows = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0], ','.join(EXPORT_FIELDS))
+
+    def test_export_ndjson_gzip(self):
+        """NDJSON сжимается, если клиент принимает gzip."""
+        response = self.client.get(self.url, {'format': 'ndjson'},
+                                   HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        content = gzip.decompress(b''.join(response.streaming_content))
+        self.assertEqual(len(content.decode().splitlines()), 5)
+
+    def test_export_only_own_posts(self):
+        """Чужие посты выгрузить нельзя."""
+        other = User.objects.create_user(username='other')
+        self.client.force_login(other)
+        response = self.client.get(self.url)
+        self.assertRedirects(response, reverse(
+            'posts:profile', kwargs={'username': self.author.username}))
+
+    def test_export_rate_limit(self):
+        """Частые выгрузки отклоняются с кодом 429."""
+        for _ in range(3):
+            self.client.get(self.url)
+        self.assertEqual(self.client.get(self.url).status_code, 429)
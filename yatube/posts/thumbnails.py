@@ -0,0 +1,70 @@
+"""
+Адаптивные миниатюры картинок постов.
+
+Раньше каждая карточка отдавала любому устройству одну обрезку 960x339.
+Теперь картинка нарезается на несколько ширин WIDTHS с той же
+пропорцией, и тег post_image выводит их в srcset с sizes по сетке
+Bootstrap: телефон берёт 480 или 720 точек вместо 960. Ширины больше
+исходной картинки (Post.image_width) не нарезаются. width и height
+у <img> задают пропорцию до загрузки, поэтому страница не прыгает, а
+loading="lazy" откладывает картинки вне экрана.
+
+Для лент srcset считается заранее и хранится в PostCard (см.
+posts.readmodel), так что отрисовка карточки не обращается к хранилищу.
+"""
+import logging
+
+from sorl.thumbnail import get_thumbnail
+
+logger = logging.getLogger(__name__)
+
+WIDTHS = (320, 480, 720, 960)
+# Пропорция прежней обрезки 960x339.
+RATIO = 339 / 960
+CROP = {'crop': 'center', 'upscale': True}
+# Ширина картинки на странице: в ленте — во весь .container, на
+# странице поста — в колонке col-md-9.
+SIZES = {
+    'feed': ('(min-width: 1200px) 1110px, (min-width: 992px) 930px, '
+             '(min-width: 768px) 690px, (min-width: 576px) 510px, '
+             'calc(100vw - 30px)'),
+    'detail': ('(min-width: 1200px) 825px, (min-width: 992px) 690px, '
+               '(min-width: 768px) 510px, (min-width: 576px) 510px, '
+               'calc(100vw - 30px)'),
+}
+
+
+def height_for(width):
+    return round(width * RATIO)
+
+
+def widths_for(image_width):
+    """Ширины нарезки; для маленькой картинки — одна, самая узкая."""
+    widths = [width for width in WIDTHS
+              if not image_width or width <= image_width]
+    return widths or [WIDTHS[0]]
+
+
+def build_srcset(image, image_width=0):
+    """Строка srcset ('url 320w, url 480w, ...'); миниатюры создаются
+    сразу. Пустая строка, если картинку не удалось прочитать."""
+    if not image:
+        return ''
+    try:
+        return ', '.join(
+            '{} {}w'.format(get_thumbnail(
+                image, f'{width}x{height_for(width)}', **CROP).url, width)
+            for width in widths_for(image_width))
+    except Exception:
+        logger.warning('Не удалось построить миниатюры %s', image,
+                       exc_info=True)
+        return ''
+
+
+def parse_srcset(srcset):
+    """Пары (url, ширина) из строки srcset."""
+    candidates = []
+    for candidate in srcset.split(', '):
+        url, width = candidate.rsplit(' ', 1)
+        candidates.append((url, int(width[:-1])))
+    return candidates
@@ -0,0 +1,170 @@
+"""
+Популярные посты.
+
+События вовлечённости (комментарий, новый подписчик автора, пачка
+просмотров из posts.counters) пишутся в TrendingEvent. Команда
+update_trending сворачивает новые события в TrendingScore и пересобирает
+топы в TrendingRank, так что страница /trending/ читает готовые
+TRENDING_SIZE строк независимо от размера таблиц.
+
+Оценка затухает вдвое за TRENDING_HALF_LIFE секунд. Чтобы не
+пересчитывать все оценки при каждом обновлении, вес события w в момент t
+хранится как w * 2 ** (t / half_life) от общей точки отсчёта, а в базе —
+log2 суммы: порядок таких оценок совпадает с порядком затухших к любому
+моменту, и числа не переполняются.
+"""
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .counters import views_flushed
+from .follows import followed
+from .models import (Comment, Group, Post, PostCard, TrendingEvent,
+                     TrendingRank, TrendingScore)
+from .purge import visible
+from .readmodel import CARD_FIELDS, as_posts
+
+COMMENT_WEIGHT = 3.0
+FOLLOWER_WEIGHT = 1.0
+VIEW_WEIGHT = 0.2
+# Новый подписчик поднимает посты автора не старше стольких дней.
+AUTHOR_POSTS_DAYS = 7
+BATCH_SIZE = 5000
+# Оценки, затухшие ниже этого веса, удаляются.
+MIN_WEIGHT = 0.01
+
+
+def log_weight(weight, moment):
+    return math.log2(weight) + (
+        moment.timestamp() / settings.TRENDING_HALF_LIFE)
+
+
+def log_add(first, second):
+    """log2(2 ** first + 2 ** second) без переполнения."""
+    if first is None:
+        return second
+    high, low = max(first, second), min(first, second)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+@receiver(views_flushed)
+def record_views(sender, views, **kwargs):
+    now = timezone.now()
+    TrendingEvent.objects.bulk_create(
+        TrendingEvent(post_id=post_id, weight=count * VIEW_WEIGHT,
+                      created=now)
+        for post_id, count in views.items())
+
+
+@receiver(post_save, sender=Comment)
+def record_comment(sender, instance, created, **kwargs):
+    if created:
+        TrendingEvent.objects.create(post_id=instance.post_id,
+                                     weight=COMMENT_WEIGHT,
+                                     created=timezone.now())
+
+
+@receiver(followed)
+def record_followers(sender, user_id, author_ids, **kwargs):
+    now = timezone.now()
+    TrendingEvent.objects.bulk_create(
+        TrendingEvent(author_id=author_id, weight=FOLLOWER_WEIGHT,
+                      created=now)
+        for author_id in author_ids)
+
+
+def contributions(events):
+    """Вклады событий по постам в log2-шкале; события автора
+    раскладываются на его свежие посты."""
+    result = {}
+    authors = defaultdict(list)
+    for event in events:
+        value = log_weight(event.weight, event.created)
+        if event.post_id is not None:
+            result[event.post_id] = log_add(result.get(event.post_id),
+                                            value)
+        else:
+            authors[event.author_id].append(value)
+    if authors:
+        border = timezone.now() - timedelta(days=AUTHOR_POSTS_DAYS)
+        posts = Post.objects.filter(author_id__in=authors,
+                                    pub_date__gte=border)
+        for post_id, author_id in posts.values_list('pk', 'author_id'):
+            for value in authors[author_id]:
+                result[post_id] = log_add(result.get(post_id), value)
+    return result
+
+
+def fold_events(batch_size=BATCH_SIZE):
+    """Сворачивает накопленные события в оценки пачками. Возвращает число
+    обработанных событий."""
+    folded = 0
+    while True:
+        with transaction.atomic():
+            events = list(TrendingEvent.objects.order_by('pk')[:batch_size])
+            if not events:
+                return folded
+            values = contributions(events)
+            scores = TrendingScore.objects.in_bulk(list(values))
+            groups = dict(Post.objects.filter(pk__in=values)
+                          .values_list('pk', 'group_id'))
+            new = []
+            for post_id, value in values.items():
+                if post_id not in groups:
+                    continue
+                if post_id in scores:
+                    score = scores[post_id]
+                    score.score = log_add(score.score, value)
+                    score.group_id = groups[post_id]
+                else:
+                    new.append(TrendingScore(post_id=post_id, score=value,
+                                             group_id=groups[post_id]))
+            TrendingScore.objects.bulk_update(scores.values(),
+                                              ['score', 'group_id'])
+            TrendingScore.objects.bulk_create(new)
+            TrendingEvent.objects.filter(pk__lte=events[-1].pk).delete()
+        folded += len(events)
+
+
+def materialize(size=None):
+    """Удаляет затухшие оценки и пересобирает общий топ и топы групп."""
+    size = size or settings.TRENDING_SIZE
+    TrendingScore.objects.filter(
+        score__lt=log_weight(MIN_WEIGHT, timezone.now())).delete()
+    scores = TrendingScore.objects.order_by('-score')
+    tops = {None: list(scores.values_list('post_id', flat=True)[:size])}
+    group_ids = (scores.filter(group_id__isnull=False).order_by()
+                 .values_list('group_id', flat=True).distinct())
+    for group_id in Group.objects.filter(pk__in=group_ids).values_list(
+            'pk', flat=True):
+        tops[group_id] = list(scores.filter(group_id=group_id)
+                              .values_list('post_id', flat=True)[:size])
+    with transaction.atomic():
+        TrendingRank.objects.all().delete()
+        TrendingRank.objects.bulk_create(
+            TrendingRank(group_id=group_id, position=position, post_id=post)
+            for group_id, posts in tops.items()
+            for position, post in enumerate(posts))
+
+
+def update_trending(batch_size=BATCH_SIZE):
+    folded = fold_events(batch_size)
+    materialize()
+    return folded
+
+
+def trending_posts(group=None):
+    """Готовый топ: позиции по индексу (group, position), карточки одним
+    запросом к PostCard."""
+    ids = list(TrendingRank.objects.filter(group=group)
+               .values_list('post_id', flat=True))
+    cards = visible(PostCard.objects.filter(pk__in=ids))
+    posts = {post.pk: post
+             for post in as_posts(cards.values(*CARD_FIELDS))}
+    return [posts[post_id] for post_id in ids if post_id in posts]
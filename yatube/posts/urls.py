@@ -7,15 +7,26 @@ app_name = 'posts'
 urlpatterns = [
     path('', views.index, name='index'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    path('group/<slug:slug>/follow/', views.group_follow,
+         name='group_follow'),
+    path('group/<slug:slug>/unfollow/', views.group_unfollow,
+         name='group_unfollow'),
     path('profile/<str:username>/', views.profile, name='profile'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('posts/<int:post_id>/comment/',
          views.add_comment, name='add_comment'),
+    path('posts/<int:post_id>/like/', views.post_like, name='post_like'),
+    path('search/', views.search, name='search'),
+    path('trending/', views.trending, name='trending'),
+    path('trending/<slug:slug>/', views.trending, name='trending_group'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('follow/bulk/', views.follow_bulk, name='follow_bulk'),
     path('profile/<str:username>/follow/',
          views.profile_follow, name='profile_follow'),
     path('profile/<str:username>/unfollow/',
          views.profile_unfollow, name='profile_unfollow'),
+    path('profile/<str:username>/export/',
+         views.profile_export, name='profile_export'),
 ]
@@ -1,13 +1,35 @@
+import csv
+import io
+import zlib
+
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
+from django.utils.http import is_safe_url
 from django.views.decorators.cache import cache_page
+from django.views.decorators.http import require_POST
 
+from core.throttling import throttle
+from posts.archive import author_posts, get_post_or_404, search_posts
+from posts.counters import record_view
+from posts.feed import feed_page
+from posts.follows import (follow, follow_group, follow_many, suggestions,
+                           unfollow, unfollow_group, unfollow_many)
 from posts.forms import CommentForm, PostForm
-from posts.models import Follow, Group, Post, User
+from posts.graph import follow_graph, intersect
+from posts.likes import like, liked_ids, unlike
+from posts.models import (ArchivedPost, Group, GroupFollow, Post, PostCard,
+                          User)
+from posts.purge import is_hidden, visible
+from posts.readmodel import CardList
+from posts.trending import trending_posts
 
 PAGES = 10
+EXPORT_CHUNK = 1000
+EXPORT_FIELDS = ('pk', 'pub_date', 'group__slug', 'image', 'text')
 
 
 def pagination(request, posts):
@@ -17,53 +39,135 @@ def pagination(request, posts):
     return page_obj
 
 
+def iter_author_posts(author, chunk_size=EXPORT_CHUNK):
+    """Отдаёт посты автора (сначала архивные) пачками по pk, не держа
+    курсор открытым."""
+    for model in (ArchivedPost, Post):
+        last_pk = 0
+        while True:
+            chunk = list(model.objects.filter(author=author, pk__gt=last_pk)
+                         .order_by('pk')
+                         .values_list(*EXPORT_FIELDS)[:chunk_size])
+            if not chunk:
+                break
+            yield chunk
+            last_pk = chunk[-1][0]
+
+
+def csv_chunks(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # Заголовок отдельной порцией: он нужен и автору без постов.
+    writer.writerow(EXPORT_FIELDS)
+    yield buffer.getvalue()
+    for chunk in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+
+
+def ndjson_chunks(chunks):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for chunk in chunks:
+        yield ''.join(encoder.encode(dict(zip(EXPORT_FIELDS, row))) + '\n'
+                      for row in chunk)
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        yield compressor.compress(chunk.encode())
+    yield compressor.flush()
+
+
 @cache_page(20, key_prefix='index_page')
 def index(request):
-    posts = Post.objects.all()
+    posts = CardList(visible(PostCard.objects.all()))
     page_obj = pagination(request, posts)
     context = {
-        'page_obj': page_obj}
+        'page_obj': page_obj,
+        'liked': liked_ids(request.user, page_obj)}
     return render(request, 'posts/index.html', context)
 
 
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = Post.objects.filter(group=group)
+    posts = CardList(visible(PostCard.objects.filter(group_id=group.pk)))
     page_obj = pagination(request, posts)
+    following = (request.user.is_authenticated
+                 and GroupFollow.objects.filter(user=request.user,
+                                                group=group).exists())
     context1 = {'group': group,
-                'page_obj': page_obj}
+                'page_obj': page_obj,
+                'following': following,
+                'liked': liked_ids(request.user, page_obj)}
     return render(request, 'posts/group_list.html', context1)
 
 
 def profile(request, username):
     author = get_object_or_404(User, username=username)
-    posts = Post.objects.filter(author=author)
+    if is_hidden(author):
+        raise Http404('Пользователь удалён')
+    posts = author_posts(author)
     page_obj = pagination(request, posts)
-    following = (
-        request.user.is_authenticated and Follow.objects.filter(
-            user=request.user, author=author).exists() and (
-            request.user != author)
-    )
+    viewer = request.user
+    following = follows_you = False
+    mutuals = 0
+    if viewer.is_authenticated and viewer != author:
+        following = follow_graph.is_following(viewer.pk, author.pk)
+        follows_you = follow_graph.is_following(author.pk, viewer.pk)
+        mutuals = len(intersect(follow_graph.mutuals(viewer.pk),
+                                follow_graph.mutuals(author.pk)))
     context = {'author': author,
                'page_obj': page_obj,
-               'following': following}
+               'following': following,
+               'follows_you': follows_you,
+               'mutuals': mutuals,
+               'counts': follow_graph.counts(author.pk),
+               'liked': liked_ids(request.user, page_obj),
+               'suggestions': suggestions(request.user)}
     return render(request, 'posts/profile.html', context)
 
 
+@throttle('posts:search')
+def search(request):
+    query = request.GET.get('q', '').strip()
+    posts = search_posts(query) if query else []
+    page_obj = pagination(request, posts)
+    context = {'query': query,
+               'page_obj': page_obj,
+               'liked': liked_ids(request.user, page_obj)}
+    return render(request, 'posts/search.html', context)
+
+
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_post_or_404(post_id)
+    if not isinstance(post, ArchivedPost):
+        record_view(post)
     form = CommentForm()
     comments = post.comments.all()
     context = {'post': post,
                'comments': comments,
-               'form': form}
+               'liked': liked_ids(request.user, [post]),
+               'form': form,
+               'is_archived': isinstance(post, ArchivedPost)}
     return render(request, 'posts/post_detail.html', context)
 
 
+def trending(request, slug=None):
+    group = get_object_or_404(Group, slug=slug) if slug else None
+    posts = trending_posts(group)
+    context = {'group': group,
+               'posts': posts,
+               'liked': liked_ids(request.user, posts)}
+    return render(request, 'posts/trending.html', context)
+
+
 @login_required
 def post_create(request):
     if request.method == "POST":
-        form = PostForm(request.POST)
+        form = PostForm(request.POST, files=request.FILES or None)
         if form.is_valid():
             new_post = form.save(commit=False)
             new_post.author = request.user
@@ -108,25 +212,97 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    page_obj = pagination(request, posts)
-    context = {'page_obj': page_obj}
+    posts, next_cursor = feed_page(request.user, request.GET.get('cursor'),
+                                   PAGES)
+    page_obj = Paginator(posts, PAGES).get_page(1)
+    context = {'page_obj': page_obj,
+               'next_cursor': next_cursor,
+               'liked': liked_ids(request.user, posts),
+               'suggestions': suggestions(request.user)}
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
+@throttle('posts:profile_follow')
 def profile_follow(request, username):
-    user = request.user
     author = get_object_or_404(User, username=username)
-    is_follower = Follow.objects.filter(user=user, author=author)
-    if user != author and not is_follower.exists():
-        Follow.objects.create(user=user, author=author)
+    follow(request.user, author)
     return redirect(reverse('posts:profile', args=[username]))
 
 
 @login_required
+@throttle('posts:profile_unfollow')
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    is_follower = Follow.objects.filter(user=request.user, author=author)
-    is_follower.delete()
+    unfollow(request.user, author)
     return redirect('posts:profile', username=author)
+
+
+@login_required
+@throttle('posts:group_follow')
+def group_follow(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    follow_group(request.user, group)
+    return redirect('posts:group_list', slug)
+
+
+@login_required
+@throttle('posts:group_unfollow')
+def group_unfollow(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    unfollow_group(request.user, group)
+    return redirect('posts:group_list', slug)
+
+
+@login_required
+@require_POST
+def post_like(request, post_id):
+    post = get_object_or_404(Post, id=post_id)
+    if request.POST.get('action') == 'unlike':
+        unlike(request.user, post)
+    else:
+        like(request.user, post)
+    next_url = request.POST.get('next')
+    if next_url and is_safe_url(next_url, {request.get_host()},
+                                request.is_secure()):
+        return redirect(next_url)
+    return redirect('posts:post_detail', post_id)
+
+
+@login_required
+@require_POST
+def follow_bulk(request):
+    """Подписка или отписка сразу от нескольких авторов, например при
+    первом входе."""
+    authors = User.objects.filter(
+        username__in=request.POST.getlist('author'))
+    if request.POST.get('action') == 'unfollow':
+        unfollow_many(request.user, authors)
+    else:
+        follow_many(request.user, authors)
+    return redirect('posts:follow_index')
+
+
+@login_required
+@throttle('posts:profile_export')
+def profile_export(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user:
+        return redirect('posts:profile', username)
+    if request.GET.get('format') == 'ndjson':
+        content = ndjson_chunks(iter_author_posts(author))
+        content_type, extension = 'application/x-ndjson', 'ndjson'
+    else:
+        content = csv_chunks(iter_author_posts(author))
+        content_type, extension = 'text/csv', 'csv'
+    compress = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+    if compress:
+        content = gzip_chunks(content)
+    response = StreamingHttpResponse(
+        content, content_type=f'{content_type}; charset=utf-8')
+    response['Content-Disposition'] = (
+        f'attachment; filename="{username}.{extension}"')
+    response['Vary'] = 'Accept-Encoding'
+    if compress:
+        response['Content-Encoding'] = 'gzip'
+    return response
@@ -54,10 +54,12 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ReplicaPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ThrottleMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
@@ -70,13 +72,39 @@ INTERNAL_IPS = [
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    # Корзины core.throttling должны быть общими для всех процессов,
+    # иначе каждый процесс пропускает свою долю лимита. Файловый кэш не
+    # занимает блокировку записи SQLite и не требует createcachetable;
+    # для нескольких серверов нужен memcached или redis.
+    'throttle': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'throttle_cache'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
 }
 
 ROOT_URLCONF = 'yatube.urls'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Отдавать MEDIA_ROOT самим приложением (core.media). MEDIA_SENDFILE:
+# None — файл отдаёт приложение, 'x-accel' — nginx по заголовку
+# X-Accel-Redirect из internal-location MEDIA_ACCEL_PREFIX,
+# 'x-sendfile' — Apache или lighttpd по заголовку X-Sendfile.
+MEDIA_SERVE = True
+MEDIA_SENDFILE = None
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+MEDIA_CACHE_SECONDS = 24 * 60 * 60
+# gc_media не трогает файлы без ссылок моложе стольких часов и переносит
+# их с ключом --quarantine в MEDIA_QUARANTINE (вне MEDIA_ROOT).
+MEDIA_GC_GRACE_HOURS = 24
+MEDIA_QUARANTINE = os.path.join(BASE_DIR, 'media_quarantine')
+
+# Загруженные картинки постов уменьшаются до POST_IMAGE_MAX_SIZE точек по
+# большей стороне и пережимаются с этим качеством (posts.images).
+POST_IMAGE_MAX_SIZE = 2048
+POST_IMAGE_QUALITY = 82
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
@@ -95,8 +123,34 @@ TEMPLATES = [
         },
     },
 ]
+# В разработке шаблоны перечитываются с диска на каждый запрос. В бою
+# скомпилированные шаблоны хранятся в памяти процесса, а при старте
+# процесса (yatube/wsgi.py) компилируются все сразу, чтобы первый запрос
+# к каждой странице не платил за их разбор.
+if not DEBUG:
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+TEMPLATE_WARMUP = not DEBUG
+# Адрес сайта для команды warm_cache: хост и схема входят в ключ
+# страничного кэша, поэтому должны совпадать с запросами посетителей.
+WARMUP_HOST = 'Ladislav.pythonanywhere.com'
+WARMUP_SCHEME = 'https'
 
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+# В бою collectstatic собирает файлы с хэшем содержимого в имени и их
+# gzip-копии (core.staticfiles).
+if not DEBUG:
+    STATICFILES_STORAGE = (
+        'core.staticfiles.CompressedManifestStaticFilesStorage')
+# Отдавать STATIC_ROOT самим приложением, если перед ним нет веб-сервера,
+# который делает это сам.
+STATIC_SERVE = not DEBUG
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
@@ -104,13 +158,41 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# core.db.backends.sqlite3 — стандартный sqlite3 с WAL, mmap и повтором
+# запросов при занятой базе, см. docstring модуля.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'busy_retries': 3,
+            'pragmas': {
+                'busy_timeout': 5000,
+                'mmap_size': 256 * 1024 * 1024,
+            },
+        },
     }
 }
 
+# Реплики только для чтения: локальные копии SQLite через запятую,
+# обновляются командой sync_replicas. В тестах реплика — зеркало default.
+DATABASE_REPLICAS = []
+for number, path in enumerate(
+        filter(None, os.environ.get('YATUBE_REPLICAS', '').split(','))):
+    alias = f'replica{number}'
+    DATABASES[alias] = {**DATABASES['default'], 'NAME': path,
+                        'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.db.routers.PrimaryReplicaRouter']
+# Сколько секунд после своей записи клиент читает из основной базы.
+REPLICA_PIN_SECONDS = 5
+# Реплика с большим отставанием (в секундах) исключается из чтения.
+REPLICA_MAX_LAG = 30
+REPLICA_LAG_CHECK = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -156,6 +238,51 @@ LOGIN_REDIRECT_URL = 'posts:index'
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Граф подписок в памяти (posts.graph): как часто, в секундах, дочитывать
+# журнал изменений других процессов и строить граф заново.
+FOLLOW_GRAPH_SYNC = 1
+FOLLOW_GRAPH_REBUILD = 10 * 60
+
+# Популярное (posts.trending): оценка поста затухает вдвое за столько
+# секунд, в топах хранится TRENDING_SIZE постов.
+TRENDING_HALF_LIFE = 6 * 60 * 60
+TRENDING_SIZE = 20
+
+# Посты старше стольких дней команда archive_posts переносит в архив.
+POSTS_ARCHIVE_DAYS = 365
+
+# Письма ставятся в очередь core.tasks и отправляются воркером runworker
+# через TASKS_EMAIL_BACKEND.
+EMAIL_BACKEND = 'core.mail.QueuedEmailBackend'
+TASKS_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+
+# Очередь задач core.tasks.
+TASKS_BATCH_SIZE = 50
+# Задержка перед повтором упавшей задачи, секунд: растёт вдвое с попыткой.
+TASKS_RETRY_BACKOFF = 10
+# Задача, взятая в работу дольше этого времени назад, считается брошенной.
+TASKS_LOCK_TIMEOUT = 15 * 60
+TASKS_RETENTION_DAYS = 7
+
+# Ограничение частоты запросов core.throttling: имя URL -> 'число/период'
+# (s, m, h, d). Пользователь ограничивается по id, аноним — по IP.
+# Корзины хранятся в кэше THROTTLE_CACHE; чтение и запись корзины не
+# атомарны, так что одновременные запросы одного клиента могут пройти
+# сверх лимита на несколько запросов.
+THROTTLE_CACHE = 'throttle'
+THROTTLE_RATES = {
+    'posts:post_create': '20/m',
+    'posts:post_edit': '30/m',
+    'posts:add_comment': '20/m',
+    'posts:post_like': '120/m',
+    'posts:profile_follow': '60/m',
+    'posts:profile_unfollow': '60/m',
+    'posts:follow_bulk': '10/m',
+    'posts:group_follow': '60/m',
+    'posts:group_unfollow': '60/m',
+    'posts:profile_export': '3/h',
+    'posts:search': '30/m',
+    'users:signup': '10/h',
+}
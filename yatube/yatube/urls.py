@@ -1,7 +1,9 @@
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
+
+from core.media import serve_media
+from core.staticfiles import serve_static
 
 handler404 = 'core.views.page_not_found'
 handler403 = 'core.views.permission_denied'
@@ -15,6 +17,18 @@ urlpatterns = [
     path('about/', include('about.urls', namespace='about')),
 ]
 
+if settings.STATIC_SERVE:
+    urlpatterns += (
+        re_path(r'^{}(?P<path>.+)$'.format(settings.STATIC_URL.lstrip('/')),
+                serve_static),
+    )
+
+if settings.MEDIA_SERVE:
+    urlpatterns += (
+        re_path(r'^{}(?P<path>.+)$'.format(settings.MEDIA_URL.lstrip('/')),
+                serve_media),
+    )
+
 if settings.DEBUG:
     import debug_toolbar
 
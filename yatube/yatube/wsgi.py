@@ -11,6 +11,19 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
+from core.warmup import warm_up
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# Шаблоны компилируются при старте процесса, а не первыми запросами.
+warm_up()
+# Модели можно импортировать только после загрузки приложений.
+from posts.counters import view_counter  # noqa: E402
+from posts.graph import follow_graph  # noqa: E402
+
+# Просмотры пишутся в базу по времени, даже когда новых нет.
+view_counter.start_timer()
+# Граф подписок загружается до первого запроса.
+follow_graph.build()